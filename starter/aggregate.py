@@ -0,0 +1,282 @@
+import bisect
+import datetime
+import itertools
+import math
+import operator
+from collections import Counter
+from enum import Enum
+
+from database import DatabaseEngine
+from exceptions import UnsupportedFeature
+from models import NearEarthObject, OrbitPath
+from sampling import estimate
+from search import Filter, NEOSearcher
+
+
+class AggregateType(Enum):
+    """
+    Enum representing supported aggregations of the close approaches found by a date search.
+    """
+    count = 'count'
+    count_by_day = 'count_by_day'
+    count_by_month = 'count_by_month'
+    hazardous = 'hazardous'
+    distance_histogram = 'distance_histogram'
+    diameter_histogram = 'diameter_histogram'
+
+    @staticmethod
+    def list():
+        """
+        :return: list of string representations of AggregateType enums
+        """
+        return list(map(lambda output: output.value, AggregateType))
+
+
+class NEOAggregator(object):
+    """
+    Object computing summaries of the close approaches within the date search of a query, after the filters of the
+    query, directly on the data of a NEODatabase, ColumnarNEODatabase or SQLiteNEODatabase.
+
+    The approaches within the dates are taken from the sorted date index in one pass, as parallel columns of date
+    ordinals, miss distances and NEO keys, and only the small summary is returned. Date ordinals are read from the date
+    index rather than parsed, the ColumnarNEODatabase columns are read with slices and C level map and compress
+    calls, and the SQLiteNEODatabase columns are selected in one SQL query.
+
+    The filters of a NearEarthObject query keep every approach of the Near Earth Objects passing them, while the
+    filters of an OrbitPath query keep the approaches passing them, so e.g. a distance filter only counts the
+    approaches within that distance.
+
+    A sampled NEOAggregator estimates every count from the sample of a NEODatabase instead, see
+    NEOSearcher.get_sample, and adds the low and high bounds of its confidence interval after every count.
+    """
+
+    FIELDS = {
+        AggregateType.count: ('approaches', 'neos'),
+        AggregateType.count_by_day: ('close_approach_date', 'approaches'),
+        AggregateType.count_by_month: ('close_approach_month', 'approaches'),
+        AggregateType.hazardous: ('is_hazardous', 'approaches', 'neos'),
+        AggregateType.distance_histogram: ('miss_distance_kilometers_from', 'miss_distance_kilometers_to',
+                                           'approaches'),
+        AggregateType.diameter_histogram: ('diameter_kilometers_from', 'diameter_kilometers_to', 'neos'),
+    }
+
+    # Fields holding counts, estimated with a confidence interval by a sampled NEOAggregator
+    COUNT_FIELDS = ('approaches', 'neos')
+
+    def __init__(self, db, sampled=False, confidence=0.95):
+        """
+        :param db: NEODatabase or ColumnarNEODatabase to aggregate
+        :param sampled: bool representing if the counts are estimated from the sample of the database
+        :param confidence: float representing the probability of the interval of an estimate holding the exact count
+        """
+        self.db = db
+        self.sampled = sampled
+        self.confidence = confidence
+
+    def aggregate(self, query, aggregate, bins=10):
+        """
+        :param query: Query.Selectors object with query information, the number of results is not used
+        :param aggregate: str representing the AggregateType
+        :param bins: int representing the number of equal width bins of a histogram
+        :return: tuple of the field names and the list of summary row tuples
+        """
+        aggregate = AggregateType(aggregate)
+        if self.sampled:
+            return self.aggregate_sample(query, aggregate, bins)
+
+        start_ordinal, end_ordinal = NEOSearcher.get_date_range(query.date_search)
+        filters = query.filters[query.return_object]
+        if self.db.engine == DatabaseEngine.columnar:
+            columns = self.get_columnar_columns(filters, start_ordinal, end_ordinal, query.return_object)
+        elif self.db.engine == DatabaseEngine.sqlite:
+            columns = self.get_sqlite_columns(filters, start_ordinal, end_ordinal)
+        else:
+            columns = self.get_columns(filters, start_ordinal, end_ordinal, query.return_object)
+        ordinals, distances, neo_keys, get_diameter, get_is_hazardous = columns
+
+        if aggregate == AggregateType.count:
+            rows = [(len(ordinals), len(set(neo_keys)))]
+        elif aggregate == AggregateType.count_by_day:
+            rows = [(datetime.date.fromordinal(ordinal).isoformat(), count)
+                    for ordinal, count in sorted(Counter(ordinals).items())]
+        elif aggregate == AggregateType.count_by_month:
+            months = Counter()
+            for ordinal, count in sorted(Counter(ordinals).items()):
+                months[datetime.date.fromordinal(ordinal).strftime('%Y-%m')] += count
+            rows = list(months.items())
+        elif aggregate == AggregateType.hazardous:
+            approaches = Counter(map(get_is_hazardous, neo_keys))
+            neos = Counter(map(get_is_hazardous, set(neo_keys)))
+            rows = [(is_hazardous, approaches[is_hazardous], neos[is_hazardous]) for is_hazardous in (False, True)]
+        elif aggregate == AggregateType.distance_histogram:
+            rows = self.get_histogram(distances, bins)
+        elif aggregate == AggregateType.diameter_histogram:
+            rows = self.get_histogram(list(map(get_diameter, set(neo_keys))), bins)
+        else:
+            raise UnsupportedFeature
+
+        return self.FIELDS[aggregate], rows
+
+    def aggregate_sample(self, query, aggregate, bins=10):
+        """
+        :param query: Query.Selectors object with query information, the number of results is not used
+        :param aggregate: AggregateType
+        :param bins: int representing the number of equal width bins of a histogram
+        :return: tuple of the field names and the list of summary row tuples, every count followed by the bounds of
+                 its confidence interval
+        """
+        orbits, weights, sampled, population = NEOSearcher(self.db).get_sample(query)
+
+        def get_estimate(total):
+            count = estimate(total, sampled, population, self.confidence)
+            return round(count.value), math.floor(count.low), math.ceil(count.high)
+
+        if aggregate == AggregateType.count:
+            rows = [get_estimate(len(orbits)) + get_estimate(sum(weights))]
+        elif aggregate == AggregateType.count_by_day:
+            counts = Counter(map(operator.attrgetter('close_approach_ordinal'), orbits))
+            rows = [(datetime.date.fromordinal(ordinal).isoformat(), *get_estimate(count))
+                    for ordinal, count in sorted(counts.items())]
+        elif aggregate == AggregateType.count_by_month:
+            counts = Counter(orbit.close_approach_date[:7] for orbit in orbits)
+            rows = [(month, *get_estimate(count)) for month, count in sorted(counts.items())]
+        elif aggregate == AggregateType.hazardous:
+            approaches, neos = Counter(), Counter()
+            for orbit, weight in zip(orbits, weights):
+                is_hazardous = NearEarthObject.is_hazardous(orbit.neo)
+                approaches[is_hazardous] += 1
+                neos[is_hazardous] += weight
+            rows = [(is_hazardous, *get_estimate(approaches[is_hazardous]), *get_estimate(neos[is_hazardous]))
+                    for is_hazardous in (False, True)]
+        elif aggregate == AggregateType.distance_histogram:
+            rows = [(low, high, *get_estimate(count))
+                    for low, high, count in self.get_histogram(map(OrbitPath.distance, orbits), bins)]
+        elif aggregate == AggregateType.diameter_histogram:
+            diameters = [NearEarthObject.diameter(orbit.neo) for orbit in orbits]
+            rows = [(low, high, *get_estimate(count))
+                    for low, high, count in self.get_histogram(diameters, bins, weights=weights)]
+        else:
+            raise UnsupportedFeature
+
+        fields = tuple(itertools.chain.from_iterable(
+            (field, f'{field}_low', f'{field}_high') if field in self.COUNT_FIELDS else (field,)
+            for field in self.FIELDS[aggregate]
+        ))
+        return fields, rows
+
+    def get_columns(self, filters, start_ordinal, end_ordinal, return_object=NearEarthObject):
+        """
+        :param filters: list of Filters of the query
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param return_object: NearEarthObject or OrbitPath class the filters are evaluated on
+        :return: tuple of the date ordinals, miss distances and NearEarthObjects of the approaches passing the filters,
+                 and the functions reading the diameter and hazard flag of a NearEarthObject
+        """
+        keys, offsets = self.db.date_index_keys, self.db.date_index_offsets
+        start = bisect.bisect_left(keys, start_ordinal)
+        end = bisect.bisect_right(keys, end_ordinal)
+        ordinals = list(itertools.chain.from_iterable(
+            itertools.repeat(keys[index], offsets[index + 1] - offsets[index]) for index in range(start, end)
+        ))
+        orbits = self.db.orbit_paths[offsets[start]:offsets[end]]
+
+        if filters and return_object is OrbitPath:
+            passes = list(map(Filter.compile(filters), orbits))
+            ordinals = list(itertools.compress(ordinals, passes))
+            orbits = list(itertools.compress(orbits, passes))
+        elif filters:
+            predicate = Filter.compile(filters)
+            neo_passes = {}
+            passes = []
+            for orbit in orbits:
+                if orbit.neo not in neo_passes:
+                    neo_passes[orbit.neo] = predicate(orbit.neo)
+                passes.append(neo_passes[orbit.neo])
+            ordinals = list(itertools.compress(ordinals, passes))
+            orbits = list(itertools.compress(orbits, passes))
+
+        return (ordinals, map(OrbitPath.distance, orbits), list(map(operator.attrgetter('neo'), orbits)),
+                NearEarthObject.diameter, NearEarthObject.is_hazardous)
+
+    def get_columnar_columns(self, filters, start_ordinal, end_ordinal, return_object=NearEarthObject):
+        """
+        :param filters: list of Filters of the query
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param return_object: NearEarthObject or OrbitPath class the filters are evaluated on
+        :return: tuple of the date ordinals, miss distances and NEO ids of the orbit rows passing the filters, and
+                 the functions reading the diameter and hazard flag of a NEO id
+        """
+        start = bisect.bisect_left(self.db.date_index_keys, start_ordinal)
+        end = bisect.bisect_right(self.db.date_index_keys, end_ordinal)
+        ordinals = self.db.date_index_keys[start:end]
+        rows = self.db.date_index_rows[start:end]
+        neo_ids = list(map(self.db.orbit_neo_ids.__getitem__, rows))
+
+        if return_object is OrbitPath:
+            mask, orbit_mask = Filter.get_orbit_mask(filters, self.db)
+            if orbit_mask is not None:
+                passes = list(map(orbit_mask.__getitem__, rows))
+                ordinals = list(itertools.compress(ordinals, passes))
+                rows = list(itertools.compress(rows, passes))
+                neo_ids = list(itertools.compress(neo_ids, passes))
+        else:
+            mask = Filter.get_mask(filters, self.db)
+        if mask is not None:
+            passes = list(map(mask.__getitem__, neo_ids))
+            ordinals = list(itertools.compress(ordinals, passes))
+            rows = list(itertools.compress(rows, passes))
+            neo_ids = list(itertools.compress(neo_ids, passes))
+
+        diameters = self.db.neo_columns['estimated_diameter_min_kilometers']
+        return (ordinals, map(self.db.orbit_columns['miss_distance_kilometers'].__getitem__, rows), neo_ids,
+                diameters.__getitem__, lambda neo_id: bool(self.db.neo_is_hazardous[neo_id]))
+
+    def get_sqlite_columns(self, filters, start_ordinal, end_ordinal):
+        """
+        :param filters: list of Filters of the query
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: tuple of the date ordinals, miss distances and NEO ids of the orbits passing the filters, selected in
+                 one SQL query, and the functions reading the diameter and hazard flag of a NEO id
+        """
+        sql, parameters = self.db.get_search_sql('o.close_approach_date, o.miss_distance_kilometers, o.neo_id, '
+                                                 'n.estimated_diameter_min_kilometers, '
+                                                 'n.is_potentially_hazardous_asteroid',
+                                                 start_ordinal, end_ordinal, filters)
+        rows = self.db.execute(sql, parameters)
+        ordinals, distances, neo_ids, diameters, is_hazardous = map(list, zip(*rows)) if rows else ([],) * 5
+
+        diameters = dict(zip(neo_ids, diameters))
+        is_hazardous = dict(zip(neo_ids, map(bool, is_hazardous)))
+        return ordinals, distances, neo_ids, diameters.__getitem__, is_hazardous.__getitem__
+
+    @staticmethod
+    def get_histogram(values, bins, weights=None):
+        """
+        :param values: iterable of float values
+        :param bins: int representing the number of equal width bins between the smallest and largest value
+        :param weights: list of the float weight of every value counted, or None to count every value once
+        :return: list of (from, to, count) tuples, every bin includes its lower bound and the last one its upper bound
+        :raises ValueError: if there is not at least one bin
+        """
+        if bins < 1:
+            raise ValueError(f'Invalid number of histogram bins: {bins}')
+
+        values = list(values)
+        if not values:
+            return []
+        if weights is None:
+            weights = itertools.repeat(1)
+
+        low, high = min(values), max(values)
+        width = (high - low) / bins
+        if not width:
+            return [(low, high, sum(itertools.islice(weights, len(values))))]
+
+        counts = Counter()
+        for value, weight in zip(values, weights):
+            counts[min(int((value - low) / width), bins - 1)] += weight
+        return [(low + width * index, high if index == bins - 1 else low + width * (index + 1), counts[index])
+                for index in range(bins)]
@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import itertools
+
+from search import NEOSearcher
+
+
+class AsyncNEOSearcher(object):
+    """
+    asyncio interface to load and search a NEODatabase or ColumnarNEODatabase without blocking the event loop.
+
+    Loading and searching run on an executor, the default thread pool of the event loop unless one is given. A search
+    is consumed in chunks of chunk_size results, one executor call per chunk, so the event loop runs between chunks
+    and concurrent searches take turns on the executor instead of waiting for each other to finish. Any number of
+    searches share the loaded database, which they only read. A load or ingest waits for the running searches to
+    finish and holds back the searches started after it until it is done, so no search sees half loaded data.
+
+    A search holds the database until its iter_objects generator is exhausted or closed, so a consumer stopping early
+    should close it with its aclose method.
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, db, cache=None, executor=None, chunk_size=None):
+        """
+        :param db: NEODatabase or ColumnarNEODatabase to load and search
+        :param cache: QueryCache to reuse the results of repeated queries from, or None to always search
+        :param executor: concurrent.futures.Executor running the loads and searches, or None for the default executor
+        :param chunk_size: int representing the number of results searched per executor call, defaults to CHUNK_SIZE
+        """
+        self.db = db
+        self.searcher = NEOSearcher(db, cache=cache)
+        self.executor = executor
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+        # Number of running searches and of loads running or waiting to run, guarded by the condition
+        self.searches = 0
+        self.loads = 0
+        self.loading = False
+        # Created on first use, so it belongs to the event loop the searcher is used on
+        self.condition = None
+
+    async def run(self, function, *args):
+        """
+        :param function: blocking function to call on the executor
+        :param args: positional arguments of the function
+        :return: return value of the function
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # A started call cannot be stopped, the database is only released once it no longer uses it
+            await asyncio.wait([future])
+            raise
+
+    def get_condition(self):
+        """
+        :return: asyncio.Condition guarding the counts of running searches and loads
+        """
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        return self.condition
+
+    @contextlib.asynccontextmanager
+    async def reading(self):
+        """
+        :return: async context manager holding the database for a search, after any pending load is done
+        """
+        condition = self.get_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self.loads)
+            self.searches += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self.searches -= 1
+                condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def writing(self):
+        """
+        :return: async context manager holding the database for a load, once the running searches and loads are done
+        """
+        condition = self.get_condition()
+        async with condition:
+            self.loads += 1
+            await condition.wait_for(lambda: not self.searches and not self.loading)
+            self.loading = True
+        try:
+            yield
+        finally:
+            async with condition:
+                self.loading = False
+                self.loads -= 1
+                condition.notify_all()
+
+    async def load_data(self, filename=None):
+        """
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: None
+        """
+        async with self.writing():
+            await self.run(self.db.load_data, filename)
+
+    async def ingest_file(self, filename):
+        """
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: int representing the number of rows added
+        """
+        async with self.writing():
+            return await self.run(self.db.ingest_file, filename)
+
+    async def iter_objects(self, query):
+        """
+        Async generator of the results of NEOSearcher.iter_objects, searched chunk_size results at a time on the
+        executor
+
+        :param query: Query.Selectors object with query information
+        :return: async generator of NearEarthObjects or OrbitalPaths
+        """
+        async with self.reading():
+            # A cached query is searched in full by iter_objects itself, so it is called on the executor as well
+            results = await self.run(self.searcher.iter_objects, query)
+            while True:
+                chunk = await self.run(list, itertools.islice(results, self.chunk_size))
+                for result in chunk:
+                    yield result
+                if len(chunk) < self.chunk_size:
+                    return
+
+    async def get_objects(self, query):
+        """
+        :param query: Query.Selectors object with query information
+        :return: list of NearEarthObjects or OrbitalPaths, see NEOSearcher.get_objects
+        """
+        return [result async for result in self.iter_objects(query)]
+
+    async def get_batch_objects(self, queries):
+        """
+        :param queries: list of Query.Selectors objects with query information
+        :return: list of the list of NearEarthObjects or OrbitalPaths of every query, see
+                 NEOSearcher.get_batch_objects
+        """
+        async with self.reading():
+            return await self.run(self.searcher.get_batch_objects, queries)
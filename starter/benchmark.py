@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+#  -*- coding: utf-8 -*-
+
+"""
+Script to benchmark the Near Earth Object database on synthetic data.
+
+You can run from the commandline with: benchmark.py [generate|run] [args]
+
+Generate options:
+- Write a synthetic csv file with the neo_data.csv schema e.g. benchmark.py generate -n 1000000 -o data/neo_1m.csv
+
+Run options:
+- Benchmark a freshly generated file e.g. benchmark.py run -n 100000 -o results.json
+- Benchmark an existing file e.g. benchmark.py run -f data/neo_1m.csv --engines memory columnar
+- Compare with the results of an earlier commit e.g. benchmark.py run -n 100000 --compare results.json
+
+Every benchmark is run --repeat times and the fastest run is kept. The peak memory of a benchmark is measured with
+tracemalloc in one extra run, so it does not slow down the timed runs. Results are emitted as json with the git
+commit they were measured on; --compare reports every benchmark slower than --threshold times the earlier result and
+exits with status 1 if there is any.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import pathlib
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from database import DatabaseEngine, NEODatabase, ColumnarNEODatabase, SQLiteNEODatabase
+from search import Query, NEOSearcher
+from writer import OutputFormat, NEOWriter
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
+
+
+class NEODataGenerator(object):
+    """
+    Object generating synthetic csv rows with the neo_data.csv schema, one row per close approach.
+
+    Near Earth Objects get a provisional designation as name, an absolute magnitude from which the estimated diameter
+    range is derived for albedos of 0.25 and 0.05, as in the NASA data, and one or more close approaches at random
+    dates in the date range. Bright Near Earth Objects are potentially hazardous more often. Rows are generated lazily,
+    so files of any size are written in constant memory.
+    """
+
+    FIELDS = ['id', 'neo_reference_id', 'name', 'nasa_jpl_url', 'absolute_magnitude_h',
+              'estimated_diameter_min_kilometers', 'estimated_diameter_max_kilometers',
+              'estimated_diameter_min_meters', 'estimated_diameter_max_meters',
+              'estimated_diameter_min_miles', 'estimated_diameter_max_miles',
+              'estimated_diameter_min_feet', 'estimated_diameter_max_feet',
+              'is_potentially_hazardous_asteroid', 'kilometers_per_second', 'kilometers_per_hour', 'miles_per_hour',
+              'close_approach_date', 'close_approach_date_full', 'miss_distance_astronomical', 'miss_distance_lunar',
+              'miss_distance_kilometers', 'miss_distance_miles', 'orbiting_body']
+
+    KILOMETERS_PER_AU = 149597870.7
+    KILOMETERS_PER_LUNAR_DISTANCE = 384400.0
+    MILES_PER_KILOMETER = 0.621371
+    FEET_PER_KILOMETER = 3280.84
+    HALF_MONTHS = 'ABCDEFGHJKLMNOPQRSTUVWXY'
+
+    def __init__(self, seed=0, start_date='2015-01-01', end_date='2024-12-31', approaches=3.5):
+        """
+        :param seed: int representing the seed of the random generator, equal seeds generate equal files
+        :param start_date: str representing the first close approach date in YYYY-MM-DD format
+        :param end_date: str representing the last close approach date in YYYY-MM-DD format
+        :param approaches: float representing the mean number of close approaches per Near Earth Object
+        """
+        self.random = random.Random(seed)
+        self.start_ordinal = datetime.date.fromisoformat(start_date).toordinal()
+        self.end_ordinal = datetime.date.fromisoformat(end_date).toordinal()
+        self.approaches = approaches
+
+    def iter_rows(self, rows):
+        """
+        :param rows: int representing the number of close approach rows to generate
+        :return: generator of lists of csv values in FIELDS order
+        """
+        generated = 0
+        neo_id = 2000000
+        while generated < rows:
+            neo_id += 1
+            neo = self.get_neo(neo_id)
+            # Geometrically distributed number of approaches, at least one
+            count = 1 + int(math.log(1.0 - self.random.random()) / math.log(1.0 - 1.0 / self.approaches))
+            for ordinal in sorted(self.random.randint(self.start_ordinal, self.end_ordinal)
+                                  for _ in range(min(count, rows - generated))):
+                yield neo + self.get_approach(ordinal)
+                generated += 1
+
+    def get_neo(self, neo_id):
+        """
+        :param neo_id: int representing the id of the Near Earth Object
+        :return: list of the csv values of the Near Earth Object
+        """
+        # The full id keeps the name unique, the databases key Near Earth Objects by name
+        year = self.random.randint(1990, 2024)
+        name = f'({year} {self.random.choice(self.HALF_MONTHS)}{chr(65 + neo_id % 26)}{neo_id})'
+        magnitude = round(self.random.uniform(16.0, 30.0), 2)
+        diameter_min = 1329.0 / math.sqrt(0.25) * 10 ** (-magnitude / 5)
+        diameter_max = 1329.0 / math.sqrt(0.05) * 10 ** (-magnitude / 5)
+        is_hazardous = magnitude <= 22.0 and self.random.random() < 0.4
+
+        return [neo_id, neo_id, name, f'http://ssd.jpl.nasa.gov/sbdb.cgi?sstr={neo_id}', magnitude,
+                diameter_min, diameter_max, diameter_min * 1000, diameter_max * 1000,
+                diameter_min * self.MILES_PER_KILOMETER, diameter_max * self.MILES_PER_KILOMETER,
+                diameter_min * self.FEET_PER_KILOMETER, diameter_max * self.FEET_PER_KILOMETER,
+                str(is_hazardous)]
+
+    def get_approach(self, ordinal):
+        """
+        :param ordinal: int representing the ordinal of the close approach date
+        :return: list of the csv values of the close approach
+        """
+        date = datetime.date.fromordinal(ordinal)
+        velocity = self.random.gammavariate(4.0, 4.0)
+        distance = self.random.uniform(0.0005, 0.5) * self.KILOMETERS_PER_AU
+
+        return [velocity, velocity * 3600, velocity * 3600 * self.MILES_PER_KILOMETER,
+                date.isoformat(),
+                f'{date.strftime("%Y-%b-%d")} {self.random.randint(0, 23):02d}:{self.random.randint(0, 59):02d}',
+                distance / self.KILOMETERS_PER_AU, distance / self.KILOMETERS_PER_LUNAR_DISTANCE,
+                distance, distance * self.MILES_PER_KILOMETER,
+                'Earth' if self.random.random() < 0.9 else self.random.choice(['Mars', 'Venus', 'Juptr'])]
+
+    def write(self, filename, rows):
+        """
+        :param filename: str representing the pathway of the csv file to write
+        :param rows: int representing the number of close approach rows to write
+        :return: None
+        """
+        with open(filename, 'w', newline='', buffering=NEOWriter.BUFFER_SIZE) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(self.FIELDS)
+            writer.writerows(self.iter_rows(rows))
+
+
+class NEOBenchmark(object):
+    """
+    Object timing the load of every engine, every query shape of NEOSearcher.get_objects and every NEOWriter
+    output format on one csv file.
+    """
+
+    ENGINES = ['memory', 'indexed', 'columnar', 'sqlite']
+
+    # Query shapes, the dates are filled in from the loaded data
+    QUERIES = {
+        'date': {},
+        'date_range': {},
+        'date_range_number': {'number': 10},
+        'diameter': {'filter': ['diameter:>=:0.5']},
+        'is_hazardous': {'filter': ['is_hazardous:=:True']},
+        'distance': {'filter': ['distance:<=:1000000']},
+        'all_filters': {'filter': ['diameter:>=:0.1', 'is_hazardous:=:True', 'distance:>=:10000000']},
+        'path': {'return_object': 'Path'},
+        'order_distance': {'number': 10, 'order': 'distance'},
+        'order_diameter': {'number': 10, 'order': 'diameter'},
+        'order_velocity': {'number': 10, 'order': 'velocity'},
+    }
+
+    def __init__(self, filename, repeat=3, engines=None, memory=True):
+        """
+        :param filename: str representing the pathway of the csv file to benchmark
+        :param repeat: int representing the number of timed runs of every benchmark
+        :param engines: list of str representing the ENGINES to benchmark, defaults to all of them
+        :param memory: bool representing if the peak memory of every benchmark is measured
+        """
+        self.filename = filename
+        self.repeat = repeat
+        self.engines = engines or self.ENGINES
+        self.memory = memory
+
+    def measure(self, function):
+        """
+        :param function: function without arguments to benchmark
+        :return: tuple of the dict of measurements and the result of the last call
+        """
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        measurement = {'seconds': min(times), 'mean_seconds': sum(times) / len(times)}
+
+        if self.memory:
+            tracemalloc.start()
+            try:
+                result = function()
+                measurement['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        return measurement, result
+
+    def get_database(self, engine, temp_dir):
+        """
+        :param engine: str representing one of the ENGINES
+        :param temp_dir: str representing the pathway of a directory holding the SQLite file of the sqlite engine
+        :return: function loading a new database of the engine
+        """
+        def load():
+            if engine == DatabaseEngine.columnar.value:
+                db = ColumnarNEODatabase(filename=self.filename)
+            elif engine == DatabaseEngine.sqlite.value:
+                # Every load starts from a new file, an unchanged csv file would otherwise not be read again
+                path = os.path.join(temp_dir, 'neo_data.sqlite')
+                if os.path.exists(path):
+                    os.remove(path)
+                db = SQLiteNEODatabase(filename=self.filename, path=path)
+            else:
+                db = NEODatabase(filename=self.filename, secondary_indexes=engine == 'indexed')
+            db.load_data()
+            return db
+
+        return load
+
+    @staticmethod
+    def get_row_count(db):
+        """
+        :param db: loaded NEODatabase, ColumnarNEODatabase or SQLiteNEODatabase
+        :return: int representing the number of close approaches held
+        """
+        if db.engine == DatabaseEngine.columnar:
+            return len(db.orbit_neo_ids)
+        if db.engine == DatabaseEngine.sqlite:
+            return db.connect().execute('SELECT COUNT(*) FROM orbit').fetchone()[0]
+
+        return len(db.orbit_paths)
+
+    def get_queries(self, db):
+        """
+        :param db: loaded NEODatabase, ColumnarNEODatabase or SQLiteNEODatabase
+        :return: dict of the query shape name to its Query.Selectors, searching ten days from the median date index key
+        """
+        if db.engine == DatabaseEngine.sqlite:
+            keys = [ordinal for ordinal, in db.connect().execute('SELECT DISTINCT close_approach_date FROM orbit '
+                                                                 'ORDER BY close_approach_date')]
+        else:
+            keys = db.date_index_keys
+        median = datetime.date.fromordinal(keys[len(keys) // 2]) if keys else datetime.date(2020, 1, 1)
+        dates = {'start_date': median.isoformat(), 'end_date': (median + datetime.timedelta(days=9)).isoformat()}
+
+        queries = {}
+        for name, options in self.QUERIES.items():
+            options = dict({'date': median.isoformat()} if name == 'date' else dates, **options)
+            options.setdefault('return_object', 'NEO')
+            queries[name] = Query(**options).build_query()
+
+        return queries
+
+    def run(self):
+        """
+        :return: dict of the benchmark name to its measurements, with rows counting the results or rows written
+        """
+        results = {}
+        queries = write_results = None
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for engine in self.engines:
+                results[f'load.{engine}'], db = self.measure(self.get_database(engine, temp_dir))
+                results[f'load.{engine}']['rows'] = self.get_row_count(db)
+
+                # Every engine answers the same queries
+                if queries is None:
+                    queries = self.get_queries(db)
+                searcher = NEOSearcher(db)
+                for name, query in queries.items():
+                    key = f'query.{engine}.{name}'
+                    results[key], objects = self.measure(lambda: searcher.get_objects(query))
+                    results[key]['rows'] = len(objects)
+                    if name == 'date_range' and write_results is None:
+                        write_results = objects
+                if engine == DatabaseEngine.sqlite.value:
+                    db.close()
+                del db, searcher
+
+            writer = NEOWriter()
+            for output_format in OutputFormat:
+                if output_format == OutputFormat.display:
+                    continue
+                filename = os.path.join(temp_dir, f'neo_neo_data.{output_format.value}')
+                key = f'write.{output_format.value}'
+                results[key], _ = self.measure(
+                    lambda: writer.write(format=output_format.value, data=iter(write_results or []), filename=filename)
+                )
+                results[key]['bytes'] = os.path.getsize(filename)
+
+        return results
+
+    @staticmethod
+    def get_metadata():
+        """
+        :return: dict describing where the benchmark ran, with the git commit if the project is a git checkout
+        """
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True,
+                                    text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+                'time': datetime.datetime.now().isoformat(timespec='seconds')}
+
+    @staticmethod
+    def compare(results, previous, threshold):
+        """
+        :param results: dict of the benchmark name to its measurements
+        :param previous: dict of the benchmark name to its measurements on an earlier commit
+        :param threshold: float representing the slowdown ratio reported as a regression
+        :return: list of (name, previous seconds, seconds) tuples of the regressions
+        """
+        return [(name, previous[name]['seconds'], measurement['seconds'])
+                for name, measurement in results.items()
+                if name in previous and measurement['seconds'] > previous[name]['seconds'] * threshold]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Near Earth Objects (NEOs) Database benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Write a synthetic csv file.')
+    generate_parser.add_argument('-n', '--rows', type=int, default=10000, help='Int representing the number of rows')
+    generate_parser.add_argument('-o', '--output_file', '--output-file', type=str, required=True,
+                                 help='Path of the csv file to write')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Int representing the random seed')
+
+    run_parser = subparsers.add_parser('run', help='Benchmark loading, searching and writing.')
+    run_parser.add_argument('-n', '--rows', type=int, default=10000,
+                            help='Int representing the number of rows of the generated csv file')
+    run_parser.add_argument('-f', '--filename', type=str, help='Name of a csv data file to benchmark instead')
+    run_parser.add_argument('--seed', type=int, default=0, help='Int representing the random seed')
+    run_parser.add_argument('--engines', nargs='+', choices=NEOBenchmark.ENGINES, default=NEOBenchmark.ENGINES,
+                            help='Select the engines to benchmark.')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Int representing the number of timed runs')
+    run_parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory runs.')
+    run_parser.add_argument('-o', '--output_file', '--output-file', type=str,
+                            help='Path of the json file to write the results to, by default they are printed')
+    run_parser.add_argument('--compare', type=str, help='Path of the json results of an earlier run to compare to')
+    run_parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Float representing the slowdown ratio reported as a regression')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        NEODataGenerator(seed=args.seed).write(args.output_file, args.rows)
+        print(f'Wrote {args.rows} rows to {args.output_file}')
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        filename = args.filename
+        if not filename:
+            filename = os.path.join(data_dir, 'neo_data.csv')
+            NEODataGenerator(seed=args.seed).write(filename, args.rows)
+
+        benchmark = NEOBenchmark(filename, repeat=args.repeat, engines=args.engines, memory=not args.no_memory)
+        output = {'metadata': dict(NEOBenchmark.get_metadata(), filename=args.filename, rows=args.rows,
+                                   seed=args.seed, repeat=args.repeat),
+                  'results': benchmark.run()}
+
+    if args.output_file:
+        with open(args.output_file, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = NEOBenchmark.compare(output['results'], json.load(f)['results'], args.threshold)
+        for name, previous_seconds, seconds in regressions:
+            print(f'Regression: {name} took {seconds:.6f}s, was {previous_seconds:.6f}s')
+        if regressions:
+            sys.exit(1)
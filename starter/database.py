@@ -1,32 +1,323 @@
+import array
+import bisect
+import contextlib
 import csv
-from models import OrbitPath, NearEarthObject
+import gc
+import io
+import itertools
+import math
+import operator
+import os
+import sqlite3
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+from exceptions import UnsupportedFeature
+from models import OrbitPath, NearEarthObject, date_to_ordinal
+from sampling import ReservoirSample
+from snapshot import Snapshot
+from stats import NEOStats
+
+
+class DatabaseEngine(Enum):
+    """
+    Enum representing supported storage engines for Near Earth Objects.
+    """
+    memory = 'memory'
+    columnar = 'columnar'
+    sqlite = 'sqlite'
+
+    @staticmethod
+    def list():
+        """
+        :return: list of string representations of DatabaseEngine enums
+        """
+        return list(map(lambda engine: engine.value, DatabaseEngine))
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Pauses the garbage collector while many objects are created at once, e.g. while rebuilding them from columns,
+    which would otherwise trigger repeated collections that find nothing to free
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def get_csv_chunks(filename, chunk_count):
+    """
+    Splits the rows of a csv file into byte ranges of about equal size, each starting and ending at a line boundary.
+    Rows must not contain quoted line breaks, which holds for the Near Earth Object data.
+
+    :param filename: str representing the pathway of the csv file
+    :param chunk_count: int representing the number of ranges to split the rows into
+    :return: tuple of the list of csv header fieldnames and the list of (start, end) byte offsets, end exclusive
+    """
+    with open(filename, 'rb') as f:
+        fieldnames = next(csv.reader([f.readline().decode()]))
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        offsets = [start]
+        for chunk in range(1, chunk_count):
+            f.seek(max(start + (size - start) * chunk // chunk_count, offsets[-1]))
+            f.readline()
+            offsets.append(min(f.tell(), size))
+        offsets.append(size)
+
+    return fieldnames, [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+
+def split_text(blob, length):
+    """
+    :param blob: bytes-like NUL separated text column
+    :param length: int representing the number of values in the column
+    :return: list of str values
+    """
+    return str(blob, 'utf-8').split('\0') if length else []
+
+
+def read_csv_rows(lines, fields, fieldnames=None):
+    """
+    Reads csv rows projected onto the fields a database keeps. Unlike a csv.DictReader, the values of the other
+    columns, such as the diameters, velocities and miss distances in units the models derive, are never put into a
+    dict, and the dicts are built with one C level itemgetter call per row.
+
+    :param lines: iterable of csv lines, starting with the header unless fieldnames are given
+    :param fields: list of str representing the csv fields to keep
+    :param fieldnames: list of csv header fieldnames, read from the first line if None
+    :return: generator of dicts of the fields to their csv text
+    """
+    reader = csv.reader(lines)
+    if fieldnames is None:
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+
+    missing = [field for field in fields if field not in fieldnames]
+    if missing:
+        raise KeyError(f'Missing csv fields: {", ".join(missing)}')
+
+    get_values = operator.itemgetter(*map(fieldnames.index, fields))
+    for row in reader:
+        # Blank lines are skipped as a csv.DictReader does
+        if row:
+            yield dict(zip(fields, get_values(row)))
+
+
+def load_csv_chunk(database_class, filename, fieldnames, start, end):
+    """
+    Loads the rows in a byte range of a csv file into a new, unindexed database. Used by the worker processes of a
+    parallel load.
+
+    :param database_class: NEODatabase or ColumnarNEODatabase class to load the rows into
+    :param filename: str representing the pathway of the csv file
+    :param fieldnames: list of csv header fieldnames
+    :param start: int representing the byte offset of the first row
+    :param end: int representing the byte offset after the last row
+    :return: dict of blob name to bytes-like object holding the rows in file order, see database_class.get_blobs
+    """
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode()
+
+    chunk = database_class(filename=None)
+    chunk.append_rows(read_csv_rows(io.StringIO(text), database_class.CSV_FIELDS, fieldnames))
+    # Typed columns are sent back instead of the instances, they pickle as a few large byte strings
+    return {name: bytes(blob) for name, blob in chunk.get_blobs().items()}
+
+
+def load_csv_chunks(database_class, filename, workers):
+    """
+    Parses a csv file in chunks across a pool of worker processes. The workers only parse the rows, the chunks are
+    merged into the database, and any instances built, in the calling process one chunk at a time.
+
+    :param database_class: NEODatabase or ColumnarNEODatabase class to load the rows into
+    :param filename: str representing the pathway of the csv file
+    :param workers: int representing the number of worker processes
+    :return: iterator of dicts of blob name to bytes-like object, one per chunk, in file order, see merge
+    """
+    # More chunks than workers evens out the load and bounds the text each worker holds at once
+    fieldnames, chunks = get_csv_chunks(filename, workers * 4)
+    if not chunks:
+        return
+
+    starts, ends = zip(*chunks)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in executor.map(load_csv_chunk, itertools.repeat(database_class), itertools.repeat(filename),
+                                  itertools.repeat(fieldnames), starts, ends):
+            yield chunk
+
+
+class SortedIndex(object):
+    """
+    Object representing a sorted secondary index from a numeric key to values, such as Near Earth Objects by
+    diameter. The keys and values are kept in two parallel lists sorted by key, so the values passing a
+    Filter.Operators operation are found with binary searches as one contiguous range.
+    """
+
+    def __init__(self, items):
+        """
+        :param items: iterable of (key, value) tuples, values with equal keys keep their order
+        """
+        items = sorted(items, key=operator.itemgetter(0))
+        self.keys = [key for key, _ in items]
+        self.values = [value for _, value in items]
+
+    def insert(self, key, value):
+        """
+        :param key: key of the value, after any values with an equal key
+        :param value: value to insert
+        :return: None
+        """
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.values.insert(index, value)
+
+    def get_range(self, operation, value):
+        """
+        :param operation: Filter.Operators function comparing a key to the value
+        :param value: value the keys are compared to
+        :return: tuple of the start and end position of the keys passing the operation, end exclusive
+        """
+        if operation is operator.gt:
+            return bisect.bisect_right(self.keys, value), len(self.keys)
+        if operation is operator.ge:
+            return bisect.bisect_left(self.keys, value), len(self.keys)
+        if operation is operator.eq:
+            return bisect.bisect_left(self.keys, value), bisect.bisect_right(self.keys, value)
+        if operation is operator.lt:
+            return 0, bisect.bisect_left(self.keys, value)
+        if operation is operator.le:
+            return 0, bisect.bisect_right(self.keys, value)
+
+        raise UnsupportedFeature
+
+    def count(self, operation, value):
+        """
+        :param operation: Filter.Operators function comparing a key to the value
+        :param value: value the keys are compared to
+        :return: int representing the number of values passing the operation
+        """
+        start, end = self.get_range(operation, value)
+        return max(end - start, 0)
+
+    def find(self, operation, value):
+        """
+        :param operation: Filter.Operators function comparing a key to the value
+        :param value: value the keys are compared to
+        :return: iterator of the values passing the operation, in key order
+        """
+        return map(self.values.__getitem__, range(*self.get_range(operation, value)))
+
+    def iter_groups(self, reverse=False):
+        """
+        :param reverse: bool representing if the keys are walked from the largest down
+        :return: iterator of (key, list of values) tuples, one per distinct key, values with equal keys in their order
+        """
+        if reverse:
+            items = zip(reversed(self.keys), reversed(self.values))
+        else:
+            items = zip(self.keys, self.values)
+        for key, group in itertools.groupby(items, key=operator.itemgetter(0)):
+            values = [value for _, value in group]
+            yield key, values[::-1] if reverse else values
 
 
 class NEODatabase(object):
     """
     Object to hold Near Earth Objects and their orbits.
 
-    To support optimized date searching, a dict mapping of all orbit date paths to the Near Earth Objects
-    recorded on a given day is maintained. Additionally, all unique instances of a Near Earth Object
+    To support optimized date searching, a dict mapping of the date ordinal of all orbit paths to the Near Earth
+    Objects recorded on a given day is maintained. Additionally, all unique instances of a Near Earth Object
     are contained in a dict mapping the Near Earth Object name to the NearEarthObject instance.
+
+    Date range searches use a sorted date index: a flat list of all OrbitPath instances ordered by close
+    approach date, the sorted list of distinct date ordinals and, for each ordinal, the offset of its first
+    OrbitPath in the flat list. A range is then answered with two binary searches and a slice.
+
+    Optionally, SortedIndex secondary indexes are kept on the diameter and hazard flag of every Near Earth Object and
+    on the miss distance and velocity of every OrbitPath, so the NEOSearcher can drive a search from a selective
+    filter instead of the date search, or walk a ranked search in key order.
+
+    Optionally, a ReservoirSample of the OrbitPaths is kept, a uniform sample of fixed size the NEOSearcher and
+    NEOAggregator estimate counts and aggregations from instead of reading every OrbitPath within the dates.
+
+    Optionally, the loaded state is kept in a binary Snapshot next to the csv file and read back instead of
+    parsing the csv file again while it is unchanged, and large csv files are parsed in chunks across a pool
+    of worker processes.
     """
 
-    def __init__(self, filename):
+    engine = DatabaseEngine.memory
+
+    # Fields of the NearEarthObject and OrbitPath instances kept in a Snapshot, along with the date ordinals
+    NEO_TEXT_FIELDS = ['id', 'neo_reference_id', 'name', 'nasa_jpl_url']
+    NEO_FLOAT_FIELDS = ['absolute_magnitude_h',
+                        'estimated_diameter_min_kilometers', 'estimated_diameter_max_kilometers']
+    ORBIT_TEXT_FIELDS = ['close_approach_date_full', 'orbiting_body']
+    ORBIT_FLOAT_FIELDS = ['kilometers_per_second', 'miss_distance_kilometers']
+
+    # Fields of the csv file read by NearEarthObject and OrbitPath, the other columns are skipped while parsing
+    CSV_FIELDS = NEO_TEXT_FIELDS + NEO_FLOAT_FIELDS + ['is_potentially_hazardous_asteroid'] + \
+        ['close_approach_date'] + ORBIT_TEXT_FIELDS + ORBIT_FLOAT_FIELDS
+
+    def __init__(self, filename, snapshot=False, workers=1, secondary_indexes=False, sample_size=0, stats=None):
         """
         :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :param snapshot: bool representing if loaded data should be cached in and read back from a Snapshot
+        :param workers: int representing the number of worker processes parsing the csv file, 1 parses it serially
+        :param secondary_indexes: bool representing if the diameter, hazard flag and miss distance are indexed
+        :param sample_size: int representing the number of OrbitPaths kept in a ReservoirSample, 0 keeps none
+        :param stats: NEOStats measuring the stages of load_data, or None to not measure them
         """
         # TODO: What data structures will be needed to store the NearEarthObjects and OrbitPaths?
         # TODO: Add relevant instance variables for this.
 
         self.filename = filename
+        self.snapshot = snapshot
+        self.workers = workers
+        self.use_secondary_indexes = secondary_indexes
+        self.sample_size = sample_size
+        self.stats = stats or NEOStats(enabled=False)
         self.neo_orbit_paths_date_to_neo = {}
         self.neo_name_to_instance = {}
 
+        # Sorted date index
+        self.orbit_paths = []
+        self.date_index_keys = []
+        self.date_index_offsets = [0]
+
+        # (name, close_approach_date_full) of every orbit held, only built once rows are ingested incrementally
+        self.orbit_keys = None
+
+        # Pathways of the partitions of partitioned data directories loaded, see load_partitions
+        self.partitions = set()
+
+        # Incremented whenever data is loaded or ingested, so results cached for older data can be dropped
+        self.generation = 0
+
+        # Filter option name to the SortedIndex of NearEarthObject instances for that option
+        self.secondary_indexes = {}
+
+        # ReservoirSample of the OrbitPath instances, if used
+        self.sample = None
+
     def load_data(self, filename=None):
         """
         Loads data from a .csv file, instantiating Near Earth Objects and their OrbitPaths by:
            - Storing a dict of orbit date to list of NearEarthObject instances
            - Storing a dict of the Near Earth Object name to the single instance of NearEarthObject
+           - Rebuilding the sorted date index over all OrbitPath instances
+           - Rebuilding the secondary indexes and the sample, if used
 
         :param filename: str representing the pathway of the filename containing the Near Earth Object data
         :return: None
@@ -39,25 +330,1479 @@ class NEODatabase(object):
 
         filename = filename or self.filename
 
+        # Read back the parsed state of an unchanged csv file, only an empty database can take a snapshot as is
+        use_snapshot = self.snapshot and not self.neo_name_to_instance
+        if use_snapshot:
+            with self.stats.time('load.snapshot') as stage:
+                loaded = self.load_snapshot(filename)
+                stage.add(rows_out=len(self.orbit_paths))
+            if loaded:
+                with self.stats.time('load.secondary_indexes'):
+                    self.build_secondary_indexes()
+                with self.stats.time('load.sample'):
+                    self.build_sample()
+                self.generation += 1
+                return None
+
+        # Loading into a database that already holds data skips the rows it holds instead of duplicating them
+        if self.neo_name_to_instance:
+            with self.stats.time('load.ingest') as stage:
+                stage.add(rows_out=self.ingest_file(filename))
+            return None
+
         # Load data from csv file
+        with self.stats.time('load.parse') as stage:
+            if self.workers > 1:
+                for chunk in load_csv_chunks(NEODatabase, filename, self.workers):
+                    self.merge(chunk)
+            else:
+                with open(filename) as csvfile:
+                    self.append_rows(read_csv_rows(csvfile, self.CSV_FIELDS))
+            stage.add(rows_out=len(self.orbit_paths))
+
+        with self.stats.time('load.date_index'):
+            self.build_date_index()
+        with self.stats.time('load.secondary_indexes'):
+            self.build_secondary_indexes()
+        with self.stats.time('load.sample'):
+            self.build_sample()
+        self.generation += 1
+
+        if use_snapshot:
+            with self.stats.time('load.save_snapshot'):
+                self.save_snapshot(filename)
+
+        return None
+
+    def append_rows(self, neo_orbit_paths):
+        """
+        Instantiates the Near Earth Objects and OrbitPaths of csv rows, without updating the sorted date index
+
+        :param neo_orbit_paths: iterable of dict csv rows
+        :return: None
+        """
+        for neo_orbit_path in neo_orbit_paths:
+            # Instantiate new Near Earth Object if not already exist
+            if neo_orbit_path['name'] in self.neo_name_to_instance:
+                neo = self.neo_name_to_instance[neo_orbit_path['name']]
+            else:
+                neo = NearEarthObject(**neo_orbit_path)
+                self.neo_name_to_instance[neo_orbit_path['name']] = neo
+
+            # Instantiate new orbit path
+            orbit = OrbitPath(neo, **neo_orbit_path)
+            if orbit.close_approach_ordinal in self.neo_orbit_paths_date_to_neo:
+                self.neo_orbit_paths_date_to_neo[orbit.close_approach_ordinal].append(neo)
+            else:
+                self.neo_orbit_paths_date_to_neo[orbit.close_approach_ordinal] = [neo]
+
+            # Add an orbit path information to a Near Earth Object list of orbits
+            neo.update_orbits(orbit)
+            self.orbit_paths.append(orbit)
+
+    def ingest(self, neo_orbit_paths):
+        """
+        Incrementally adds csv rows to the database, updating the date mapping, the Near Earth Objects and the sorted
+        date index in place instead of reloading. Orbits are keyed on their Near Earth Object name and
+        close_approach_date_full and rows already held are skipped, so applying the same rows again has no effect.
+
+        :param neo_orbit_paths: iterable of dict csv rows
+        :return: int representing the number of rows added
+        """
+        if self.orbit_keys is None:
+            self.orbit_keys = {(orbit.neo.name, orbit.close_approach_date_full) for orbit in self.orbit_paths}
+
+        new_rows = []
+        for neo_orbit_path in neo_orbit_paths:
+            key = (neo_orbit_path['name'], neo_orbit_path['close_approach_date_full'])
+            if key not in self.orbit_keys:
+                self.orbit_keys.add(key)
+                new_rows.append(neo_orbit_path)
+
+        # append_rows adds the new orbits at the end of the flat list, move them into their dates instead
+        neo_count, start = len(self.neo_name_to_instance), len(self.orbit_paths)
+        self.append_rows(new_rows)
+        new_orbits = self.orbit_paths[start:]
+        del self.orbit_paths[start:]
+        self.insert_into_date_index(new_orbits)
+
+        if self.secondary_indexes:
+            new_neos = itertools.islice(reversed(self.neo_name_to_instance.values()),
+                                        len(self.neo_name_to_instance) - neo_count)
+            for neo in reversed(list(new_neos)):
+                self.secondary_indexes['diameter'].insert(NearEarthObject.diameter(neo), neo)
+                self.secondary_indexes['is_hazardous'].insert(NearEarthObject.is_hazardous(neo), neo)
+            for orbit in new_orbits:
+                self.secondary_indexes['distance'].insert(OrbitPath.distance(orbit), orbit)
+                self.secondary_indexes['velocity'].insert(OrbitPath.velocity(orbit), orbit)
+        if self.sample is not None:
+            self.sample.add(new_orbits)
+
+        if new_rows:
+            self.generation += 1
+
+        return len(new_rows)
+
+    def ingest_file(self, filename):
+        """
+        Incrementally adds the rows of a .csv file to the database, see ingest
+
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: int representing the number of rows added
+        """
         with open(filename) as csvfile:
-            neo_orbit_paths = csv.DictReader(csvfile)
-            for neo_orbit_path in neo_orbit_paths:
-                # Instantiate new Near Earth Object if not already exist
-                if neo_orbit_path['name'] in self.neo_name_to_instance:
-                    neo = self.neo_name_to_instance[neo_orbit_path['name']]
-                else:
+            return self.ingest(read_csv_rows(csvfile, self.CSV_FIELDS))
+
+    def load_partitions(self, manifest, date_ranges=None):
+        """
+        Loads the partitions of a partitioned data directory holding close approaches within any of the date ranges,
+        skipping the partitions already loaded, so only the partitions a search needs are ever read. The Near Earth
+        Objects then only hold the orbits of the loaded partitions.
+
+        :param manifest: PartitionManifest of the partitioned data directory
+        :param date_ranges: list of (start date ordinal, end date ordinal) tuples, end inclusive, or None for all
+        :return: int representing the number of partitions loaded
+        """
+        partitions = [partition for partition in manifest.get_partitions(date_ranges)
+                      if manifest.get_path(partition) not in self.partitions]
+        rows = itertools.chain.from_iterable(manifest.iter_rows(partition, self.CSV_FIELDS)
+                                             for partition in partitions)
+
+        with self.stats.time('load.partitions') as stage:
+            if self.neo_name_to_instance:
+                stage.add(rows_out=self.ingest(rows))
+            else:
+                self.append_rows(rows)
+                self.build_date_index()
+                self.build_secondary_indexes()
+                self.build_sample()
+                self.generation += 1
+                stage.add(rows_out=len(self.orbit_paths))
+        self.partitions.update(map(manifest.get_path, partitions))
+
+        return len(partitions)
+
+    def load_snapshot(self, filename):
+        """
+        Restores the loaded state from the Snapshot of a csv file, see get_blobs. The NearEarthObject and OrbitPath
+        instances are rebuilt from typed columns, so a snapshot holds no code to run.
+
+        :param filename: str representing the pathway of the csv file
+        :return: bool representing if a current snapshot was found and restored
+        """
+        try:
+            with Snapshot(filename, self.engine).read() as blobs:
+                if blobs is None:
+                    return False
+                date_index_keys = array.array('l')
+                date_index_keys.frombytes(blobs['date_index_keys'])
+                date_index_offsets = array.array('l')
+                date_index_offsets.frombytes(blobs['date_index_offsets'])
+                self.merge(blobs)
+        except (OSError, ValueError, KeyError, IndexError):
+            self.neo_orbit_paths_date_to_neo = {}
+            self.neo_name_to_instance = {}
+            self.orbit_paths = []
+            return False
+
+        self.date_index_keys = date_index_keys.tolist()
+        self.date_index_offsets = date_index_offsets.tolist()
+
+        return True
+
+    def save_snapshot(self, filename):
+        """
+        Stores the loaded state in a Snapshot of a csv file, see get_blobs. The snapshot is only a cache, so failing
+        to write it does not fail the load.
+
+        :param filename: str representing the pathway of the csv file
+        :return: None
+        """
+        try:
+            Snapshot(filename, self.engine).write(self.get_blobs())
+        except OSError:
+            pass
+
+    def get_blobs(self):
+        """
+        Stores the Near Earth Objects and OrbitPaths as typed columns: the Near Earth Objects in load order, their
+        orbits grouped by Near Earth Object in the order of their list of orbits, the position of every orbit of the
+        flat list of OrbitPaths in those columns, and the date ordinal keys and offsets of the sorted date index.
+
+        :return: dict of blob name to bytes-like object
+        """
+        neos = list(self.neo_name_to_instance.values())
+        neo_ids = {id(neo): neo_id for neo_id, neo in enumerate(neos)}
+        orbits = [orbit for neo in neos for orbit in neo.orbits]
+        orbit_positions = {id(orbit): position for position, orbit in enumerate(orbits)}
+
+        blobs = {
+            'orbit_neo_ids': array.array('l', (neo_ids[id(orbit.neo)] for orbit in orbits)),
+            'orbit.close_approach_ordinal': array.array('l', (orbit.close_approach_ordinal for orbit in orbits)),
+            'orbit_positions': array.array('l', (orbit_positions[id(orbit)] for orbit in self.orbit_paths)),
+            'date_index_keys': array.array('l', self.date_index_keys),
+            'date_index_offsets': array.array('l', self.date_index_offsets),
+            'neo.is_potentially_hazardous_asteroid': bytes(map(NearEarthObject.is_hazardous, neos)),
+        }
+        for field in self.NEO_TEXT_FIELDS:
+            blobs[f'neo.{field}'] = '\0'.join(map(operator.attrgetter(field), neos)).encode()
+        for field in self.NEO_FLOAT_FIELDS:
+            blobs[f'neo.{field}'] = array.array('d', map(operator.attrgetter(field), neos))
+        for field in self.ORBIT_TEXT_FIELDS:
+            blobs[f'orbit.{field}'] = '\0'.join(map(operator.attrgetter(field), orbits)).encode()
+        for field in self.ORBIT_FLOAT_FIELDS:
+            blobs[f'orbit.{field}'] = array.array('d', map(operator.attrgetter(field), orbits))
+
+        return blobs
+
+    def merge(self, blobs):
+        """
+        Appends the Near Earth Objects and OrbitPaths stored in the blobs of another NEODatabase, see get_blobs,
+        in the order of its flat list of OrbitPaths, keeping the single NearEarthObject instance of every Near Earth
+        Object already held. Used to restore a Snapshot and to merge the chunks of a parallel load, without
+        updating the sorted date index.
+
+        :param blobs: dict of blob name to bytes-like object
+        :return: None
+        :raises ValueError: if the blobs do not hold columns of matching lengths
+        """
+        neo_fields = self.NEO_TEXT_FIELDS + self.NEO_FLOAT_FIELDS
+        orbit_fields = self.ORBIT_TEXT_FIELDS + self.ORBIT_FLOAT_FIELDS + ['close_approach_ordinal']
+        columns = {}
+        for name in ['orbit_neo_ids', 'orbit_positions', 'orbit.close_approach_ordinal']:
+            columns[name] = array.array('l')
+            columns[name].frombytes(blobs[name])
+        for name in [f'neo.{field}' for field in self.NEO_FLOAT_FIELDS] + \
+                    [f'orbit.{field}' for field in self.ORBIT_FLOAT_FIELDS]:
+            columns[name] = array.array('d')
+            columns[name].frombytes(blobs[name])
+        neo_is_hazardous = bytes(blobs['neo.is_potentially_hazardous_asteroid'])
+        for field in self.NEO_TEXT_FIELDS:
+            columns[f'neo.{field}'] = split_text(blobs[f'neo.{field}'], len(neo_is_hazardous))
+        for field in self.ORBIT_TEXT_FIELDS:
+            columns[f'orbit.{field}'] = split_text(blobs[f'orbit.{field}'], len(columns['orbit_neo_ids']))
+
+        neo_columns = [columns[f'neo.{field}'] for field in neo_fields] + [neo_is_hazardous]
+        orbit_columns = [columns['orbit_neo_ids']] + [columns[f'orbit.{field}'] for field in orbit_fields]
+        if len(set(map(len, neo_columns))) > 1 or len(set(map(len, orbit_columns + [columns['orbit_positions']]))) > 1:
+            raise ValueError('Columns of different lengths')
+
+        with gc_paused():
+            neos = []
+            for values in zip(*neo_columns):
+                neo_orbit_path = dict(zip(neo_fields, values))
+                neo = self.neo_name_to_instance.get(neo_orbit_path['name'])
+                if neo is None:
+                    neo_orbit_path['is_potentially_hazardous_asteroid'] = str(bool(values[-1]))
                     neo = NearEarthObject(**neo_orbit_path)
-                    self.neo_name_to_instance[neo_orbit_path['name']] = neo
+                    self.neo_name_to_instance[neo.name] = neo
+                neos.append(neo)
 
-                # Instantiate new orbit path
-                orbit = OrbitPath(neo.name, **neo_orbit_path)
-                if neo_orbit_path['close_approach_date'] in self.neo_orbit_paths_date_to_neo:
-                    self.neo_orbit_paths_date_to_neo[neo_orbit_path['close_approach_date']].append(neo)
-                else:
-                    self.neo_orbit_paths_date_to_neo[neo_orbit_path['close_approach_date']] = [neo]
+            orbits = []
+            for neo_id, *values in zip(*orbit_columns):
+                orbit = OrbitPath(neos[neo_id], **dict(zip(orbit_fields, values)))
+                neos[neo_id].update_orbits(orbit)
+                orbits.append(orbit)
 
-                # Add an orbit path information to a Near Earth Object list of orbits
-                neo.update_orbits(orbit)
+        for orbit in map(orbits.__getitem__, columns['orbit_positions']):
+            if orbit.close_approach_ordinal in self.neo_orbit_paths_date_to_neo:
+                self.neo_orbit_paths_date_to_neo[orbit.close_approach_ordinal].append(orbit.neo)
+            else:
+                self.neo_orbit_paths_date_to_neo[orbit.close_approach_ordinal] = [orbit.neo]
+            self.orbit_paths.append(orbit)
+
+    def build_date_index(self):
+        """
+        Sorts the flat list of OrbitPath instances by close approach date and rebuilds the date ordinal keys
+        and offsets. The sort is stable, so OrbitPaths on the same day keep their load order.
+
+        :return: None
+        """
+        self.orbit_paths.sort(key=operator.attrgetter('close_approach_ordinal'))
+
+        keys = []
+        offsets = []
+        previous_ordinal = None
+        for offset, orbit in enumerate(self.orbit_paths):
+            if orbit.close_approach_ordinal != previous_ordinal:
+                previous_ordinal = orbit.close_approach_ordinal
+                keys.append(previous_ordinal)
+                offsets.append(offset)
+        # Sentinel offset so the end of the last date can be read like any other
+        offsets.append(len(self.orbit_paths))
+
+        self.date_index_keys = keys
+        self.date_index_offsets = offsets
+
+    def insert_into_date_index(self, orbits):
+        """
+        Inserts OrbitPath instances into the sorted date index, after the OrbitPaths already held on the same day,
+        without sorting the OrbitPaths already held again.
+
+        :param orbits: list of OrbitPath instances to insert
+        :return: None
+        """
+        ordinal_to_orbits = defaultdict(list)
+        for orbit in orbits:
+            ordinal_to_orbits[orbit.close_approach_ordinal].append(orbit)
+
+        # Insert from the last date back so the offsets of the earlier dates still point at their OrbitPaths
+        keys, offsets = self.date_index_keys, self.date_index_offsets
+        for ordinal, date_orbits in sorted(ordinal_to_orbits.items(), reverse=True):
+            index = bisect.bisect_left(keys, ordinal)
+            if index == len(keys) or keys[index] != ordinal:
+                # New date, starting out empty where the next date starts
+                keys.insert(index, ordinal)
+                offsets.insert(index, offsets[index])
+            end = offsets[index + 1]
+            self.orbit_paths[end:end] = date_orbits
+
+        # Shift every offset by the number of OrbitPaths inserted into the earlier dates
+        shift = 0
+        for index, ordinal in enumerate(keys):
+            offsets[index] += shift
+            if ordinal in ordinal_to_orbits:
+                shift += len(ordinal_to_orbits[ordinal])
+        offsets[-1] += shift
+
+    def build_secondary_indexes(self):
+        """
+        Rebuilds the secondary indexes, if used, keyed by the Filter option and OrderBy names they serve. The
+        distance and velocity indexes hold one entry per OrbitPath.
+
+        :return: None
+        """
+        if not self.use_secondary_indexes:
+            return None
+
+        neos = self.neo_name_to_instance.values()
+        self.secondary_indexes = {
+            'diameter': SortedIndex((NearEarthObject.diameter(neo), neo) for neo in neos),
+            'is_hazardous': SortedIndex((NearEarthObject.is_hazardous(neo), neo) for neo in neos),
+            'distance': SortedIndex((OrbitPath.distance(orbit), orbit) for orbit in self.orbit_paths),
+            'velocity': SortedIndex((OrbitPath.velocity(orbit), orbit) for orbit in self.orbit_paths),
+        }
+
+    def build_sample(self):
+        """
+        Rebuilds the ReservoirSample of the OrbitPaths, if used
+
+        :return: None
+        """
+        if not self.sample_size:
+            return None
+
+        self.sample = ReservoirSample(self.sample_size)
+        self.sample.add(self.orbit_paths)
+
+    def get_orbit_position(self, orbit):
+        """
+        :param orbit: OrbitPath held in the sorted date index
+        :return: int representing the position of the OrbitPath in the flat list of the sorted date index
+        """
+        start, end = self.get_date_index_range(orbit.close_approach_ordinal, orbit.close_approach_ordinal)
+        return self.orbit_paths.index(orbit, start, end)
+
+    def get_date_index_range(self, start_ordinal, end_ordinal):
+        """
+        Finds the positions in the flat list of OrbitPath instances covering the inclusive ordinal range
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: tuple of the start and end position, end exclusive
+        """
+        start = bisect.bisect_left(self.date_index_keys, start_ordinal)
+        end = bisect.bisect_right(self.date_index_keys, end_ordinal)
+        return self.date_index_offsets[start], self.date_index_offsets[end]
+
+    def get_orbit_paths_between(self, start_ordinal, end_ordinal):
+        """
+        Finds all OrbitPath instances with a close approach date within the inclusive ordinal range
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: list of OrbitPath instances in close approach date order
+        """
+        start, end = self.get_date_index_range(start_ordinal, end_ordinal)
+        return self.orbit_paths[start:end]
+
+    def iter_orbit_paths_between(self, start_ordinal, end_ordinal):
+        """
+        Lazily iterates over the OrbitPath instances with a close approach date within the inclusive ordinal range
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of OrbitPath instances in close approach date order
+        """
+        return map(self.orbit_paths.__getitem__, range(*self.get_date_index_range(start_ordinal, end_ordinal)))
+
+    def iter_dates_between(self, start_ordinal, end_ordinal):
+        """
+        Lazily iterates over the dates within the inclusive ordinal range, one date of the sorted date index at a time
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of (date ordinal, list of the NearEarthObject of every OrbitPath on the date) tuples
+        """
+        start = bisect.bisect_left(self.date_index_keys, start_ordinal)
+        end = bisect.bisect_right(self.date_index_keys, end_ordinal)
+        get_neo = operator.attrgetter('neo')
+        for index in range(start, end):
+            orbits = self.orbit_paths[self.date_index_offsets[index]:self.date_index_offsets[index + 1]]
+            yield self.date_index_keys[index], list(map(get_neo, orbits))
+
+
+class ColumnarNEODatabase(object):
+    """
+    Object to hold Near Earth Objects and their orbits in contiguous columns.
+
+    Every unique Near Earth Object is keyed by an integer id, its position in the NEO columns, and every orbit is a
+    row in the orbit columns referencing its Near Earth Object by that id. Numeric fields are kept in array.array
+    columns so search filters can be evaluated as whole column comparisons, and NearEarthObject and OrbitPath
+    instances are only built for the results a search actually returns.
+
+    To support date searching, the orbit rows are indexed by close approach date ordinal in the same way as the
+    NEODatabase sorted date index. Optionally, the columns and indexes are kept in a binary Snapshot next to the csv
+    file and memory mapped back instead of parsing the csv file again while it is unchanged, and large csv files are
+    parsed in chunks across a pool of worker processes.
+    """
+
+    engine = DatabaseEngine.columnar
+
+    NEO_TEXT_FIELDS = ['id', 'neo_reference_id', 'name', 'nasa_jpl_url']
+    # Only the canonical units are stored, the models derive the other units on access
+    NEO_FLOAT_FIELDS = ['absolute_magnitude_h',
+                        'estimated_diameter_min_kilometers', 'estimated_diameter_max_kilometers']
+    ORBIT_TEXT_FIELDS = ['close_approach_date_full', 'orbiting_body']
+    ORBIT_FLOAT_FIELDS = ['kilometers_per_second', 'miss_distance_kilometers']
+
+    # Fields of the csv file stored in the columns, the other columns are skipped while parsing
+    CSV_FIELDS = NEO_TEXT_FIELDS + NEO_FLOAT_FIELDS + ['is_potentially_hazardous_asteroid'] + \
+        ['close_approach_date'] + ORBIT_TEXT_FIELDS + ORBIT_FLOAT_FIELDS
+
+    # Indexes built over the columns, the ones holding one item per orbit row and the ones holding one per NEO
+    ORBIT_INDEX_COLUMNS = ['date_index_rows', 'date_index_keys', 'neo_orbit_rows']
+    NEO_INDEX_COLUMNS = ['neo_orbit_offsets', 'neo_miss_distance_min', 'neo_miss_distance_max']
+
+    def __init__(self, filename, snapshot=False, workers=1, stats=None):
+        """
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :param snapshot: bool representing if loaded data should be cached in and read back from a Snapshot
+        :param workers: int representing the number of worker processes parsing the csv file, 1 parses it serially
+        :param stats: NEOStats measuring the stages of load_data, or None to not measure them
+        """
+        self.filename = filename
+        self.snapshot = snapshot
+        self.workers = workers
+        self.stats = stats or NEOStats(enabled=False)
+        self.neo_name_to_id = {}
+
+        # Near Earth Object columns, indexed by NEO id
+        self.neo_columns = {field: [] for field in self.NEO_TEXT_FIELDS}
+        self.neo_columns.update({field: array.array('d') for field in self.NEO_FLOAT_FIELDS})
+        self.neo_is_hazardous = bytearray()
+
+        # Orbit columns, indexed by orbit row
+        self.orbit_columns = {field: [] for field in self.ORBIT_TEXT_FIELDS}
+        self.orbit_columns.update({field: array.array('d') for field in self.ORBIT_FLOAT_FIELDS})
+        self.orbit_neo_ids = array.array('l')
+        self.orbit_date_ordinals = array.array('l')
+
+        # Orbit rows sorted by close approach date, with their date ordinals for binary search
+        self.date_index_rows = array.array('l')
+        self.date_index_keys = array.array('l')
+
+        # Orbit rows grouped by NEO id, the orbits of NEO i are neo_orbit_rows[offsets[i]:offsets[i + 1]]
+        self.neo_orbit_rows = array.array('l')
+        self.neo_orbit_offsets = array.array('l', [0])
+
+        # Smallest and largest miss distance of each NEO over all of its orbits
+        self.neo_miss_distance_min = array.array('d')
+        self.neo_miss_distance_max = array.array('d')
+
+        # (name, close_approach_date_full) of every orbit row, only built once rows are ingested incrementally
+        self.orbit_keys = None
+
+        # Pathways of the partitions of partitioned data directories loaded, see load_partitions
+        self.partitions = set()
+
+        # Incremented whenever data is loaded or ingested, so results cached for older data can be dropped
+        self.generation = 0
+
+    def load_data(self, filename=None):
+        """
+        Loads data from a .csv file into the NEO and orbit columns, then rebuilds the date and NEO indexes
+
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: None
+        """
+        if not (filename or self.filename):
+            raise Exception('Cannot load data, no filename provided')
+
+        filename = filename or self.filename
+
+        # Read back the columns of an unchanged csv file, only an empty database can take a snapshot as is
+        use_snapshot = self.snapshot and not self.neo_name_to_id
+        if use_snapshot:
+            with self.stats.time('load.snapshot') as stage:
+                loaded = self.load_snapshot(filename)
+                stage.add(rows_out=len(self.orbit_neo_ids))
+            if loaded:
+                self.generation += 1
+                return None
+
+        # Loading into a database that already holds data skips the rows it holds instead of duplicating them
+        if self.neo_name_to_id:
+            with self.stats.time('load.ingest') as stage:
+                stage.add(rows_out=self.ingest_file(filename))
+            return None
+
+        with self.stats.time('load.parse') as stage:
+            if self.workers > 1:
+                for chunk in load_csv_chunks(ColumnarNEODatabase, filename, self.workers):
+                    self.merge(chunk)
+            else:
+                with open(filename) as csvfile:
+                    self.append_rows(read_csv_rows(csvfile, self.CSV_FIELDS))
+            stage.add(rows_out=len(self.orbit_neo_ids))
+
+        with self.stats.time('load.indexes'):
+            self.build_indexes()
+        self.generation += 1
+
+        if use_snapshot:
+            with self.stats.time('load.save_snapshot'):
+                self.save_snapshot(filename)
 
         return None
+
+    def append_rows(self, rows):
+        """
+        Appends csv rows to the NEO and orbit columns, without updating the indexes
+
+        :param rows: iterable of dict csv rows
+        :return: None
+        """
+        for row in rows:
+            neo_id = self.neo_name_to_id.get(row['name'])
+            if neo_id is None:
+                neo_id = len(self.neo_name_to_id)
+                self.neo_name_to_id[row['name']] = neo_id
+                for field in self.NEO_TEXT_FIELDS:
+                    self.neo_columns[field].append(row[field])
+                for field in self.NEO_FLOAT_FIELDS:
+                    self.neo_columns[field].append(float(row[field]))
+                self.neo_is_hazardous.append(row['is_potentially_hazardous_asteroid'] == 'True')
+
+            self.orbit_neo_ids.append(neo_id)
+            self.orbit_date_ordinals.append(date_to_ordinal(row['close_approach_date']))
+            self.orbit_columns['close_approach_date_full'].append(row['close_approach_date_full'])
+            self.orbit_columns['orbiting_body'].append(sys.intern(row['orbiting_body']))
+            for field in self.ORBIT_FLOAT_FIELDS:
+                self.orbit_columns[field].append(float(row[field]))
+
+    def merge(self, blobs):
+        """
+        Appends the rows stored in the blobs of an unindexed ColumnarNEODatabase, see get_blobs, in their load order,
+        keeping the single NEO id of every Near Earth Object already held
+
+        :param blobs: dict of blob name to bytes-like object holding rows loaded after the rows of this database
+        :return: None
+        """
+        chunk = ColumnarNEODatabase(filename=None)
+        chunk.set_blobs(blobs, indexed=False)
+
+        # Map the NEO ids of the chunk onto the NEO ids of this database
+        chunk_neo_ids = array.array('l')
+        for chunk_neo_id, name in enumerate(chunk.neo_columns['name']):
+            neo_id = self.neo_name_to_id.get(name)
+            if neo_id is None:
+                neo_id = len(self.neo_name_to_id)
+                self.neo_name_to_id[name] = neo_id
+                for field in self.NEO_TEXT_FIELDS + self.NEO_FLOAT_FIELDS:
+                    self.neo_columns[field].append(chunk.neo_columns[field][chunk_neo_id])
+                self.neo_is_hazardous.append(chunk.neo_is_hazardous[chunk_neo_id])
+            chunk_neo_ids.append(neo_id)
+
+        self.orbit_neo_ids.extend(map(chunk_neo_ids.__getitem__, chunk.orbit_neo_ids))
+        self.orbit_date_ordinals.extend(chunk.orbit_date_ordinals)
+        self.orbit_columns['close_approach_date_full'].extend(chunk.orbit_columns['close_approach_date_full'])
+        self.orbit_columns['orbiting_body'].extend(chunk.orbit_columns['orbiting_body'])
+        for field in self.ORBIT_FLOAT_FIELDS:
+            self.orbit_columns[field].extend(chunk.orbit_columns[field])
+
+    def ingest(self, rows):
+        """
+        Incrementally adds csv rows to the columns and updates the indexes in place instead of rebuilding them.
+        Orbit rows are keyed on their Near Earth Object name and close_approach_date_full and rows already held are
+        skipped, so applying the same rows again has no effect.
+
+        :param rows: iterable of dict csv rows
+        :return: int representing the number of rows added
+        """
+        names = self.neo_columns['name']
+        if self.orbit_keys is None:
+            self.orbit_keys = set(zip(map(names.__getitem__, self.orbit_neo_ids),
+                                      self.orbit_columns['close_approach_date_full']))
+
+        new_rows = []
+        for row in rows:
+            key = (row['name'], row['close_approach_date_full'])
+            if key not in self.orbit_keys:
+                self.orbit_keys.add(key)
+                new_rows.append(row)
+
+        neo_count, start = len(self.neo_name_to_id), len(self.orbit_neo_ids)
+        self.append_rows(new_rows)
+        self.insert_into_indexes(neo_count, start)
+
+        if new_rows:
+            self.generation += 1
+
+        return len(new_rows)
+
+    def ingest_file(self, filename):
+        """
+        Incrementally adds the rows of a .csv file to the columns, see ingest
+
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: int representing the number of rows added
+        """
+        with open(filename) as csvfile:
+            return self.ingest(read_csv_rows(csvfile, self.CSV_FIELDS))
+
+    def load_partitions(self, manifest, date_ranges=None):
+        """
+        Loads the partitions of a partitioned data directory holding close approaches within any of the date ranges
+        into the columns, see NEODatabase.load_partitions
+
+        :param manifest: PartitionManifest of the partitioned data directory
+        :param date_ranges: list of (start date ordinal, end date ordinal) tuples, end inclusive, or None for all
+        :return: int representing the number of partitions loaded
+        """
+        partitions = [partition for partition in manifest.get_partitions(date_ranges)
+                      if manifest.get_path(partition) not in self.partitions]
+        rows = itertools.chain.from_iterable(manifest.iter_rows(partition, self.CSV_FIELDS)
+                                             for partition in partitions)
+
+        with self.stats.time('load.partitions') as stage:
+            if self.neo_name_to_id:
+                stage.add(rows_out=self.ingest(rows))
+            else:
+                self.append_rows(rows)
+                self.build_indexes()
+                self.generation += 1
+                stage.add(rows_out=len(self.orbit_neo_ids))
+        self.partitions.update(map(manifest.get_path, partitions))
+
+        return len(partitions)
+
+    def insert_into_indexes(self, neo_count, start):
+        """
+        Inserts the orbit rows appended after the indexes were last built into the date index, the grouping of
+        orbit rows by NEO and the per NEO miss distance bounds
+
+        :param neo_count: int representing the number of NEO ids held when the indexes were last built
+        :param start: int representing the first orbit row appended since
+        :return: None
+        """
+        miss_distances = self.orbit_columns['miss_distance_kilometers']
+        new_rows = range(start, len(self.orbit_neo_ids))
+
+        # Later rows go after the rows already held on the same day
+        for row in new_rows:
+            position = bisect.bisect_right(self.date_index_keys, self.orbit_date_ordinals[row])
+            self.date_index_keys.insert(position, self.orbit_date_ordinals[row])
+            self.date_index_rows.insert(position, row)
+
+        # New NEOs start out without orbits or miss distance bounds
+        for neo_id in range(neo_count, len(self.neo_name_to_id)):
+            self.neo_orbit_offsets.append(self.neo_orbit_offsets[-1])
+            self.neo_miss_distance_min.append(math.inf)
+            self.neo_miss_distance_max.append(-math.inf)
+
+        # Insert from the last NEO id back so the offsets read for the earlier NEO ids are still the old ones
+        new_rows_per_neo = [0] * len(self.neo_name_to_id)
+        for row in sorted(new_rows, key=lambda row: (self.orbit_neo_ids[row], row), reverse=True):
+            neo_id = self.orbit_neo_ids[row]
+            self.neo_orbit_rows.insert(self.neo_orbit_offsets[neo_id + 1], row)
+            new_rows_per_neo[neo_id] += 1
+            self.neo_miss_distance_min[neo_id] = min(self.neo_miss_distance_min[neo_id], miss_distances[row])
+            self.neo_miss_distance_max[neo_id] = max(self.neo_miss_distance_max[neo_id], miss_distances[row])
+        self.neo_orbit_offsets = array.array('l', itertools.accumulate(
+            itertools.chain([0], map(operator.add, self.get_orbit_counts(), new_rows_per_neo))
+        ))
+
+    def get_orbit_counts(self):
+        """
+        :return: iterator of the number of orbit rows of each NEO id according to the NEO offsets
+        """
+        return map(operator.sub, self.neo_orbit_offsets[1:], self.neo_orbit_offsets)
+
+    def get_array_columns(self):
+        """
+        :return: dict of name to every array.array column and index
+        """
+        columns = {f'neo.{field}': self.neo_columns[field] for field in self.NEO_FLOAT_FIELDS}
+        columns.update({f'orbit.{field}': self.orbit_columns[field] for field in self.ORBIT_FLOAT_FIELDS})
+        columns.update({
+            'orbit_neo_ids': self.orbit_neo_ids,
+            'orbit_date_ordinals': self.orbit_date_ordinals,
+            'date_index_rows': self.date_index_rows,
+            'date_index_keys': self.date_index_keys,
+            'neo_orbit_rows': self.neo_orbit_rows,
+            'neo_orbit_offsets': self.neo_orbit_offsets,
+            'neo_miss_distance_min': self.neo_miss_distance_min,
+            'neo_miss_distance_max': self.neo_miss_distance_max,
+        })
+        return columns
+
+    def load_snapshot(self, filename):
+        """
+        Restores the columns and indexes from the Snapshot of a csv file, see set_blobs
+
+        :param filename: str representing the pathway of the csv file
+        :return: bool representing if a current snapshot was found and restored
+        """
+        try:
+            with Snapshot(filename, self.engine).read() as blobs:
+                if blobs is None:
+                    return False
+                self.set_blobs(blobs)
+        except (OSError, ValueError, KeyError):
+            return False
+
+        return True
+
+    def save_snapshot(self, filename):
+        """
+        Stores the columns and indexes in a Snapshot of a csv file. The snapshot is only a cache, so failing to
+        write it does not fail the load.
+
+        :param filename: str representing the pathway of the csv file
+        :return: None
+        """
+        try:
+            Snapshot(filename, self.engine).write(self.get_blobs())
+        except OSError:
+            pass
+
+    def get_blobs(self):
+        """
+        :return: dict of blob name to bytes-like object of every column and index, text columns NUL separated
+        """
+        blobs = dict(self.get_array_columns())
+        blobs['neo_is_hazardous'] = self.neo_is_hazardous
+        for field in self.NEO_TEXT_FIELDS:
+            blobs[f'neo.{field}'] = '\0'.join(self.neo_columns[field]).encode()
+        for field in self.ORBIT_TEXT_FIELDS:
+            blobs[f'orbit.{field}'] = '\0'.join(self.orbit_columns[field]).encode()
+
+        return blobs
+
+    def set_blobs(self, blobs, indexed=True):
+        """
+        Replaces the columns and indexes with the ones stored in blobs, see get_blobs. Array columns are copied
+        straight out of the blobs and text columns are split from a single NUL separated string. Nothing is replaced
+        if the blobs cannot be read.
+
+        :param blobs: dict of blob name to bytes-like object
+        :param indexed: bool representing if the blobs hold built indexes to check against the columns
+        :return: None
+        :raises ValueError: if a blob does not hold whole array items or a column does not hold one item per row
+        :raises KeyError: if a blob is missing
+        """
+        restored = {}
+        for name, column in self.get_array_columns().items():
+            restored[name] = array.array(column.typecode)
+            restored[name].frombytes(blobs[name])
+        neo_is_hazardous = bytearray(blobs['neo_is_hazardous'])
+        texts = {}
+        for field in self.NEO_TEXT_FIELDS:
+            texts[f'neo.{field}'] = split_text(blobs[f'neo.{field}'], len(neo_is_hazardous))
+        for field in self.ORBIT_TEXT_FIELDS:
+            texts[f'orbit.{field}'] = split_text(blobs[f'orbit.{field}'], len(restored['orbit_neo_ids']))
+
+        # Every column is read by row number, so a truncated or mismatched one would fail or mix rows up much later
+        neo_count, orbit_count = len(neo_is_hazardous), len(restored['orbit_neo_ids'])
+        lengths = {name: len(column) for name, column in itertools.chain(restored.items(), texts.items())
+                   if indexed or name not in self.ORBIT_INDEX_COLUMNS + self.NEO_INDEX_COLUMNS}
+        expected = {name: orbit_count if name.startswith('orbit') or name in self.ORBIT_INDEX_COLUMNS else neo_count
+                    for name in lengths}
+        if indexed:
+            expected['neo_orbit_offsets'] = neo_count + 1
+        for name, length in lengths.items():
+            if length != expected[name]:
+                raise ValueError(f'Snapshot column {name} holds {length} rows instead of {expected[name]}')
+
+        for name, column in restored.items():
+            kind, _, field = name.partition('.')
+            if kind == 'neo' and field:
+                self.neo_columns[field] = column
+            elif kind == 'orbit' and field:
+                self.orbit_columns[field] = column
+            else:
+                setattr(self, name, column)
+        for field in self.NEO_TEXT_FIELDS:
+            self.neo_columns[field] = texts[f'neo.{field}']
+        for field in self.ORBIT_TEXT_FIELDS:
+            self.orbit_columns[field] = texts[f'orbit.{field}']
+        self.orbit_columns['orbiting_body'] = list(map(sys.intern, self.orbit_columns['orbiting_body']))
+        self.neo_is_hazardous = neo_is_hazardous
+        self.neo_name_to_id = {name: neo_id for neo_id, name in enumerate(self.neo_columns['name'])}
+
+    def build_indexes(self):
+        """
+        Rebuilds the date index, the grouping of orbit rows by NEO and the per NEO miss distance bounds
+
+        :return: None
+        """
+        ordinals = self.orbit_date_ordinals
+        self.date_index_rows = array.array('l', sorted(range(len(ordinals)), key=ordinals.__getitem__))
+        self.date_index_keys = array.array('l', map(ordinals.__getitem__, self.date_index_rows))
+
+        neo_ids = self.orbit_neo_ids
+        self.neo_orbit_rows = array.array('l', sorted(range(len(neo_ids)), key=neo_ids.__getitem__))
+        counts = [0] * (len(self.neo_name_to_id) + 1)
+        for neo_id in neo_ids:
+            counts[neo_id + 1] += 1
+        self.neo_orbit_offsets = array.array('l', itertools.accumulate(counts))
+
+        miss_distances = self.orbit_columns['miss_distance_kilometers']
+        self.neo_miss_distance_min = array.array('d')
+        self.neo_miss_distance_max = array.array('d')
+        for neo_id in range(len(self.neo_name_to_id)):
+            rows = self.neo_orbit_rows[self.neo_orbit_offsets[neo_id]:self.neo_orbit_offsets[neo_id + 1]]
+            distances = list(map(miss_distances.__getitem__, rows))
+            self.neo_miss_distance_min.append(min(distances))
+            self.neo_miss_distance_max.append(max(distances))
+
+    def iter_rows_between(self, start_ordinal, end_ordinal):
+        """
+        Lazily iterates over the orbit rows with a close approach date within the inclusive ordinal range
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of orbit rows in close approach date order
+        """
+        start = bisect.bisect_left(self.date_index_keys, start_ordinal)
+        end = bisect.bisect_right(self.date_index_keys, end_ordinal)
+        return map(self.date_index_rows.__getitem__, range(start, end))
+
+    def iter_dates_between(self, start_ordinal, end_ordinal):
+        """
+        Lazily iterates over the dates within the inclusive ordinal range, one date of the date index at a time
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of (date ordinal, list of the NEO id of every orbit row on the date) tuples
+        """
+        start = bisect.bisect_left(self.date_index_keys, start_ordinal)
+        end = bisect.bisect_right(self.date_index_keys, end_ordinal)
+        while start < end:
+            ordinal = self.date_index_keys[start]
+            date_end = bisect.bisect_right(self.date_index_keys, ordinal, start, end)
+            yield ordinal, list(map(self.orbit_neo_ids.__getitem__, self.date_index_rows[start:date_end]))
+            start = date_end
+
+    def get_neo_mask(self, filter):
+        """
+        Evaluates a Filter over the NEO columns in one pass
+
+        A NEO passes the distance filter when any of its orbits does, like Filter.apply, which for ordering
+        operations only depends on the smallest or largest miss distance of the NEO.
+
+        :param filter: Filter to evaluate
+        :return: bytes with one entry per NEO id, non-zero if the NEO passes the filter
+        """
+        if filter.field == 'is_hazardous':
+            column = self.neo_is_hazardous
+        elif filter.field == 'diameter':
+            column = self.neo_columns['estimated_diameter_min_kilometers']
+        elif filter.operation in (operator.gt, operator.ge):
+            column = self.neo_miss_distance_max
+        elif filter.operation in (operator.lt, operator.le):
+            column = self.neo_miss_distance_min
+        else:
+            miss_distances = self.orbit_columns['miss_distance_kilometers']
+            row_mask = map(filter.operation, miss_distances, itertools.repeat(filter.value))
+            mask = bytearray(len(self.neo_name_to_id))
+            for neo_id in itertools.compress(self.orbit_neo_ids, row_mask):
+                mask[neo_id] = True
+            return bytes(mask)
+
+        return bytes(map(filter.operation, column, itertools.repeat(filter.value)))
+
+    def get_orbit_mask(self, filter):
+        """
+        Evaluates a Filter on the OrbitPath of an OrbitPath search over the orbit columns in one pass
+
+        :param filter: Filter to evaluate, on the miss distance
+        :return: bytes with one entry per orbit row, non-zero if the orbit passes the filter
+        """
+        if filter.field != 'distance':
+            raise UnsupportedFeature
+
+        miss_distances = self.orbit_columns['miss_distance_kilometers']
+        return bytes(map(filter.operation, miss_distances, itertools.repeat(filter.value)))
+
+    def get_near_earth_object(self, neo_id):
+        """
+        Builds the NearEarthObject instance of a NEO id along with all of its OrbitPath instances
+
+        :param neo_id: int representing the NEO id
+        :return: NearEarthObject
+        """
+        kwargs = {field: self.neo_columns[field][neo_id] for field in self.NEO_TEXT_FIELDS + self.NEO_FLOAT_FIELDS}
+        kwargs['is_potentially_hazardous_asteroid'] = str(bool(self.neo_is_hazardous[neo_id]))
+        neo = NearEarthObject(**kwargs)
+
+        for row in self.neo_orbit_rows[self.neo_orbit_offsets[neo_id]:self.neo_orbit_offsets[neo_id + 1]]:
+            neo.update_orbits(self.get_orbit_path(row, neo))
+
+        return neo
+
+    def get_orbit_path(self, row, neo):
+        """
+        Builds the OrbitPath instance of an orbit row
+
+        :param row: int representing the orbit row
+        :param neo: NearEarthObject the orbit belongs to
+        :return: OrbitPath
+        """
+        kwargs = {field: self.orbit_columns[field][row] for field in self.ORBIT_TEXT_FIELDS + self.ORBIT_FLOAT_FIELDS}
+        kwargs['close_approach_ordinal'] = self.orbit_date_ordinals[row]
+        return OrbitPath(neo, **kwargs)
+
+    def get_orbit_paths(self, rows):
+        """
+        Lazily builds the OrbitPath instances of orbit rows, found among the orbits of their NearEarthObject
+        instance, which is built once for all the rows of a NEO id
+
+        :param rows: iterable of int representing orbit rows
+        :return: iterator of OrbitPath instances
+        """
+        neos = {}
+        for row in rows:
+            neo_id = self.orbit_neo_ids[row]
+            neo = neos.get(neo_id)
+            if neo is None:
+                neo = neos[neo_id] = self.get_near_earth_object(neo_id)
+            start, end = self.neo_orbit_offsets[neo_id], self.neo_orbit_offsets[neo_id + 1]
+            yield neo.orbits[self.neo_orbit_rows.index(row, start, end) - start]
+
+
+class SQLiteNEODatabase(object):
+    """
+    Object to hold Near Earth Objects and their orbits in a local SQLite file, which persists across processes and
+    is not limited by memory.
+
+    Every unique Near Earth Object is a row of the neo table keyed by its NEO id and every orbit a row of the orbit
+    table referencing it, in load order. Close approach dates are stored as date ordinals. The orbit table is indexed
+    on close approach date, NEO id and miss distance, and the neo table on name and diameter, along with the smallest
+    and largest miss distance of every NEO. Searches push their date search and filters down into one SQL query, see
+    get_filter_sql, and NearEarthObject and OrbitPath instances are only built for the results a search returns.
+
+    The file records every csv file loaded into it, with its size and modification time. Loading an unchanged csv
+    file again reads nothing, and a csv file that grew since it was loaded is ingested, adding only its new rows.
+
+    The one connection is shared by every thread using the database, such as the threads of a NEOServer, and every
+    use of it holds a lock, so a load or ingest never interleaves with the statements of a search. Lazy searches
+    fetch their rows FETCH_SIZE at a time, holding the lock only while fetching.
+    """
+
+    engine = DatabaseEngine.sqlite
+
+    NEO_TEXT_FIELDS = ['id', 'neo_reference_id', 'name', 'nasa_jpl_url']
+    NEO_FLOAT_FIELDS = ['absolute_magnitude_h',
+                        'estimated_diameter_min_kilometers', 'estimated_diameter_max_kilometers']
+    ORBIT_TEXT_FIELDS = ['close_approach_date_full', 'orbiting_body']
+    ORBIT_FLOAT_FIELDS = ['kilometers_per_second', 'miss_distance_kilometers']
+
+    # Fields of the csv file stored in the tables, the other columns are skipped while parsing
+    CSV_FIELDS = NEO_TEXT_FIELDS + NEO_FLOAT_FIELDS + ['is_potentially_hazardous_asteroid'] + \
+        ['close_approach_date'] + ORBIT_TEXT_FIELDS + ORBIT_FLOAT_FIELDS
+
+    TABLES = [
+        'CREATE TABLE IF NOT EXISTS source (filename TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER)',
+        'CREATE TABLE IF NOT EXISTS neo (neo_id INTEGER PRIMARY KEY, id TEXT, neo_reference_id TEXT, '
+        'name TEXT NOT NULL, nasa_jpl_url TEXT, absolute_magnitude_h REAL, estimated_diameter_min_kilometers REAL, '
+        'estimated_diameter_max_kilometers REAL, is_potentially_hazardous_asteroid INTEGER, '
+        'miss_distance_min REAL, miss_distance_max REAL)',
+        'CREATE TABLE IF NOT EXISTS orbit (orbit_id INTEGER PRIMARY KEY, neo_id INTEGER NOT NULL, '
+        'close_approach_date INTEGER NOT NULL, close_approach_date_full TEXT, orbiting_body TEXT, '
+        'kilometers_per_second REAL, miss_distance_kilometers REAL)',
+    ]
+
+    # Created once the rows of a new file are inserted, which is faster than updating them on every insert. The
+    # orbit id is the rowid, so orbits with equal keys are in load order within every index.
+    INDEXES = [
+        'CREATE UNIQUE INDEX IF NOT EXISTS neo_name ON neo (name)',
+        'CREATE INDEX IF NOT EXISTS neo_diameter ON neo (estimated_diameter_min_kilometers)',
+        'CREATE INDEX IF NOT EXISTS orbit_date ON orbit (close_approach_date)',
+        'CREATE INDEX IF NOT EXISTS orbit_neo ON orbit (neo_id)',
+        'CREATE INDEX IF NOT EXISTS orbit_miss_distance ON orbit (miss_distance_kilometers)',
+    ]
+
+    SQL_OPERATORS = {
+        operator.gt: '>',
+        operator.ge: '>=',
+        operator.eq: '=',
+        operator.lt: '<',
+        operator.le: '<=',
+    }
+
+    # Rows inserted per executemany call while loading
+    BATCH_SIZE = 10000
+    # Rows fetched per lock acquisition while a lazy search is consumed
+    FETCH_SIZE = 256
+
+    def __init__(self, filename, path=None, stats=None):
+        """
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :param path: str representing the pathway of the SQLite file, defaults to the csv file name with a .sqlite
+                     suffix
+        :param stats: NEOStats measuring the stages of load_data, or None to not measure them
+        """
+        self.filename = filename
+        self.path = path or f'{filename}.sqlite'
+        self.stats = stats or NEOStats(enabled=False)
+        self.connection = None
+        # Guards every use of the connection, reentrant as loads and ingests call the methods using it
+        self.lock = threading.RLock()
+
+        # Incremented whenever data is loaded or ingested, so results cached for older data can be dropped
+        self.generation = 0
+
+    def connect(self):
+        """
+        Opens the SQLite file and creates its tables, once. The connection is shared by the threads using the
+        database, so it must only be used while holding the lock, see execute and iter_execute.
+
+        :return: sqlite3.Connection
+        """
+        with self.lock:
+            if self.connection is None:
+                self.connection = sqlite3.connect(self.path, check_same_thread=False)
+                with self.connection:
+                    for table in self.TABLES:
+                        self.connection.execute(table)
+
+        return self.connection
+
+    def close(self):
+        """
+        :return: None
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def execute(self, sql, parameters=()):
+        """
+        :param sql: str representing the SQL statement to run
+        :param parameters: sequence of the parameters of the statement
+        :return: list of the tuple rows of the statement
+        """
+        with self.lock:
+            return self.connect().execute(sql, parameters).fetchall()
+
+    def iter_execute(self, sql, parameters=()):
+        """
+        Lazily iterates over the rows of a SQL statement, fetched FETCH_SIZE rows at a time as they are consumed
+
+        :param sql: str representing the SQL statement to run
+        :param parameters: sequence of the parameters of the statement
+        :return: generator of tuple rows
+        """
+        with self.lock:
+            cursor = self.connect().execute(sql, parameters)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def load_data(self, filename=None):
+        """
+        Loads data from a .csv file into the tables and creates the indexes, unless the SQLite file already holds the
+        csv file as it is
+
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: None
+        """
+        if not (filename or self.filename):
+            raise Exception('Cannot load data, no filename provided')
+
+        filename = filename or self.filename
+        with self.lock:
+            connection = self.connect()
+
+            stat = os.stat(filename)
+            source = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+            if connection.execute('SELECT filename, size, mtime_ns FROM source WHERE filename = ?',
+                                  source[:1]).fetchone() == source:
+                self.generation += 1
+                return None
+
+            # Loading into a file that already holds data skips the rows it holds instead of duplicating them
+            if connection.execute('SELECT 1 FROM neo LIMIT 1').fetchone() is not None:
+                with self.stats.time('load.ingest') as stage:
+                    stage.add(rows_out=self.ingest_file(filename))
+            else:
+                with connection:
+                    with self.stats.time('load.parse') as stage:
+                        with open(filename) as csvfile:
+                            stage.add(rows_out=self.append_rows(read_csv_rows(csvfile, self.CSV_FIELDS)))
+                    with self.stats.time('load.indexes'):
+                        self.build_indexes()
+                self.generation += 1
+
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO source VALUES (?, ?, ?)', source)
+
+            return None
+
+    def append_rows(self, rows, skip_held=False):
+        """
+        Inserts csv rows into the tables in batches, without updating the per NEO miss distance bounds
+
+        :param rows: iterable of dict csv rows
+        :param skip_held: bool representing if rows whose NEO name and close_approach_date_full are held are skipped
+        :return: int representing the number of rows inserted
+        """
+        with self.lock:
+            connection = self.connect()
+            neo_name_to_id = dict(connection.execute('SELECT name, neo_id FROM neo'))
+            orbit_sql = 'INSERT INTO orbit VALUES (NULL, ?, ?, ?, ?, ?, ?)'
+            if skip_held:
+                # Also skips the repeated rows of the csv rows themselves, as the orbits are inserted one at a time
+                orbit_sql = ('INSERT INTO orbit SELECT NULL, ?1, ?2, ?3, ?4, ?5, ?6 WHERE NOT EXISTS '
+                             '(SELECT 1 FROM orbit WHERE neo_id = ?1 AND close_approach_date_full = ?3)')
+
+            inserted = 0
+            for batch in iter(lambda: list(itertools.islice(rows, self.BATCH_SIZE)), []):
+                neos, orbits = [], []
+                for row in batch:
+                    neo_id = neo_name_to_id.get(row['name'])
+                    if neo_id is None:
+                        neo_id = neo_name_to_id[row['name']] = len(neo_name_to_id)
+                        neos.append([neo_id] + [row[field] for field in self.NEO_TEXT_FIELDS] +
+                                    [float(row[field]) for field in self.NEO_FLOAT_FIELDS] +
+                                    [row['is_potentially_hazardous_asteroid'] == 'True'])
+
+                    orbits.append([neo_id, date_to_ordinal(row['close_approach_date'])] +
+                                  [row[field] for field in self.ORBIT_TEXT_FIELDS] +
+                                  [float(row[field]) for field in self.ORBIT_FLOAT_FIELDS])
+
+                connection.executemany('INSERT INTO neo VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)', neos)
+                changes = connection.total_changes
+                connection.executemany(orbit_sql, orbits)
+                inserted += connection.total_changes - changes
+
+            return inserted
+
+    def ingest(self, rows):
+        """
+        Incrementally adds csv rows to the tables. Orbit rows are keyed on their Near Earth Object name and
+        close_approach_date_full and rows already held are skipped, so applying the same rows again has no effect.
+
+        :param rows: iterable of dict csv rows
+        :return: int representing the number of rows added
+        """
+        connection = self.connect()
+        with self.lock, connection:
+            last_orbit_id = connection.execute('SELECT COALESCE(MAX(orbit_id), -1) FROM orbit').fetchone()[0]
+            added = self.append_rows(iter(rows), skip_held=True)
+            self.update_miss_distances(last_orbit_id)
+
+        if added:
+            self.generation += 1
+
+        return added
+
+    def ingest_file(self, filename):
+        """
+        Incrementally adds the rows of a .csv file to the tables, see ingest
+
+        :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :return: int representing the number of rows added
+        """
+        with open(filename) as csvfile:
+            return self.ingest(read_csv_rows(csvfile, self.CSV_FIELDS))
+
+    def build_indexes(self):
+        """
+        Creates the indexes, computes the per NEO miss distance bounds and collects the statistics the SQLite query
+        planner chooses its indexes by
+
+        :return: None
+        """
+        with self.lock:
+            connection = self.connect()
+            for index in self.INDEXES:
+                connection.execute(index)
+            self.update_miss_distances(-1)
+            connection.execute('ANALYZE')
+
+    def update_miss_distances(self, last_orbit_id):
+        """
+        :param last_orbit_id: int representing the last orbit id whose NEO miss distance bounds are current
+        :return: None
+        """
+        self.execute(
+            'UPDATE neo SET miss_distance_min = (SELECT MIN(miss_distance_kilometers) FROM orbit '
+            'WHERE orbit.neo_id = neo.neo_id), miss_distance_max = (SELECT MAX(miss_distance_kilometers) FROM orbit '
+            'WHERE orbit.neo_id = neo.neo_id) WHERE neo_id IN (SELECT neo_id FROM orbit WHERE orbit_id > ?)',
+            (last_orbit_id,)
+        )
+
+    def get_filter_sql(self, filter):
+        """
+        Translates a Filter into a SQL condition on the neo table, aliased n
+
+        A NEO passes the distance filter when any of its orbits does, like Filter.apply, which for ordering
+        operations only depends on the smallest or largest miss distance of the NEO. The distance filter of an
+        OrbitPath search is a condition on the orbit table, aliased o, instead.
+
+        :param filter: Filter to translate
+        :return: tuple of the str SQL condition and the tuple of its parameters
+        """
+        symbol = self.SQL_OPERATORS.get(filter.operation)
+        if symbol is None:
+            raise UnsupportedFeature
+
+        if filter.is_orbit_filter:
+            return f'o.miss_distance_kilometers {symbol} ?', (filter.value,)
+
+        if filter.field == 'is_hazardous':
+            return f'n.is_potentially_hazardous_asteroid {symbol} ?', (int(filter.value),)
+        if filter.field == 'diameter':
+            return f'n.estimated_diameter_min_kilometers {symbol} ?', (filter.value,)
+        if filter.operation in (operator.gt, operator.ge):
+            return f'n.miss_distance_max {symbol} ?', (filter.value,)
+        if filter.operation in (operator.lt, operator.le):
+            return f'n.miss_distance_min {symbol} ?', (filter.value,)
+
+        return ('EXISTS (SELECT 1 FROM orbit AS d WHERE d.neo_id = n.neo_id AND d.miss_distance_kilometers = ?)',
+                (filter.value,))
+
+    def is_diameter_driven(self, start_ordinal, end_ordinal, filters):
+        """
+        Access path planner for the SQL query of a search. Without statistics on value ranges the SQLite query
+        planner always drives a search from the date index, so a search is driven from the diameter index instead
+        when its diameter filter is expected to match fewer orbits than the date search. Both counts are read from
+        the indexes alone.
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :return: bool representing if the search is driven from the diameter index
+        """
+        diameter_filters = [neo_filter for neo_filter in filters if neo_filter.field == 'diameter']
+        if not diameter_filters:
+            return False
+
+        (orbits, neos), = self.execute('SELECT MAX(orbit_id) + 1, (SELECT MAX(neo_id) + 1 FROM neo) FROM orbit')
+        if not orbits:
+            return False
+        (date_orbits,), = self.execute('SELECT COUNT(*) FROM orbit WHERE close_approach_date BETWEEN ? AND ?',
+                                       (start_ordinal, end_ordinal))
+        for neo_filter in diameter_filters:
+            condition, parameters = self.get_filter_sql(neo_filter)
+            (diameter_neos,), = self.execute(f'SELECT COUNT(*) FROM neo AS n WHERE {condition}', parameters)
+            if diameter_neos * orbits < date_orbits * neos:
+                return True
+
+        return False
+
+    def get_search_sql(self, columns, start_ordinal, end_ordinal, filters):
+        """
+        :param columns: str representing the selected columns of the orbit table, aliased o, and neo table, aliased n
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :return: tuple of the str SQL query selecting the orbits within the dates whose NEO passes every filter and
+                 the list of its parameters
+        """
+        # A CROSS JOIN makes SQLite loop over the neo table first
+        if self.is_diameter_driven(start_ordinal, end_ordinal, filters):
+            tables = 'neo AS n CROSS JOIN orbit AS o ON o.neo_id = n.neo_id'
+        else:
+            tables = 'orbit AS o JOIN neo AS n ON n.neo_id = o.neo_id'
+
+        conditions = ['o.close_approach_date BETWEEN ? AND ?']
+        parameters = [start_ordinal, end_ordinal]
+        for neo_filter in filters:
+            condition, filter_parameters = self.get_filter_sql(neo_filter)
+            conditions.append(condition)
+            parameters.extend(filter_parameters)
+
+        return f'SELECT {columns} FROM {tables} WHERE {" AND ".join(conditions)}', parameters
+
+    def explain(self, start_ordinal, end_ordinal, filters):
+        """
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :return: list of str representing the steps of the SQLite query plan of the search, see get_search_sql
+        """
+        sql, parameters = self.get_search_sql('o.orbit_id', start_ordinal, end_ordinal, filters)
+        rows = self.execute(f'EXPLAIN QUERY PLAN {sql} ORDER BY o.close_approach_date, o.orbit_id', parameters)
+        return [f'sqlite: {detail}' for _, _, _, detail in rows]
+
+    def iter_neo_ids_between(self, start_ordinal, end_ordinal, filters):
+        """
+        Lazily iterates over the NEO id of every orbit within the dates whose NEO passes every filter, in order of
+        close approach. The rows are read from SQLite as they are consumed.
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :return: iterator of NEO ids
+        """
+        sql, parameters = self.get_search_sql('o.neo_id', start_ordinal, end_ordinal, filters)
+        rows = self.iter_execute(f'{sql} ORDER BY o.close_approach_date, o.orbit_id', parameters)
+        return map(operator.itemgetter(0), rows)
+
+    def rank_neo_ids(self, order, start_ordinal, end_ordinal, filters, number):
+        """
+        Ranks the NEOs with an orbit within the dates passing every filter in SQL, by their closest or fastest
+        approach within the dates or by their diameter, largest first. NEOs with equal keys are in order of first
+        close approach.
+
+        :param order: str representing the OrderBy value, one of distance, velocity or diameter
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :param number: int representing the number of NEO ids to return, or None for all
+        :return: list of NEO ids
+        """
+        keys = {
+            'distance': 'MIN(o.miss_distance_kilometers)',
+            'velocity': '-MAX(o.kilometers_per_second)',
+            'diameter': '-n.estimated_diameter_min_kilometers',
+        }
+        if order not in keys:
+            raise UnsupportedFeature
+
+        # Orbit ids are below 2 ** 32, so the position orders by date, then by load order within a date
+        sql, parameters = self.get_search_sql(f'o.neo_id, {keys[order]} AS rank_key, '
+                                              f'MIN(o.close_approach_date * 4294967296 + o.orbit_id) AS position',
+                                              start_ordinal, end_ordinal, filters)
+        rows = self.execute(f'{sql} GROUP BY o.neo_id ORDER BY rank_key, position LIMIT ?',
+                            parameters + [-1 if number is None else number])
+        return [neo_id for neo_id, _, _ in rows]
+
+    def iter_orbit_ids_between(self, start_ordinal, end_ordinal, filters):
+        """
+        Lazily iterates over the orbit id of every orbit within the dates passing every filter of an OrbitPath
+        search, in order of close approach
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :return: iterator of orbit ids
+        """
+        sql, parameters = self.get_search_sql('o.orbit_id', start_ordinal, end_ordinal, filters)
+        rows = self.iter_execute(f'{sql} ORDER BY o.close_approach_date, o.orbit_id', parameters)
+        return map(operator.itemgetter(0), rows)
+
+    def rank_orbit_ids(self, order, start_ordinal, end_ordinal, filters, number):
+        """
+        Ranks the orbits within the dates passing every filter of an OrbitPath search in SQL, by their miss distance
+        or velocity or by the diameter of their NEO, largest first. Orbits with equal keys are in order of close
+        approach.
+
+        :param order: str representing the OrderBy value, one of distance, velocity or diameter
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param filters: list of Filters
+        :param number: int representing the number of orbit ids to return, or None for all
+        :return: list of orbit ids
+        """
+        keys = {
+            'distance': 'o.miss_distance_kilometers',
+            'velocity': '-o.kilometers_per_second',
+            'diameter': '-n.estimated_diameter_min_kilometers',
+        }
+        if order not in keys:
+            raise UnsupportedFeature
+
+        sql, parameters = self.get_search_sql(f'o.orbit_id, {keys[order]} AS rank_key', start_ordinal, end_ordinal,
+                                              filters)
+        rows = self.execute(f'{sql} ORDER BY rank_key, o.close_approach_date, o.orbit_id LIMIT ?',
+                            parameters + [-1 if number is None else number])
+        return [orbit_id for orbit_id, _ in rows]
+
+    def iter_dates_between(self, start_ordinal, end_ordinal):
+        """
+        Lazily iterates over the dates within the inclusive ordinal range, one date of the date index at a time
+
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of (date ordinal, list of the NEO id of every orbit on the date) tuples
+        """
+        rows = self.iter_execute(
+            'SELECT close_approach_date, neo_id FROM orbit WHERE close_approach_date BETWEEN ? AND ? '
+            'ORDER BY close_approach_date, orbit_id', (start_ordinal, end_ordinal)
+        )
+        for ordinal, rows in itertools.groupby(rows, key=operator.itemgetter(0)):
+            yield ordinal, [neo_id for _, neo_id in rows]
+
+    def get_neo_mask(self, filter):
+        """
+        Evaluates a Filter over the neo table in SQL
+
+        :param filter: Filter to evaluate
+        :return: bytes with one entry per NEO id, non-zero if the NEO passes the filter
+        """
+        condition, parameters = self.get_filter_sql(filter)
+        (count,), = self.execute('SELECT COUNT(*) FROM neo')
+        mask = bytearray(count)
+        for neo_id, in self.execute(f'SELECT neo_id FROM neo AS n WHERE {condition}', parameters):
+            mask[neo_id] = True
+
+        return bytes(mask)
+
+    def get_near_earth_object(self, neo_id):
+        """
+        Builds the NearEarthObject instance of a NEO id along with all of its OrbitPath instances
+
+        :param neo_id: int representing the NEO id
+        :return: NearEarthObject
+        """
+        neo_fields = self.NEO_TEXT_FIELDS + self.NEO_FLOAT_FIELDS
+        row, = self.execute(f'SELECT {", ".join(neo_fields)}, is_potentially_hazardous_asteroid FROM neo '
+                            f'WHERE neo_id = ?', (neo_id,))
+        kwargs = dict(zip(neo_fields, row))
+        kwargs['is_potentially_hazardous_asteroid'] = str(bool(row[-1]))
+        neo = NearEarthObject(**kwargs)
+
+        orbit_fields = self.ORBIT_TEXT_FIELDS + self.ORBIT_FLOAT_FIELDS
+        for row in self.execute(f'SELECT close_approach_date, {", ".join(orbit_fields)} FROM orbit '
+                                f'WHERE neo_id = ? ORDER BY orbit_id', (neo_id,)):
+            kwargs = dict(zip(orbit_fields, row[1:]))
+            kwargs['close_approach_ordinal'] = row[0]
+            neo.update_orbits(OrbitPath(neo, **kwargs))
+
+        return neo
+
+    def get_orbit_paths(self, orbit_ids):
+        """
+        Lazily builds the OrbitPath instances of orbit ids, found among the orbits of their NearEarthObject instance,
+        which is built once for all the orbits of a NEO id
+
+        :param orbit_ids: iterable of int representing orbit ids
+        :return: iterator of OrbitPath instances
+        """
+        neos = {}
+        for orbit_id in orbit_ids:
+            (neo_id,), = self.execute('SELECT neo_id FROM orbit WHERE orbit_id = ?', (orbit_id,))
+            if neo_id not in neos:
+                neo_orbit_ids = self.execute('SELECT orbit_id FROM orbit WHERE neo_id = ? ORDER BY orbit_id', (neo_id,))
+                neos[neo_id] = (self.get_near_earth_object(neo_id), [row[0] for row in neo_orbit_ids])
+            neo, neo_orbit_ids = neos[neo_id]
+            yield neo.orbits[neo_orbit_ids.index(orbit_id)]
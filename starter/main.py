@@ -15,6 +15,12 @@ Search options:
 Output options: Required.
 - display: prints to stdout
 - csv_file: exports data to a csv
+- json_lines: exports data to a file with one json object per row
+- columnar: exports data to a binary file of row groups stored column by column
+- binary: exports data to a binary file of packed rows
+
+Output file: Optional, the path of the file the file output options write to, e.g. main.py csv_file -o out.csv -n 10
+-d 2020-01-10. By default they write to data/neo_neo_data with the extension of the output option.
 
 Filters options: Optional. Input as: option:operation:value e.g. diameter:>=:0.042
 - is_hazardous:[=]:bool
@@ -22,20 +28,91 @@ Filters options: Optional. Input as: option:operation:value e.g. diameter:>=:0.0
 - distance:[>=|=|<=]:float
 
 Return objects options: Optional, defaults to NEO if not specified.
-- NEO
-- Path
+- NEO: unique NEOs with a close approach within the dates, written with every one of their close approaches. A NEO
+  passes the distance filter when any of its close approaches does.
+- Path: the close approaches within the dates themselves, one row each. The distance filter applies to every close
+  approach, the other filters to its NEO, and the order to the close approach, e.g. the 10 closest approaches of a
+  year with main.py display -r Path -n 10 --start_date 2020-01-01 --end_date 2020-12-31 --order distance
+
+Order options: Optional, defaults to first_approach if not specified. The -n NEOs returned are the first ones in order.
+- first_approach: by first close approach within the dates
+- distance: by closest approach within the dates, e.g. main.py display -n 10 --start_date 2020-01-01
+  --end_date 2020-12-31 --order distance
+- diameter: by diameter, largest first
+- velocity: by fastest approach within the dates
+
+Ranked orders walk the secondary indexes of --indexes when the -n NEOs are expected early in the walk, so e.g. the 10
+largest NEOs of a decade are found without ranking every NEO of the decade.
+
+Aggregate options: Optional, writes a summary of the close approaches within the dates, after the filters, instead of
+the NEOs, e.g. main.py display --aggregate count_by_month --start_date 2020-01-01 --end_date 2020-12-31
+- count: number of close approaches and NEOs
+- count_by_day: number of close approaches per date
+- count_by_month: number of close approaches per month
+- hazardous: number of close approaches and NEOs by hazard flag
+- distance_histogram: number of close approaches per miss distance bin, --bins equal width bins (default 10)
+- diameter_histogram: number of NEOs per diameter bin, --bins equal width bins (default 10)
+
+Queries: Optional, searches a batch of queries read from a json lines file with one shared scan of their dates and
+writes the results of every query to its own output, e.g. main.py csv_file --queries nightly.jsonl -o out.csv writes
+out.1.csv, out.2.csv and so on. Every line is a json object of the query options, like a query sent to --server, with
+an optional output_file, e.g. {"start_date": "2020-01-01", "end_date": "2020-01-10", "filter": ["diameter:>:0.042"]}
 
 Filename: Optional, used for specifying a filename for a csv to load data from. By default project looks for a csv in: data/neo_data.csv.
+The filename can also be a directory of time partitions written by partition.py, e.g. main.py display -n 10
+-d 2020-01-10 -f data/neo_partitions, of which only the partitions holding the dates searched are loaded. The NEOs
+then only hold the close approaches of the loaded partitions. Not supported with the sqlite engine.
+
+Engine options: Optional, defaults to memory if not specified.
+- memory: stores a NearEarthObject and OrbitPath instance for every row
+- columnar: stores rows in columns and only builds instances for the search results
+- sqlite: stores rows in an indexed SQLite file next to the csv file, which later runs reuse while the csv file is
+  unchanged, and searches it in SQL
+
+Workers: Optional, defaults to 1. Number of worker processes parsing the csv file in chunks. The workers send back
+typed columns and the chunks are merged in the main process, which for the memory engine also builds every
+NearEarthObject and OrbitPath instance, so that engine scales to a few workers at most; the columnar engine merges
+plain columns and scales further.
+
+Indexes: Optional, keeps secondary indexes on diameter, hazard flag and miss distance for the memory engine, so
+a selective filter can drive the search instead of the date search.
+
+Server options: Optional.
+- --serve: loads the data once and answers queries over HTTP on --host and --port until interrupted,
+  e.g. main.py --serve --port 8000 -f new_neo_data.csv
+- --server: sends the query to a running server instead of loading the data,
+  e.g. main.py display -n 10 -d 2020-01-10 --server http://127.0.0.1:8000
+
+Profile: Optional, prints the wall time, rows in and out and bytes written of every stage of loading, searching and
+writing to stderr once the results are written, e.g. main.py csv_file -n 10 -d 2020-01-10 --profile
+
+Snapshot: Optional, caches the loaded data in a binary snapshot next to the csv file and reads it back on later runs
+while the csv file is unchanged.
+
+Sample: Optional, keeps a uniform random sample of N close approaches for the memory engine and answers from it at a
+cost bounded by N however wide the dates are, e.g. main.py display --sample 10000 --aggregate count --start_date
+1900-01-01 --end_date 2100-12-31. Aggregates are estimated with the bounds of their 95% confidence interval and
+searches return a representative subset of the NEOs or close approaches, evenly spread over the dates.
+
+Explain: Optional, prints the query plan of the search instead of searching, i.e. the access path chosen to drive it
+and the number of entries expected to be read, e.g. main.py --explain -n 10 -d 2020-01-10 --indexes
+--filter "diameter:>:0.5". The output option is not required.
 """
 
 import argparse
+import json
+import os
 import pathlib
 import sys
 from datetime import datetime
 
 from exceptions import UnsupportedFeature
-from database import NEODatabase
-from search import Query, NEOSearcher
+from aggregate import AggregateType, NEOAggregator
+from database import DatabaseEngine, NEODatabase, ColumnarNEODatabase, SQLiteNEODatabase
+from partition import PartitionManifest
+from search import OrderBy, Query, NEOSearcher
+from server import NEOServer, NEOClient
+from stats import NEOStats
 from writer import OutputFormat, NEOWriter
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
@@ -56,6 +133,22 @@ def verify_date(datetime_str):
         raise argparse.ArgumentTypeError(error_message)
 
 
+def verify_positive_int(number_str):
+    """
+    Function that verifies int strings are positive ints.
+
+    :param number_str:      String representing an int
+    :return: int:           Int greater than 0
+    """
+    try:
+        number = int(number_str)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'Not a positive int: "{number_str}"')
+    return number
+
+
 def verify_output_choice(choice):
     """
     Function that verifies output choice is a supported OutputFormat.
@@ -72,9 +165,64 @@ def verify_output_choice(choice):
     return options[options.index(choice)]
 
 
+def read_query_file(filename):
+    """
+    Function that reads a batch of queries from a json lines file.
+
+    :param filename:  String representing the pathway of the json lines file
+    :return: list:    List of tuples of the dict of Query keyword arguments and the output file of every query, or None
+    """
+    batch = []
+    with open(filename) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            options = json.loads(line)
+            output_file = options.pop('output_file', None)
+            query_options = {field: options[field] for field in NEOServer.QUERY_FIELDS if field in options}
+            query_options.setdefault('return_object', 'NEO')
+            batch.append((query_options, output_file))
+
+    return batch
+
+
+def get_batch_filename(filename, number):
+    """
+    Function that numbers the output file of a query of a batch.
+
+    :param filename:  String representing the pathway of the output file of the batch
+    :param number:    Int representing the number of the query in the batch, starting at 1
+    :return: str:     String representing the pathway of the output file of the query, e.g. out.1.csv for out.csv
+    """
+    path = pathlib.Path(filename)
+    return str(path.with_name(f'{path.stem}.{number}{path.suffix}'))
+
+
+def get_date_ranges(args):
+    """
+    Function that finds the dates searched by a run, so only the partitions holding them are loaded.
+
+    :param args:      argparse.Namespace of the parsed arguments
+    :return: list:    List of tuples of the start and end date ordinals of every query, or None for every date
+    """
+    if args.serve:
+        return None
+
+    try:
+        if args.queries:
+            batch = [query_options for query_options, _ in read_query_file(args.queries)]
+        else:
+            batch = [vars(args)]
+        return [NEOSearcher.get_date_range(Query(**query_options).build_query().date_search)
+                for query_options in batch]
+    except (UnsupportedFeature, OSError, ValueError, KeyError, TypeError, AttributeError):
+        # The search reports the invalid query, e.g. one without dates, after loading every partition
+        return None
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Near Earth Objects (NEOs) Database')
-    parser.add_argument('output', choices=OutputFormat.list(), type=verify_output_choice,
+    parser.add_argument('output', nargs='?', choices=OutputFormat.list(), type=verify_output_choice,
                         help='Select option for how to output the search results.')
     parser.add_argument('-r', '--return_object', choices=['NEO', 'Path'],
                         default='NEO', type=str,
@@ -85,7 +233,39 @@ if __name__ == '__main__':
     parser.add_argument('-e', '--end_date', type=verify_date,
                         help='YYYY-MM-DD format to find NEOs up to the end date')
     parser.add_argument('-n', '--number', type=int, help='Int representing max number of NEOs to return')
+    parser.add_argument('--order', choices=OrderBy.list(), default=OrderBy.first_approach.value, type=str,
+                        help='Select the order the NEOs are returned in.')
+    parser.add_argument('--queries', type=str,
+                        help='Name of a json lines file of queries to search as one batch, one output per query')
+    parser.add_argument('--aggregate', choices=AggregateType.list(), type=str,
+                        help='Select a summary of the close approaches to output instead of the NEOs.')
+    parser.add_argument('--bins', type=verify_positive_int, default=10,
+                        help='Int representing the number of histogram bins')
     parser.add_argument('-f', '--filename', type=str, help='Name of input csv data file')
+    parser.add_argument('-o', '--output_file', '--output-file', type=str,
+                        help='Path of the file the search results are written to')
+    parser.add_argument('--engine', choices=DatabaseEngine.list(), default=DatabaseEngine.memory.value,
+                        type=str, help='Select storage engine to load the data into.')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Int representing the number of processes parsing the input csv data file. The memory '
+                             'engine still builds its instances in the main process, which bounds its speedup.')
+    parser.add_argument('--indexes', action='store_true',
+                        help='Keep secondary indexes on diameter, hazard flag and miss distance.')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Cache the loaded data in a binary snapshot next to the input csv data file.')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time, rows and bytes of every stage of loading, searching and writing.')
+    parser.add_argument('--sample', type=verify_positive_int, default=0,
+                        help='Answer from a uniform sample of this number of close approaches, with confidence '
+                             'intervals.')
+    parser.add_argument('--explain', action='store_true',
+                        help='Print the query plan of the search instead of searching.')
+    parser.add_argument('--serve', action='store_true',
+                        help='Load the data once and answer queries over HTTP until interrupted.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host the server listens on')
+    parser.add_argument('--port', type=int, default=8000, help='Port the server listens on')
+    parser.add_argument('--server', type=str, help='Url of a running server to send the query to, '
+                                                   'e.g. http://127.0.0.1:8000')
     parser.add_argument('--filter', nargs='+', help='Select filter options with filter value: '
                                                     'is_hazardous:[=]:bool, '
                                                     'diameter:[>=|=|<=]:float, '
@@ -96,38 +276,143 @@ if __name__ == '__main__':
     args = parser.parse_args()
     var_args = vars(args)
 
-    # Load Data
-    if args.filename:
-        filename = args.filename
+    if not (args.output or args.serve or args.explain):
+        parser.error('the following arguments are required: output')
+
+    if args.explain and (args.server or args.serve or args.queries or args.aggregate):
+        parser.error('argument --explain: not supported with --server, --serve, --queries or --aggregate')
+
+    if args.sample and (args.server or args.serve or args.engine != DatabaseEngine.memory.value):
+        parser.error('argument --sample: only supported with the memory engine, not with --server or --serve')
+
+    if args.server and args.aggregate:
+        parser.error('argument --aggregate: not supported with --server')
+
+    if args.queries and (args.server or args.aggregate):
+        parser.error('argument --queries: not supported with --server or --aggregate')
+
+    stats = NEOStats() if args.profile else None
+
+    if args.server:
+        # Get Results from a running server instead of loading the data
+        try:
+            results = NEOClient(args.server).get_objects(
+                **{field: var_args[field] for field in NEOServer.QUERY_FIELDS}
+            )
+        except UnsupportedFeature as e:
+            print('Unsupported Feature; Write unsuccessful')
+            sys.exit()
+        except ValueError as e:
+            print(e)
+            sys.exit()
+        except OSError as e:
+            print(f'Server {args.server} not reachable: {e}')
+            sys.exit()
     else:
-        filename = f'{PROJECT_ROOT}/data/neo_data.csv'
+        # Load Data
+        if args.filename:
+            filename = args.filename
+        else:
+            filename = f'{PROJECT_ROOT}/data/neo_data.csv'
 
-    db = NEODatabase(filename=filename)
+        if args.engine == DatabaseEngine.columnar.value:
+            db = ColumnarNEODatabase(filename=filename, snapshot=args.snapshot, workers=args.workers, stats=stats)
+        elif args.engine == DatabaseEngine.sqlite.value:
+            db = SQLiteNEODatabase(filename=filename, stats=stats)
+        else:
+            db = NEODatabase(filename=filename, snapshot=args.snapshot, workers=args.workers,
+                             secondary_indexes=args.indexes, sample_size=args.sample, stats=stats)
 
-    try:
-        db.load_data()
-    except FileNotFoundError as e:
-        print(f'File {filename} not found, please try another file name.')
-        sys.exit()
-    except Exception as e:
-        print(e)
-        sys.exit()
+        try:
+            if os.path.isdir(filename):
+                if args.engine == DatabaseEngine.sqlite.value:
+                    parser.error('argument -f/--filename: partitioned data directories are not supported with the '
+                                 'sqlite engine')
+                db.load_partitions(PartitionManifest.read(filename), get_date_ranges(args))
+            else:
+                db.load_data()
+        except FileNotFoundError as e:
+            print(f'File {filename} not found, please try another file name.')
+            sys.exit()
+        except Exception as e:
+            print(e)
+            sys.exit()
 
-    # Build Query
-    query_selectors = Query(**var_args).build_query()
+        if args.serve:
+            server = NEOServer(db, host=args.host, port=args.port)
+            print(f'Serving on http://{args.host}:{args.port}')
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                server.server_close()
+            sys.exit()
 
-    # Get Results
-    try:
-        results = NEOSearcher(db).get_objects(query_selectors)
-    except UnsupportedFeature as e:
-        print('Unsupported Feature; Write unsuccessful')
-        sys.exit()
+        if args.queries:
+            # Search the batch with shared scans, then write the results of every query to its own output
+            try:
+                batch = read_query_file(args.queries)
+                queries = [Query(**query_options).build_query() for query_options, _ in batch]
+                batch_results = NEOSearcher(db, stats=stats, sampled=bool(args.sample)).get_batch_objects(queries)
+            except UnsupportedFeature as e:
+                print('Unsupported Feature; Write unsuccessful')
+                sys.exit()
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f'Invalid query file {args.queries}: {e}')
+                sys.exit()
+
+            writer = NEOWriter(stats=stats)
+            batch_filename = args.output_file or NEOWriter.DEFAULT_FILENAMES.get(OutputFormat(args.output))
+            for number, ((query_options, output_file), results) in enumerate(zip(batch, batch_results), start=1):
+                if not output_file and batch_filename:
+                    output_file = get_batch_filename(batch_filename, number)
+                if args.output == OutputFormat.display.value:
+                    print(f'Query {number}:')
+                fields = Query.ReturnObjects[query_options['return_object']].OUTPUT_FIELDS
+                if writer.write(data=results, format=args.output, filename=output_file, fields=fields):
+                    print(f'Write of query {number} successful.')
+                else:
+                    print(f'Write of query {number} unsuccessful.')
+            if stats:
+                print(stats.report(), file=sys.stderr)
+            sys.exit()
+
+        # Build Query
+        query_selectors = Query(**var_args).build_query()
+
+        if args.explain:
+            try:
+                print(NEOSearcher(db).prepare(query_selectors).explain())
+            except UnsupportedFeature as e:
+                print('Unsupported Feature')
+            sys.exit()
+
+        if args.aggregate:
+            # Aggregate Results
+            fields, rows = NEOAggregator(db, sampled=bool(args.sample)).aggregate(query_selectors, args.aggregate,
+                                                                                  bins=args.bins)
+            if NEOWriter(stats=stats).write_rows(format=args.output, rows=rows, fields=fields,
+                                                 filename=args.output_file):
+                print('Write successful.')
+            else:
+                print('Write unsuccessful.')
+            if stats:
+                print(stats.report(), file=sys.stderr)
+            sys.exit()
+
+        # Get Results
+        try:
+            results = NEOSearcher(db, stats=stats, sampled=bool(args.sample)).iter_objects(query_selectors)
+        except UnsupportedFeature as e:
+            print('Unsupported Feature; Write unsuccessful')
+            sys.exit()
 
     # Output Results
     try:
-        result = NEOWriter().write(
+        result = NEOWriter(stats=stats).write(
             data=results,
             format=args.output,
+            filename=args.output_file,
+            fields=Query.ReturnObjects[args.return_object].OUTPUT_FIELDS,
         )
     except Exception as e:
         print(e)
@@ -138,3 +423,6 @@ if __name__ == '__main__':
         print('Write successful.')
     else:
         print('Write unsuccessful.')
+
+    if stats:
+        print(stats.report(), file=sys.stderr)
@@ -1,34 +1,115 @@
+import datetime
+import functools
+import sys
+
+
+@functools.lru_cache(maxsize=None)
+def date_to_ordinal(date):
+    """
+    Converts a date string into its proleptic Gregorian ordinal, used as the sortable date key. Dates are parsed once
+    and every OrbitPath on a date shares the same int instance.
+
+    :param date: str representing a date in YYYY-MM-DD format
+    :return: int representing the ordinal of the date
+    """
+    year, month, day = date.split('-')
+    return datetime.date(int(year), int(month), int(day)).toordinal()
+
+
+@functools.lru_cache(maxsize=None)
+def ordinal_to_date(ordinal):
+    """
+    Converts a proleptic Gregorian ordinal back into its date string, formatted once per date
+
+    :param ordinal: int representing the ordinal of a date
+    :return: str representing the date in YYYY-MM-DD format
+    """
+    return sys.intern(datetime.date.fromordinal(ordinal).isoformat())
+
+
+# Unit conversions from the canonical units stored on the models
+KILOMETERS_PER_MILE = 1.609344
+KILOMETERS_PER_FOOT = 0.0003048
+KILOMETERS_PER_ASTRONOMICAL_UNIT = 149597870.7
+KILOMETERS_PER_LUNAR_DISTANCE = 384400.0
+SECONDS_PER_HOUR = 3600.0
+
+
 class NearEarthObject(object):
     """
     Object containing data describing a Near Earth Object and it's orbits.
 
+    Diameters are only stored in kilometers, the other units are derived on access. The absolute magnitude and
+    maximum diameter are never read by a search or writer, so they are kept as their csv text and only converted to
+    float on first access. Instances use __slots__ instead of a per instance __dict__.
+
     # TODO: You may be adding instance methods to NearEarthObject to help you implement search and output data.
     """
 
+    __slots__ = ('id', 'neo_reference_id', 'name', 'nasa_jpl_url', '_absolute_magnitude_h',
+                 'estimated_diameter_min_kilometers', '_estimated_diameter_max_kilometers',
+                 'is_potentially_hazardous_asteroid', '__orbits')
+
+    OUTPUT_FIELDS = ('id', 'name', 'close_approach_date')
+
     def __init__(self, **kwargs):
         """
         :param kwargs:    dict of attributes about a given Near Earth Object, only a subset of attributes used
         """
         # TODO: What instance variables will be useful for storing on the Near Earth Object?
         self.id = kwargs['id']
-        self.neo_reference_id = kwargs['neo_reference_id']
+        # The reference id is usually the same as the id, share the string when it is
+        if kwargs['neo_reference_id'] == self.id:
+            self.neo_reference_id = self.id
+        else:
+            self.neo_reference_id = kwargs['neo_reference_id']
         self.name = kwargs['name']
         self.nasa_jpl_url = kwargs['nasa_jpl_url']
-        self.absolute_magnitude_h = float(kwargs['absolute_magnitude_h'])
+        # Decoded on first access, see absolute_magnitude_h and estimated_diameter_max_kilometers
+        self._absolute_magnitude_h = kwargs['absolute_magnitude_h']
         self.estimated_diameter_min_kilometers = float(kwargs['estimated_diameter_min_kilometers'])
-        self.estimated_diameter_max_kilometers = float(kwargs['estimated_diameter_max_kilometers'])
-        self.estimated_diameter_min_meters = float(kwargs['estimated_diameter_min_meters'])
-        self.estimated_diameter_max_meters = float(kwargs['estimated_diameter_max_meters'])
-        self.estimated_diameter_min_miles = float(kwargs['estimated_diameter_min_miles'])
-        self.estimated_diameter_max_miles = float(kwargs['estimated_diameter_max_miles'])
-        try:
-            self.estimated_diameter_min_feet = float(kwargs['estimated_diameter_min_feet'])
-        except ValueError:
-            self.estimated_diameter_min_feet = None
-        self.estimated_diameter_max_feet = float(kwargs['estimated_diameter_max_feet'])
+        self._estimated_diameter_max_kilometers = kwargs['estimated_diameter_max_kilometers']
         self.is_potentially_hazardous_asteroid = (kwargs['is_potentially_hazardous_asteroid'] == 'True')
         self.__orbits = []
 
+    @property
+    def absolute_magnitude_h(self):
+        value = self._absolute_magnitude_h
+        if value.__class__ is str:
+            value = self._absolute_magnitude_h = float(value)
+        return value
+
+    @property
+    def estimated_diameter_max_kilometers(self):
+        value = self._estimated_diameter_max_kilometers
+        if value.__class__ is str:
+            value = self._estimated_diameter_max_kilometers = float(value)
+        return value
+
+    @property
+    def estimated_diameter_min_meters(self):
+        return self.estimated_diameter_min_kilometers * 1000.0
+
+    @property
+    def estimated_diameter_max_meters(self):
+        return self.estimated_diameter_max_kilometers * 1000.0
+
+    @property
+    def estimated_diameter_min_miles(self):
+        return self.estimated_diameter_min_kilometers / KILOMETERS_PER_MILE
+
+    @property
+    def estimated_diameter_max_miles(self):
+        return self.estimated_diameter_max_kilometers / KILOMETERS_PER_MILE
+
+    @property
+    def estimated_diameter_min_feet(self):
+        return self.estimated_diameter_min_kilometers / KILOMETERS_PER_FOOT
+
+    @property
+    def estimated_diameter_max_feet(self):
+        return self.estimated_diameter_max_kilometers / KILOMETERS_PER_FOOT
+
     @staticmethod
     def diameter(neo):
         return neo.estimated_diameter_min_kilometers
@@ -60,47 +141,103 @@ class NearEarthObject(object):
         """
         :return: CSV header in string
         """
-        return "id,name,close_approach_date"
+        return ','.join(NearEarthObject.OUTPUT_FIELDS)
+
+    def get_rows(self):
+        """
+        :return: list of tuple representing the id, name and orbit date of every orbit, in OUTPUT_FIELDS order
+        """
+        return [(self.id, self.name, orbit.close_approach_date) for orbit in self.__orbits]
 
     def __repr__(self):
         """
         :return: id, name, orbits, and orbit dates
         """
-        info = []
-        for orbit in self.orbits:
-            info.append(f'{self.id},{self.name},{orbit.close_approach_date}')
-
-        return "\n".join(info)
+        return "\n".join(','.join(row) for row in self.get_rows())
 
 
 class OrbitPath(object):
     """
     Object containing data describing a Near Earth Object orbit.
 
+    The orbit references its NearEarthObject rather than copying its name. Velocity is only stored in kilometers per
+    second and miss distance in kilometers, the other units are derived on access. The close approach date is stored
+    as its date ordinal, so searches compare and look up ints, and its date string is only formatted on access.
+    Orbiting bodies are repeated across many orbits, so they are interned. Instances use __slots__ instead of a per
+    instance __dict__.
+
     # TODO: You may be adding instance methods to OrbitPath to help you implement search and output data.
     """
 
-    def __init__(self, neo_name, **kwargs):
+    __slots__ = ('neo', 'kilometers_per_second', 'close_approach_ordinal', 'close_approach_date_full',
+                 'miss_distance_kilometers', 'orbiting_body')
+
+    OUTPUT_FIELDS = ('neo_name', 'miss_distance_kilometers', 'close_approach_date')
+
+    def __init__(self, neo, **kwargs):
         """
-        :param kwargs:    dict of attributes about a given orbit, only a subset of attributes used
+        :param neo: NearEarthObject the orbit belongs to
+        :param kwargs:    dict of attributes about a given orbit, only a subset of attributes used, with either the
+                          close_approach_date string or its close_approach_ordinal
         """
         # TODO: What instance variables will be useful for storing on the Near Earth Object?
-        self.neo_name = neo_name
+        self.neo = neo
         self.kilometers_per_second = float(kwargs['kilometers_per_second'])
-        self.kilometers_per_hour = float(kwargs['kilometers_per_hour'])
-        self.miles_per_hour = float(kwargs['miles_per_hour'])
-        self.close_approach_date = kwargs['close_approach_date']
+        ordinal = kwargs.get('close_approach_ordinal')
+        self.close_approach_ordinal = date_to_ordinal(kwargs['close_approach_date']) if ordinal is None else ordinal
         self.close_approach_date_full = kwargs['close_approach_date_full']
-        self.miss_distance_astronomical = float(kwargs['miss_distance_astronomical'])
-        self.miss_distance_lunar = float(kwargs['miss_distance_lunar'])
         self.miss_distance_kilometers = float(kwargs['miss_distance_kilometers'])
-        self.miss_distance_miles = float(kwargs['miss_distance_miles'])
-        self.orbiting_body = kwargs['orbiting_body']
+        self.orbiting_body = sys.intern(kwargs['orbiting_body'])
+
+    @property
+    def neo_name(self):
+        return self.neo.name
+
+    @property
+    def close_approach_date(self):
+        return ordinal_to_date(self.close_approach_ordinal)
+
+    @property
+    def kilometers_per_hour(self):
+        return self.kilometers_per_second * SECONDS_PER_HOUR
+
+    @property
+    def miles_per_hour(self):
+        return self.kilometers_per_second * SECONDS_PER_HOUR / KILOMETERS_PER_MILE
+
+    @property
+    def miss_distance_astronomical(self):
+        return self.miss_distance_kilometers / KILOMETERS_PER_ASTRONOMICAL_UNIT
+
+    @property
+    def miss_distance_lunar(self):
+        return self.miss_distance_kilometers / KILOMETERS_PER_LUNAR_DISTANCE
+
+    @property
+    def miss_distance_miles(self):
+        return self.miss_distance_kilometers / KILOMETERS_PER_MILE
 
     @staticmethod
     def distance(path):
         return path.miss_distance_kilometers
 
+    @staticmethod
+    def velocity(path):
+        return path.kilometers_per_second
+
+    @staticmethod
+    def get_csv_header():
+        """
+        :return: CSV header in string
+        """
+        return ','.join(OrbitPath.OUTPUT_FIELDS)
+
+    def get_rows(self):
+        """
+        :return: list of a tuple representing the NEO name, miss distance in Km and orbit date, in OUTPUT_FIELDS order
+        """
+        return [(self.neo.name, self.miss_distance_kilometers, self.close_approach_date)]
+
     def __repr__(self):
         """
         :return: NEO name, miss distance in Km, and orbit date
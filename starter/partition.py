@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+#  -*- coding: utf-8 -*-
+
+"""
+Script to split a Near Earth Object csv file into a directory of time partitions.
+
+You can run from the commandline with: partition.py filename directory [args]
+Example: partition.py data/neo_data.csv data/neo_partitions --by month --format columnar
+
+Partition options: Optional, defaults to month if not specified.
+- month: one partition per month of close approach dates
+- year: one partition per year of close approach dates
+
+Format options: Optional, defaults to csv_file if not specified.
+- csv_file: partitions are csv files with every column of the csv file
+- columnar: partitions are NEOWriter columnar files of the columns the databases load
+- binary: partitions are NEOWriter binary files of the columns the databases load
+
+The directory is then loaded like a csv file, e.g. main.py display -n 10 -d 2020-01-10 -f data/neo_partitions, which
+only loads the partitions overlapping the dates searched.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import operator
+import os
+from collections import defaultdict
+from enum import Enum
+
+from database import NEODatabase, read_csv_rows
+from models import date_to_ordinal
+from writer import OutputFormat, NEOWriter
+
+
+class PartitionGranularity(Enum):
+    """
+    Enum representing supported time spans of the partitions of a partitioned data directory.
+    """
+    month = 'month'
+    year = 'year'
+
+    @staticmethod
+    def list():
+        """
+        :return: list of string representations of PartitionGranularity enums
+        """
+        return list(map(lambda granularity: granularity.value, PartitionGranularity))
+
+
+class PartitionManifest(object):
+    """
+    Object representing a directory of time partitioned Near Earth Object data and its manifest.
+
+    Every partition holds the csv rows of the close approaches of one month or year, in csv file order, as a csv file
+    or as a NEOWriter columnar or binary file. The binary formats only hold the FIELDS the databases load, with
+    numbers stored as floats, so their rows are neither split nor parsed from text. The manifest.json file of the
+    directory lists every partition with the first and last close approach date it holds, so a database loads only
+    the partitions overlapping the dates searched, see NEODatabase.load_partitions.
+    """
+
+    FILENAME = 'manifest.json'
+
+    EXTENSIONS = {
+        OutputFormat.csv_file: 'csv',
+        OutputFormat.columnar: 'col',
+        OutputFormat.binary: 'bin',
+    }
+
+    # Fields of the binary formats, the csv fields loaded by every database engine
+    FIELDS = NEODatabase.CSV_FIELDS
+    TEXT_FIELDS = NEODatabase.NEO_TEXT_FIELDS + ['is_potentially_hazardous_asteroid', 'close_approach_date'] + \
+        NEODatabase.ORBIT_TEXT_FIELDS
+
+    # Rows held in memory while partitioning before they are appended to their partition files
+    BATCH_SIZE = 100000
+
+    def __init__(self, directory, granularity, format, partitions):
+        """
+        :param directory: str representing the pathway of the partitioned data directory
+        :param granularity: str representing the PartitionGranularity
+        :param format: str representing the OutputFormat of the partitions, csv_file, columnar or binary
+        :param partitions: list of dicts with the filename, start_date, end_date and number of rows of every
+                           partition, in date order
+        """
+        self.directory = directory
+        self.granularity = PartitionGranularity(granularity)
+        self.format = OutputFormat(format)
+        if self.format not in self.EXTENSIONS:
+            raise ValueError(f'Unsupported partition format: {format}')
+        self.partitions = partitions
+
+    @staticmethod
+    def exists(directory):
+        """
+        :param directory: str representing a pathway
+        :return: bool representing if the pathway is a partitioned data directory
+        """
+        return os.path.isfile(os.path.join(directory, PartitionManifest.FILENAME))
+
+    @staticmethod
+    def read(directory):
+        """
+        :param directory: str representing the pathway of the partitioned data directory
+        :return: PartitionManifest read from the manifest of the directory
+        """
+        with open(os.path.join(directory, PartitionManifest.FILENAME)) as f:
+            manifest = json.load(f)
+
+        return PartitionManifest(directory, manifest['granularity'], manifest['format'], manifest['partitions'])
+
+    def write(self):
+        """
+        Writes the manifest to a temporary file first, so a reader never sees a partly written manifest
+
+        :return: None
+        """
+        path = os.path.join(self.directory, self.FILENAME)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({'granularity': self.granularity.value, 'format': self.format.value,
+                       'partitions': self.partitions}, f, indent=1)
+        os.replace(f'{path}.tmp', path)
+
+    def get_partitions(self, date_ranges=None):
+        """
+        :param date_ranges: list of (start date ordinal, end date ordinal) tuples, end inclusive, or None for all
+        :return: list of the dicts of the partitions holding a close approach within any of the date ranges
+        """
+        if date_ranges is None:
+            return list(self.partitions)
+
+        return [partition for partition in self.partitions
+                if any(date_to_ordinal(partition['start_date']) <= end_ordinal and
+                       start_ordinal <= date_to_ordinal(partition['end_date'])
+                       for start_ordinal, end_ordinal in date_ranges)]
+
+    def get_path(self, partition):
+        """
+        :param partition: dict of a partition
+        :return: str representing the pathway of the partition file
+        """
+        return os.path.join(self.directory, partition['filename'])
+
+    def iter_rows(self, partition, fields):
+        """
+        :param partition: dict of a partition
+        :param fields: list of str representing the csv fields to read
+        :return: generator of dicts of the fields to their csv text, or float for the numbers of the binary formats
+        """
+        if self.format == OutputFormat.csv_file:
+            with open(self.get_path(partition)) as csvfile:
+                yield from read_csv_rows(csvfile, fields)
+            return
+
+        file_fields, rows = NEOWriter.read(self.format.value, self.get_path(partition))
+        missing = [field for field in fields if field not in file_fields]
+        if missing:
+            rows.close()
+            raise KeyError(f'Missing partition fields: {", ".join(missing)}')
+
+        get_values = operator.itemgetter(*map(file_fields.index, fields))
+        for row in rows:
+            yield dict(zip(fields, get_values(row)))
+
+    @staticmethod
+    def create(filename, directory, granularity=PartitionGranularity.month.value, format=OutputFormat.csv_file.value):
+        """
+        Splits a csv file into a partitioned data directory, replacing the partitions of an earlier manifest. The rows
+        are appended to csv partitions in batches, so files of any size are split in constant memory, and converted
+        to the binary formats one partition at a time.
+
+        :param filename: str representing the pathway of the csv file
+        :param directory: str representing the pathway of the partitioned data directory
+        :param granularity: str representing the PartitionGranularity
+        :param format: str representing the OutputFormat of the partitions, csv_file, columnar or binary
+        :return: PartitionManifest of the written directory
+        """
+        manifest = PartitionManifest(directory, granularity, format, [])
+        key_length = 7 if manifest.granularity == PartitionGranularity.month else 4
+
+        os.makedirs(directory, exist_ok=True)
+        if PartitionManifest.exists(directory):
+            for partition in PartitionManifest.read(directory).partitions:
+                os.remove(os.path.join(directory, partition['filename']))
+            os.remove(os.path.join(directory, PartitionManifest.FILENAME))
+
+        bounds = {}
+        with open(filename) as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, None)
+            if header is None:
+                header = []
+            date_position = header.index('close_approach_date') if header else 0
+
+            pending = defaultdict(list)
+            for batch in iter(lambda: list(itertools.islice(reader, PartitionManifest.BATCH_SIZE)), []):
+                for row in batch:
+                    # Blank lines are skipped as a csv.DictReader does
+                    if row:
+                        pending[row[date_position][:key_length]].append(row)
+                manifest.append_csv_rows(pending, header, bounds, date_position)
+                pending.clear()
+
+        for key in sorted(bounds):
+            start_date, end_date, rows = bounds[key]
+            partition = {'filename': f'{key}.csv', 'start_date': start_date, 'end_date': end_date, 'rows': rows}
+            if manifest.format != OutputFormat.csv_file:
+                partition['filename'] = manifest.convert(partition)
+            manifest.partitions.append(partition)
+        manifest.write()
+
+        return manifest
+
+    def append_csv_rows(self, pending, header, bounds, date_position):
+        """
+        :param pending: dict of partition key to the list of csv rows to append to its csv file
+        :param header: list of csv header fieldnames, written to new csv files
+        :param bounds: dict of partition key to [first date, last date, number of rows], updated with the rows
+        :param date_position: int representing the position of the close_approach_date field in a row
+        :return: None
+        """
+        for key, rows in pending.items():
+            dates = list(map(operator.itemgetter(date_position), rows))
+            if key in bounds:
+                key_bounds = bounds[key]
+                key_bounds[:] = [min(key_bounds[0], min(dates)), max(key_bounds[1], max(dates)),
+                                 key_bounds[2] + len(rows)]
+                mode = 'a'
+            else:
+                bounds[key] = [min(dates), max(dates), len(rows)]
+                mode = 'w'
+            with open(os.path.join(self.directory, f'{key}.csv'), mode, newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                if mode == 'w':
+                    writer.writerow(header)
+                writer.writerows(rows)
+
+    def convert(self, partition):
+        """
+        Converts a csv partition into the format of the manifest, removing the csv file
+
+        :param partition: dict of a csv partition
+        :return: str representing the filename of the converted partition
+        """
+        csv_path = self.get_path(partition)
+        converted = f'{os.path.splitext(partition["filename"])[0]}.{self.EXTENSIONS[self.format]}'
+        text_fields = set(self.TEXT_FIELDS)
+        converters = [str if field in text_fields else float for field in self.FIELDS]
+
+        with open(csv_path) as csvfile:
+            rows = (tuple(convert(row[field]) for convert, field in zip(converters, self.FIELDS))
+                    for row in read_csv_rows(csvfile, self.FIELDS))
+            NEOWriter().write_rows(self.format.value, rows, fields=self.FIELDS,
+                                   filename=os.path.join(self.directory, converted))
+        os.remove(csv_path)
+
+        return converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Split Near Earth Objects (NEOs) data into time partitions')
+    parser.add_argument('filename', type=str, help='Name of the input csv data file')
+    parser.add_argument('directory', type=str, help='Name of the partitioned data directory to write')
+    parser.add_argument('--by', choices=PartitionGranularity.list(), default=PartitionGranularity.month.value,
+                        type=str, help='Select the time span of every partition.')
+    parser.add_argument('--format', choices=[output_format.value for output_format in PartitionManifest.EXTENSIONS],
+                        default=OutputFormat.csv_file.value, type=str, help='Select the format of the partitions.')
+    args = parser.parse_args()
+
+    manifest = PartitionManifest.create(args.filename, args.directory, granularity=args.by, format=args.format)
+    print(f'Wrote {len(manifest.partitions)} partitions of {sum(p["rows"] for p in manifest.partitions)} rows '
+          f'to {args.directory}')
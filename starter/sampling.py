@@ -0,0 +1,114 @@
+import bisect
+import math
+import operator
+import random
+import statistics
+from collections import namedtuple
+
+
+Estimate = namedtuple('Estimate', ['value', 'low', 'high', 'sampled', 'population'])
+
+
+def estimate(total, sampled, population, confidence=0.95):
+    """
+    Estimates the total of a quantity over a population from a uniform sample of it, with a Wilson score interval
+    corrected for sampling without replacement. Every item contributes between 0 and 1 to the total, e.g. 1 for a
+    counted close approach, so the interval of a count is the interval of a proportion scaled to the population; for
+    fractional contributions it is conservative. A sample holding the whole population gives the exact total.
+
+    :param total: float representing the sum of the quantity over the sampled items
+    :param sampled: int representing the number of items sampled from the population
+    :param population: int representing the number of items in the population
+    :param confidence: float representing the probability of the interval holding the exact total
+    :return: Estimate of the total over the population and its interval
+    """
+    if sampled >= population:
+        return Estimate(total, total, total, sampled, population)
+    if not sampled:
+        return Estimate(0.0, 0.0, float(population), sampled, population)
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    # Effective sample size of sampling without replacement, growing without bound as the sample nears the population
+    n = sampled * (population - 1) / (population - sampled)
+    proportion = total / sampled
+    denominator = 1 + z * z / n
+    center = (proportion + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / n + z * z / (4 * n * n)) / denominator
+
+    return Estimate(proportion * population, max(center - margin, 0.0) * population,
+                    min(center + margin, 1.0) * population, sampled, population)
+
+
+class ReservoirSample(object):
+    """
+    Object holding a uniform random sample of up to size OrbitPaths out of every OrbitPath added to it.
+
+    The sample is kept with reservoir sampling, so it stays uniform whether the OrbitPaths are loaded at once or
+    ingested later, and Algorithm L skips ahead a random number of OrbitPaths between replacements, so adding n
+    OrbitPaths draws about size * log(n / size) random numbers instead of n. The sampled OrbitPaths are kept in close
+    approach date order, so the ones within a date range are found with two binary searches. The random generator is
+    seeded, so the same data loaded the same way is sampled the same way.
+    """
+
+    def __init__(self, size, seed=0):
+        """
+        :param size: int representing the maximum number of OrbitPaths held
+        :param seed: int representing the seed of the random generator
+        """
+        self.size = size
+        self.random = random.Random(seed)
+        # Number of OrbitPaths added, and the position among them of the next one to replace a sampled one
+        self.seen = 0
+        self.next = None
+        self.weight = None
+        self.reservoir = []
+
+        # Sampled OrbitPaths in close approach date order and their date ordinals
+        self.orbit_paths = []
+        self.keys = []
+
+    def add(self, orbits):
+        """
+        :param orbits: list of OrbitPath instances to add
+        :return: None
+        """
+        start = self.seen
+        self.seen += len(orbits)
+
+        if len(self.reservoir) < self.size:
+            self.reservoir.extend(orbits[:self.size - len(self.reservoir)])
+            if len(self.reservoir) == self.size and self.next is None:
+                self.weight = math.exp(math.log(self.get_uniform()) / self.size)
+                self.next = self.size - 1 + self.get_skip()
+
+        while self.next is not None and self.next < self.seen:
+            self.reservoir[self.random.randrange(self.size)] = orbits[self.next - start]
+            self.weight *= math.exp(math.log(self.get_uniform()) / self.size)
+            self.next += self.get_skip()
+
+        self.orbit_paths = sorted(self.reservoir, key=operator.attrgetter('close_approach_ordinal'))
+        self.keys = [orbit.close_approach_ordinal for orbit in self.orbit_paths]
+
+    def get_uniform(self):
+        """
+        :return: float drawn uniformly from (0, 1]
+        """
+        return 1.0 - self.random.random()
+
+    def get_skip(self):
+        """
+        :return: int representing the distance to the next OrbitPath replacing a sampled one, at least 1
+        """
+        if self.weight >= 1.0:
+            return 1
+        return int(math.log(self.get_uniform()) / math.log(1.0 - self.weight)) + 1
+
+    def get_orbit_paths_between(self, start_ordinal, end_ordinal):
+        """
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: list of the sampled OrbitPath instances within the dates, in close approach date order
+        """
+        start = bisect.bisect_left(self.keys, start_ordinal)
+        end = bisect.bisect_right(self.keys, end_ordinal)
+        return self.orbit_paths[start:end]
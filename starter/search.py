@@ -1,10 +1,18 @@
-import datetime
+import functools
+import heapq
+import itertools
+import math
 import operator
-from collections import namedtuple, defaultdict
+import threading
+import weakref
+from collections import namedtuple, defaultdict, OrderedDict
 from enum import Enum
 
+from database import DatabaseEngine
 from exceptions import UnsupportedFeature
-from models import NearEarthObject, OrbitPath
+from models import NearEarthObject, OrbitPath, date_to_ordinal
+from sampling import Estimate, estimate
+from stats import NEOStats
 
 
 class DateSearchType(Enum):
@@ -22,13 +30,33 @@ class DateSearchType(Enum):
         return list(map(lambda output: output.value, DateSearchType))
 
 
+class OrderBy(Enum):
+    """
+    Enum representing supported orderings of the unique Near Earth Objects found by a search: by their first close
+    approach, by their closest approach, by their diameter, largest first, or by their fastest approach. Close
+    approaches only count within the date search.
+    """
+    first_approach = 'first_approach'
+    distance = 'distance'
+    diameter = 'diameter'
+    velocity = 'velocity'
+
+    @staticmethod
+    def list():
+        """
+        :return: list of string representations of OrderBy enums
+        """
+        return list(map(lambda output: output.value, OrderBy))
+
+
 class Query(object):
     """
     Object representing the desired search query operation to build. The Query uses the Selectors
     to structure the query information into a format the NEOSearcher can use for date search.
     """
 
-    Selectors = namedtuple('Selectors', ['date_search', 'number', 'filters', 'return_object'])
+    Selectors = namedtuple('Selectors', ['date_search', 'number', 'filters', 'return_object', 'order'],
+                           defaults=[OrderBy.first_approach])
     DateSearch = namedtuple('DateSearch', ['type', 'values'])
     ReturnObjects = {'NEO': NearEarthObject, 'Path': OrbitPath}
 
@@ -46,6 +74,7 @@ class Query(object):
         if self.filter is None:
             self.filter = []
         self.return_object = kwargs.get('return_object', None)
+        self.order = kwargs.get('order', None) or OrderBy.first_approach.value
 
     def build_query(self):
         """
@@ -62,16 +91,18 @@ class Query(object):
         else:
             date_search = Query.DateSearch(type=DateSearchType.between,
                                            values=f'{self.start_date}:{self.end_date}')
-        # Construct filters
-        filters = Filter.create_filter_options(self.filter)
-
         # Construct return objects
         return_objects = Query.ReturnObjects[self.return_object]
+
+        # Construct filters
+        filters = Filter.create_filter_options(self.filter, return_objects)
+
         # Construct selectors
         selectors = Query.Selectors(date_search=date_search,
                                     number=self.number,
                                     filters=filters,
-                                    return_object=return_objects)
+                                    return_object=return_objects,
+                                    order=OrderBy(self.order))
         return selectors
 
 
@@ -79,6 +110,10 @@ class Filter(object):
     """
     Object representing optional filter options to be used in the date search for Near Earth Objects.
     Each filter is one of Filter. Operators provided with a field to filter on a value.
+
+    Filters of a NearEarthObject search are evaluated on every Near Earth Object, which passes the distance filter
+    when any of its orbits does. Filters of an OrbitPath search are evaluated on every close approach: the distance
+    filter on the OrbitPath itself and the other filters on its Near Earth Object.
     """
     Options = {
         # TODO: Create a dict of filter name to the NearEarthObject or OrbitalPath property
@@ -96,60 +131,97 @@ class Filter(object):
         "<=": operator.le
     }
 
-    def __init__(self, field, option, operation, value):
+    # Options read from the OrbitPath itself in an OrbitPath search
+    OrbitOptions = ('distance',)
+
+    def __init__(self, field, option, operation, value, return_object=NearEarthObject):
         """
         :param field: str representing field to filter on
         :param option: str representing option to filter on
         :param operation: str representing filter operation to perform
         :param value: str representing value to filter for
+        :param return_object: NearEarthObject or OrbitPath class of the results the filter is evaluated on
         """
         self.field = field
         self.option = option
         self.operation = operation
         self.value = value
+        self.return_object = return_object
+
+    @property
+    def is_orbit_filter(self):
+        """
+        :return: bool representing if the filter is evaluated on every OrbitPath rather than on a Near Earth Object
+        """
+        return self.return_object is OrbitPath and self.field in self.OrbitOptions
 
     @staticmethod
-    def create_filter_options(filter_options):
+    def create_filter_options(filter_options, return_object=NearEarthObject):
         """
         Class function that transforms filter options raw input into filters
 
         :param filter_options: list in format ["filter_option:operation:value_of_option", ...]
+        :param return_object: NearEarthObject or OrbitPath class of the results the filters are evaluated on
         :return: defaultdict with key of NearEarthObject or OrbitPath and value of empty list or list of Filters
         """
         # TODO: return a defaultdict of filters with key of NearEarthObject or OrbitPath and value of empty list or list of Filters
 
         filters_list = []
         for filter_option in filter_options:
-            option, operation, value = filter_option.split(':')
-
-            # Convert value from string to the respected data type
-            if option == 'is_hazardous':
-                value = (value == 'True')
-            else:
-                value = float(value)
+            option, operation, value = Filter.parse_filter_option(filter_option)
 
             # Create filter object
-            filter = Filter(field=None,
+            filter = Filter(field=option,
                             option=Filter.Options[option],
                             operation=Filter.Operators[operation],
-                            value=value)
+                            value=value,
+                            return_object=return_object)
 
             filters_list.append(filter)
 
         filters = defaultdict(list)
-        filters[NearEarthObject] = filters_list
+        filters[return_object] = filters_list
 
         return filters
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def parse_filter_option(filter_option):
+        """
+        Class function that parses one filter option raw input, once per distinct input
+
+        :param filter_option: str in format "filter_option:operation:value_of_option"
+        :return: tuple of the str option, the str operation and the value converted to its data type
+        """
+        option, operation, value = filter_option.split(':')
+
+        # Convert value from string to the respected data type
+        if option == 'is_hazardous':
+            value = (value == 'True')
+        else:
+            value = float(value)
+
+        return option, operation, value
+
+    def __str__(self):
+        """
+        :return: str representing the filter in its option:operation:value input format
+        """
+        operation = next(symbol for symbol, function in self.Operators.items() if function == self.operation)
+        return f'{self.field}:{operation}:{self.value}'
+
     def apply(self, results):
         """
         Function that applies the filter operation onto a set of results
 
-        :param results: List of Near Earth Object results
-        :return: filtered list of Near Earth Object results
+        :param results: List of Near Earth Object or OrbitPath results
+        :return: filtered list of Near Earth Object or OrbitPath results
         """
         # TODO: Takes a list of NearEarthObjects and applies the value of its filter operation to the results
 
+        if self.return_object is OrbitPath:
+            return list(filter(self.predicate(), results))
+
         filtered_results = []
         # Filter based on OrbitPath variables
         if self.option == self.Options['distance']:
@@ -166,19 +238,346 @@ class Filter(object):
 
         return filtered_results
 
+    def predicate(self):
+        """
+        Function that turns the filter operation into a predicate on a single result
+
+        :return: function taking a Near Earth Object, or an OrbitPath in an OrbitPath search, and returning True if
+                 it passes the filter
+        """
+        operation, value = self.operation, self.value
+
+        # Filter an OrbitPath search on the OrbitPath or on its Near Earth Object
+        if self.return_object is OrbitPath:
+            option = self.option
+            if self.is_orbit_filter:
+                return lambda orbit: operation(option(orbit), value)
+            return lambda orbit: operation(option(orbit.neo), value)
+
+        # Filter based on OrbitPath variables, a Near Earth Object passes if any of its orbits does
+        if self.option == self.Options['distance']:
+            return lambda neo: any(operation(orbit.miss_distance_kilometers, value) for orbit in neo.orbits)
+
+        # Filter based on NearEarthObject variables
+        option = self.option
+        return lambda result: operation(option(result), value)
+
+    @staticmethod
+    def compile(filters):
+        """
+        Class function that combines a list of filters into one predicate, so that all filters can be applied in a
+        single pass with the same results as chaining their apply functions
+
+        :param filters: list of Filters
+        :return: function taking a result and returning True if it passes every filter
+        """
+        predicates = [filter.predicate() for filter in filters]
+        if len(predicates) == 1:
+            return predicates[0]
+
+        return lambda result: all(predicate(result) for predicate in predicates)
+
+    @staticmethod
+    def apply_all(filters, results):
+        """
+        Class function that applies every filter onto a set of results in a single pass
+
+        :param filters: list of Filters
+        :param results: iterable of Near Earth Object or OrbitPath results
+        :return: filtered list of Near Earth Object or OrbitPath results
+        """
+        if not filters:
+            return list(results)
+
+        return list(filter(Filter.compile(filters), results))
+
+    @staticmethod
+    def get_mask(filters, db):
+        """
+        Class function that evaluates every filter as a column comparison over a ColumnarNEODatabase and combines
+        the results into a single mask
+
+        :param filters: list of Filters
+        :param db: ColumnarNEODatabase holding the NEO columns
+        :return: bytes with one entry per NEO id, non-zero if the NEO passes every filter, or None without filters
+        """
+        mask = None
+        for neo_filter in filters:
+            filter_mask = db.get_neo_mask(neo_filter)
+            mask = filter_mask if mask is None else bytes(map(operator.and_, mask, filter_mask))
+
+        return mask
+
+    @staticmethod
+    def get_orbit_mask(filters, db):
+        """
+        Class function that evaluates the filters of an OrbitPath search over a ColumnarNEODatabase: the filters on
+        the Near Earth Object as a mask over the NEO columns, see get_mask, and the filters on the OrbitPath as a mask
+        over the orbit columns
+
+        :param filters: list of Filters of an OrbitPath search
+        :param db: ColumnarNEODatabase holding the NEO and orbit columns
+        :return: tuple of the bytes NEO mask and the bytes orbit row mask, either None without such filters
+        """
+        neo_mask = Filter.get_mask([neo_filter for neo_filter in filters if not neo_filter.is_orbit_filter], db)
+        orbit_mask = None
+        for orbit_filter in filter(operator.attrgetter('is_orbit_filter'), filters):
+            filter_mask = db.get_orbit_mask(orbit_filter)
+            orbit_mask = filter_mask if orbit_mask is None else bytes(map(operator.and_, orbit_mask, filter_mask))
+
+        return neo_mask, orbit_mask
+
+
+class QueryCache(object):
+    """
+    Object holding the results of recently searched queries, shared by the NEOSearchers of a database.
+
+    Queries are keyed on a canonical form of their Query.Selectors, so e.g. a date equals search and a between search
+    over the same single day, or the same filters in another order, share a key. The cache holds up to maxsize
+    results and evicts the least recently used ones. Results are only valid for the data they were searched on, so
+    the cache is cleared whenever it is used with another database, or the database generation changes after data
+    is loaded or ingested.
+    """
+
+    CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+    def __init__(self, maxsize=128):
+        """
+        :param maxsize: int representing the maximum number of query results to hold
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Weak reference to the database the results were searched on, the cache does not keep it alive
+        self.db = None
+        self.generation = None
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(query):
+        """
+        :param query: Query.Selectors object with query information
+        :return: hashable canonical form of the query
+        """
+        filters = tuple(sorted(
+            (neo_filter.field, neo_filter.operation.__name__, neo_filter.value)
+            for neo_filter in query.filters[query.return_object]
+        ))
+        return NEOSearcher.get_date_range(query.date_search), query.number, query.return_object, query.order, filters
+
+    def get(self, db, key):
+        """
+        :param db: database the query is searched on
+        :param key: canonical form of the query
+        :return: list of results, or None if the results are not held
+        """
+        with self.lock:
+            if not self.is_current(db):
+                self.results.clear()
+                self.db = weakref.ref(db)
+                self.generation = db.generation
+
+            results = self.results.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.results.move_to_end(key)
+            return results
+
+    def put(self, db, key, results):
+        """
+        :param db: database the query was searched on
+        :param key: canonical form of the query
+        :param results: list of results
+        :return: None
+        """
+        with self.lock:
+            if not self.is_current(db):
+                return None
+
+            self.results[key] = results
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def is_current(self, db):
+        """
+        :param db: database a query is searched on
+        :return: bool representing if the results held were searched on the current data of the database
+        """
+        return self.db is not None and self.db() is db and self.generation == db.generation
+
+    def info(self):
+        """
+        :return: QueryCache.CacheInfo with the hit and miss counters and the size of the cache
+        """
+        with self.lock:
+            return QueryCache.CacheInfo(self.hits, self.misses, self.maxsize, len(self.results))
+
+
+class BatchQuery(object):
+    """
+    Object holding the state of one query of NEOSearcher.get_batch_objects during the shared scan of the date index:
+    the Near Earth Objects seen so far and, in order of first close approach, the ones passing its filters.
+    """
+
+    __slots__ = ('position', 'query', 'start_ordinal', 'end_ordinal', 'predicate', 'passes', 'number', 'seen',
+                 'found', 'done')
+
+    def __init__(self, position, query, start_ordinal, end_ordinal, predicate, passes):
+        """
+        :param position: int representing the position of the query in the batch
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param predicate: function taking a NearEarthObject or NEO id and returning True if it passes the filters, or
+                          None without filters
+        :param passes: dict of the NearEarthObject or NEO id to the result of the predicate, shared by the queries
+                       with equal filters
+        """
+        self.position = position
+        self.query = query
+        self.start_ordinal = start_ordinal
+        self.end_ordinal = end_ordinal
+        self.predicate = predicate
+        self.passes = passes
+        # Ranked queries need all of their results
+        self.number = query.number if query.order == OrderBy.first_approach else None
+        self.seen = set()
+        self.found = []
+        self.done = self.number == 0
+
+    def add(self, keys):
+        """
+        :param keys: list of the NearEarthObject or NEO id of every close approach on a date within the query dates
+        :return: None
+        """
+        seen, found, predicate, passes = self.seen, self.found, self.predicate, self.passes
+        for key in keys:
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if predicate is not None:
+                key_passes = passes.get(key)
+                if key_passes is None:
+                    key_passes = passes[key] = bool(predicate(key))
+                if not key_passes:
+                    continue
+
+            found.append(key)
+            if self.number is not None and len(found) >= self.number:
+                self.done = True
+                return None
+
+
+class AccessPath(Enum):
+    """
+    Enum representing the access paths a QueryPlan drives its search from.
+    """
+    date_index = 'date_index'
+    secondary_index = 'secondary_index'
+    ranked_index = 'ranked_index'
+    columns = 'columns'
+    sql = 'sql'
+
+    @staticmethod
+    def list():
+        """
+        :return: list of string representations of AccessPath enums
+        """
+        return list(map(lambda access_path: access_path.value, AccessPath))
+
+
+class QueryPlan(object):
+    """
+    Object representing a query prepared by NEOSearcher.prepare: its date range as ordinals, its filters compiled
+    into one predicate, its QueryCache key and the access path chosen for the data of the database. A plan is searched
+    any number of times by NEOSearcher.get_objects or iter_objects without parsing or planning its query again, and
+    is planned again once the database generation changes after data is loaded or ingested.
+    """
+
+    __slots__ = ('query', 'start_ordinal', 'end_ordinal', 'filters', 'predicate', 'key', 'generation',
+                 'access_path', 'index_filter', 'source', 'estimates', 'details')
+
+    def __init__(self, query, start_ordinal, end_ordinal, generation):
+        """
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param generation: int representing the database generation the plan is chosen for
+        """
+        self.query = query
+        self.start_ordinal = start_ordinal
+        self.end_ordinal = end_ordinal
+        self.filters = query.filters[query.return_object]
+        self.predicate = Filter.compile(self.filters) if self.filters else None
+        self.key = QueryCache.get_key(query)
+        self.generation = generation
+        self.access_path = None
+        # Filter whose secondary index drives a secondary_index search
+        self.index_filter = None
+        # QueryPlan of the search in order of first close approach a ranked date_index search orders
+        self.source = None
+        # Estimated numbers of entries read by the access paths considered, by name
+        self.estimates = {}
+        # Steps of the query plan of the database itself, e.g. the SQLite query plan
+        self.details = []
+
+    def explain(self):
+        """
+        :return: str representing the plan, one step per line
+        """
+        query = self.query
+        dates = query.date_search.values.replace(':', ' to ')
+        lines = [f'{query.return_object.__name__} search of {dates} in {query.order.value} order, '
+                 f'number {"all" if query.number is None else query.number}']
+
+        access_path = self.access_path.value
+        if self.index_filter is not None:
+            access_path = f'{access_path} {self.index_filter}'
+        elif self.access_path == AccessPath.ranked_index:
+            access_path = f'{access_path} {query.order.value}'
+        lines.append(f'access path: {access_path}')
+
+        residual_filters = [str(query_filter) for query_filter in self.filters if query_filter is not self.index_filter]
+        if residual_filters:
+            lines.append(f'filters: {", ".join(residual_filters)}')
+        for name, count in self.estimates.items():
+            lines.append(f'estimate {name}: {count}')
+        lines.extend(self.details)
+        if self.source is not None:
+            lines.append('ranks:')
+            lines.extend(f'  {line}' for line in self.source.explain().splitlines())
+
+        return '\n'.join(lines)
+
 
 class NEOSearcher(object):
     """
     Object with date search functionality on Near Earth Objects exposed by a generic
     search interface get_objects, which, based on the query specifications, determines
     how to perform the search.
+
+    A sampled NEOSearcher answers from the ReservoirSample of a NEODatabase instead, at a cost bounded by the sample
+    size however wide the dates searched: searches return a representative subset of the results, see
+    sample_objects, and count returns an estimate with a confidence interval.
     """
 
-    def __init__(self, db):
+    def __init__(self, db, cache=None, stats=None, sampled=False):
         """
         :param db: NEODatabase holding the NearEarthObject instances and their OrbitPath instances
+        :param cache: QueryCache to reuse the results of repeated queries from, or None to always search
+        :param stats: NEOStats measuring the stages of every search, or None to not measure them
+        :param sampled: bool representing if searches and counts are answered from the sample of the database
         """
         self.db = db
+        self.cache = cache
+        self.stats = stats or NEOStats(enabled=False)
+        self.sampled = sampled
         # TODO: What kind of an instance variable can we use to connect DateSearch to how we do search?
 
     def get_objects(self, query):
@@ -189,7 +588,7 @@ class NEOSearcher(object):
         Once any filters provided are applied, return the number of requested objects in the query.return_object
         specified.
 
-        :param query: Query.Selectors object with query information
+        :param query: Query.Selectors object with query information, or its QueryPlan, see prepare
         :return: Dataset of NearEarthObjects or OrbitalPaths
         """
         # TODO: This is a generic method that will need to understand, using DateSearch, how to implement search
@@ -197,28 +596,846 @@ class NEOSearcher(object):
         # TODO: needs to support that then your filters can be applied to. Remember to return the number specified in
         # TODO: the Query.Selectors as well as in the return_object from Query.Selectors
 
+        return list(self.iter_objects(query))
+
+    def prepare(self, query):
+        """
+        Query planner compiling a query into a QueryPlan, which parses its dates, compiles its filters and chooses
+        the access path of its search once, so a query searched repeatedly is only planned once. A NEODatabase
+        search is driven from the secondary index of its most selective filter or of its order when that is expected
+        to read fewer entries than the date index, see choose_index_filter and rank.
+
+        :param query: Query.Selectors object with query information
+        :return: QueryPlan of the query
+        """
+        start_ordinal, end_ordinal = self.get_date_range(query.date_search)
+        plan = QueryPlan(query, start_ordinal, end_ordinal, self.db.generation)
+
+        if self.db.engine == DatabaseEngine.columnar:
+            plan.access_path = AccessPath.columns
+        elif self.db.engine == DatabaseEngine.sqlite:
+            plan.access_path = AccessPath.sql
+            plan.details = self.db.explain(start_ordinal, end_ordinal, plan.filters)
+        elif query.order == OrderBy.first_approach:
+            plan.index_filter = self.choose_index_filter(plan.filters, start_ordinal, end_ordinal, plan.estimates)
+            plan.access_path = AccessPath.date_index if plan.index_filter is None else AccessPath.secondary_index
+        else:
+            # Approaches within the dates are spread over the whole index, so about number * total / dates entries
+            # are walked
+            start, end = self.db.get_date_index_range(start_ordinal, end_ordinal)
+            plan.estimates['date_index'] = end - start
+            plan.access_path = AccessPath.date_index
+            if query.order.value in self.db.secondary_indexes and query.number is not None and end > start:
+                plan.estimates[f'ranked_index {query.order.value}'] = \
+                    query.number * len(self.db.orbit_paths) // (end - start)
+                if query.number * len(self.db.orbit_paths) < (end - start) ** 2:
+                    plan.access_path = AccessPath.ranked_index
+            if plan.access_path == AccessPath.date_index and query.return_object is NearEarthObject:
+                plan.source = self.prepare(query._replace(number=None, order=OrderBy.first_approach))
+
+        return plan
+
+    def get_plan(self, query):
+        """
+        :param query: Query.Selectors object with query information, or its QueryPlan
+        :return: QueryPlan of the query, planned again if the data of the database changed since it was planned
+        """
+        if isinstance(query, QueryPlan):
+            if query.generation == self.db.generation:
+                return query
+            query = query.query
+
+        return self.prepare(query)
+
+    def get_batch_objects(self, queries):
+        """
+        Batch search interface returning the results of get_objects for every query with one shared scan of the
+        date index. Queries are grouped into spans of overlapping date searches, every date of a span is scanned once
+        and each Near Earth Object on it is checked against all the queries searching that date, so overlapping
+        queries do not rescan the same dates. Queries with equal filters share the result of evaluating them on a
+        Near Earth Object. Queries in any other OrderBy order collect all of their results in the scan and are ranked
+        afterwards, see order_results. OrbitPath searches are searched one at a time, see search_paths.
+
+        :param queries: list of Query.Selectors objects with query information, or their QueryPlans
+        :return: list of the list of NearEarthObjects or OrbitalPaths of every query, in query order
+        """
+        if self.sampled:
+            return list(map(self.sample_objects, queries))
+
+        results = [None] * len(queries)
+        generation = self.db.generation
+        # The columnar and SQLite engines scan NEO ids instead of NearEarthObject instances
+        by_neo_id = self.db.engine in (DatabaseEngine.columnar, DatabaseEngine.sqlite)
+
+        batch_queries = []
+        predicates = {}
+        for position, plan in enumerate(map(self.get_plan, queries)):
+            if self.cache is not None:
+                cached = self.cache.get(self.db, plan.key)
+                if cached is not None:
+                    results[position] = list(cached)
+                    continue
+
+            # Close approaches are not shared by the scan, so an OrbitPath search is searched on its own
+            if plan.query.return_object is OrbitPath:
+                results[position] = list(self.search(plan))
+                if self.cache is not None and generation == self.db.generation:
+                    self.cache.put(self.db, plan.key, list(results[position]))
+                continue
+
+            # Queries with equal filters share one predicate and its results
+            filters_key = plan.key[-1]
+            if filters_key not in predicates:
+                if by_neo_id and plan.filters:
+                    predicate = Filter.get_mask(plan.filters, self.db).__getitem__
+                else:
+                    predicate = plan.predicate
+                predicates[filters_key] = (predicate, {})
+            batch_queries.append(BatchQuery(position, plan.query, plan.start_ordinal, plan.end_ordinal,
+                                            *predicates[filters_key]))
+
+        with self.stats.time('search.batch') as stage:
+            # Group the queries into spans of overlapping date searches
+            spans = []
+            for batch_query in sorted(batch_queries, key=operator.attrgetter('start_ordinal')):
+                if spans and batch_query.start_ordinal <= spans[-1][1]:
+                    spans[-1][1] = max(spans[-1][1], batch_query.end_ordinal)
+                    spans[-1][2].append(batch_query)
+                else:
+                    spans.append([batch_query.start_ordinal, batch_query.end_ordinal, [batch_query]])
+
+            for start_ordinal, end_ordinal, span_queries in spans:
+                stage.add(rows_in=self.scan_dates(span_queries, start_ordinal, end_ordinal))
+
+            neos = {}
+            for batch_query in batch_queries:
+                query, found = batch_query.query, batch_query.found
+                if by_neo_id:
+                    # Every NEO id found by several queries is built once
+                    for neo_id in found:
+                        if neo_id not in neos:
+                            neos[neo_id] = self.db.get_near_earth_object(neo_id)
+                    found = list(map(neos.__getitem__, found))
+                if query.order != OrderBy.first_approach:
+                    found = self.order_results(found, query.order, query.number,
+                                               batch_query.start_ordinal, batch_query.end_ordinal)
+                results[batch_query.position] = found
+                stage.add(rows_out=len(found))
+
+                if self.cache is not None and generation == self.db.generation:
+                    self.cache.put(self.db, QueryCache.get_key(query), list(found))
+
+        return results
+
+    def scan_dates(self, batch_queries, start_ordinal, end_ordinal):
+        """
+        Scans the dates of a span once for all the BatchQuery searching them
+
+        :param batch_queries: list of BatchQuery in order of their start date ordinal
+        :param start_ordinal: int representing the ordinal of the start date of the span
+        :param end_ordinal: int representing the ordinal of the end date of the span, inclusive
+        :return: int representing the number of close approaches scanned
+        """
+        scanned = 0
+        pending = [batch_query for batch_query in batch_queries if not batch_query.done]
+        for ordinal, keys in self.db.iter_dates_between(start_ordinal, end_ordinal):
+            # Queries drop out of the scan once they have their number of results or their dates are passed
+            pending = [batch_query for batch_query in pending
+                       if not batch_query.done and batch_query.end_ordinal >= ordinal]
+            if not pending:
+                break
+
+            for batch_query in pending:
+                if batch_query.start_ordinal <= ordinal:
+                    batch_query.add(keys)
+            scanned += len(keys)
+
+        return scanned
+
+    def iter_objects(self, query):
+        """
+        Lazy search interface returning the results of get_objects as a pipeline of iterators: date search, unique
+        Near Earth Objects in order of their first close approach, filters and the requested number. Nothing is
+        searched until the results are consumed and the search stops as soon as the requested number is found.
+        Results in any other OrderBy order are ranked once all of them are found, see order_results.
+
+        Filters only depend on the Near Earth Object, so unique results are taken before filtering and every filter
+        is evaluated once per Near Earth Object. An OrbitPath search returns close approaches instead, see
+        search_paths.
+
+        :param query: Query.Selectors object with query information, or its QueryPlan, see prepare
+        :return: iterator of NearEarthObjects or OrbitalPaths
+        """
+        if self.sampled:
+            return self.stats.iterate('search.sample', iter(self.sample_objects(query)))
+        if self.cache is None:
+            return self.stats.iterate('search', self.search(query))
+
+        # A cached query is searched in full once, then a copy of its results is reused, as the cached list is shared
+        plan = self.get_plan(query)
+        cached = self.cache.get(self.db, plan.key)
+        if cached is not None:
+            results = list(cached)
+        else:
+            generation = self.db.generation
+            results = list(self.search(plan))
+            if generation == self.db.generation:
+                self.cache.put(self.db, plan.key, list(results))
+
+        return self.stats.iterate('search', iter(results))
+
+    def count(self, query, confidence=0.95):
+        """
+        Counts the results of a query regardless of its requested number: the unique Near Earth Objects of a
+        NearEarthObject search or the close approaches of an OrbitPath search. A sampled NEOSearcher estimates the
+        count from the sample, see get_sample, otherwise the results are counted exactly.
+
+        :param query: Query.Selectors object with query information, or its QueryPlan
+        :param confidence: float representing the probability of the interval of an estimate holding the exact count
+        :return: Estimate of the count, with equal low and high bounds when counted exactly
+        """
+        if not self.sampled:
+            plan = self.get_plan(query)
+            total = sum(1 for _ in self.search(plan.query._replace(number=None, order=OrderBy.first_approach)))
+            return Estimate(total, total, total, total, total)
+
+        orbits, weights, sampled, population = self.get_sample(query)
+        if self.get_plan(query).query.return_object is OrbitPath:
+            return estimate(len(orbits), sampled, population, confidence)
+        return estimate(sum(weights), sampled, population, confidence)
+
+    def get_sample(self, query):
+        """
+        Reads the sampled OrbitPaths within the date search of a query from the ReservoirSample of the database.
+        The sample is uniform over every close approach, so the sampled ones within the dates are a uniform sample
+        of the close approaches within the dates, whose exact number is read from the date index.
+
+        A Near Earth Object with k close approaches counted within the dates is k times as likely to be sampled, so
+        each of its sampled approaches weighs 1 / k in a count of Near Earth Objects: its approaches passing an
+        OrbitPath search, or all of them for a NearEarthObject search.
+
+        :param query: Query.Selectors object with query information, or its QueryPlan
+        :return: tuple of the list of sampled OrbitPaths within the dates passing the filters, in close approach date
+                 order, the list of their weights in a count of Near Earth Objects, the int number of sampled
+                 OrbitPaths within the dates and the int number of OrbitPaths within the dates
+        """
+        if getattr(self.db, 'sample', None) is None:
+            raise UnsupportedFeature('Sampling requires a NEODatabase with a sample_size')
+
+        plan = self.get_plan(query)
+        start_ordinal, end_ordinal, predicate = plan.start_ordinal, plan.end_ordinal, plan.predicate
+        orbits = self.db.sample.get_orbit_paths_between(start_ordinal, end_ordinal)
+        start, end = self.db.get_date_index_range(start_ordinal, end_ordinal)
+
+        if plan.query.return_object is OrbitPath:
+            passing = orbits if predicate is None else list(filter(predicate, orbits))
+
+            def get_count(neo):
+                return sum(1 for orbit in neo.orbits if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal
+                           and (predicate is None or predicate(orbit)))
+        else:
+            passing = [orbit for orbit in orbits if predicate is None or predicate(orbit.neo)]
+
+            def get_count(neo):
+                return sum(1 for orbit in neo.orbits if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal)
+
+        counts = {}
+        for orbit in passing:
+            if orbit.neo not in counts:
+                counts[orbit.neo] = get_count(orbit.neo)
+        weights = [1 / counts[orbit.neo] for orbit in passing]
+
+        return passing, weights, len(orbits), end - start
+
+    def sample_objects(self, query):
+        """
+        Representative subset of the results of a query, read from the sample, see get_sample: the unique Near
+        Earth Objects of the sampled close approaches of a NearEarthObject search, or the sampled close approaches of
+        an OrbitPath search. When more than the requested number are sampled, the requested number is taken evenly
+        spread over the dates, then put in OrderBy order.
+
+        :param query: Query.Selectors object with query information, or its QueryPlan
+        :return: list of NearEarthObjects or OrbitalPaths
+        """
+        plan = self.get_plan(query)
+        query = plan.query
+        results, _, _, _ = self.get_sample(plan)
+        if query.return_object is NearEarthObject:
+            results = list(self.unique(map(operator.attrgetter('neo'), results)))
+
+        if query.number is not None and len(results) > query.number:
+            results = [results[index * len(results) // query.number] for index in range(query.number)]
+
+        if query.order == OrderBy.first_approach:
+            return results
+        if query.return_object is OrbitPath:
+            return self.order_paths(results, query.order, None)
+        return self.order_results(results, query.order, None, plan.start_ordinal, plan.end_ordinal)
+
+    def search(self, query):
+        """
+        Lazy search pipeline behind iter_objects, without the QueryCache, driven from the access path of the
+        QueryPlan of the query
+
+        :param query: Query.Selectors object with query information, or its QueryPlan
+        :return: iterator of NearEarthObjects or OrbitalPaths
+        """
+        plan = self.get_plan(query)
+        query, start_ordinal, end_ordinal = plan.query, plan.start_ordinal, plan.end_ordinal
+
+        # An OrbitPath search returns the close approaches themselves
+        if query.return_object is OrbitPath:
+            return self.search_paths(plan)
+
+        # Any other order is a ranked search
+        if query.order != OrderBy.first_approach:
+            with self.stats.time('search.rank') as stage:
+                results = self.rank(plan)
+                stage.add(rows_out=len(results))
+            return iter(results)
+
+        if plan.access_path == AccessPath.columns:
+            return self.iter_columnar_objects(query, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.sql:
+            return self.iter_sqlite_objects(query, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.secondary_index:
+            with self.stats.time('search.indexed'):
+                return self.iter_indexed_objects(query, plan.index_filter, start_ordinal, end_ordinal)
+
         # Perform date search
+        orbits = self.stats.iterate('search.date_index', self.db.iter_orbit_paths_between(start_ordinal, end_ordinal))
+        results = self.stats.iterate('search.unique', self.unique(map(operator.attrgetter('neo'), orbits)),
+                                     source='search.date_index')
+
+        # Implement filters
+        if plan.filters:
+            results = self.apply_filters(plan.filters, results, source='search.unique', predicate=plan.predicate)
+
+        # Return requested number only
+        return itertools.islice(results, query.number)
+
+    def search_paths(self, plan):
+        """
+        Lazy search pipeline of an OrbitPath search, which returns every close approach within the date search
+        passing the filters instead of unique Near Earth Objects, so a result is a single approach rather than the
+        whole orbit history of its Near Earth Object. Approaches are returned in order of close approach, or in
+        OrderBy order of their own miss distance or velocity or of the diameter of their Near Earth Object, with equal
+        keys in order of close approach.
+
+        :param plan: QueryPlan of the OrbitPath search
+        :return: iterator of OrbitPaths
+        """
+        query, start_ordinal, end_ordinal = plan.query, plan.start_ordinal, plan.end_ordinal
+        if plan.access_path == AccessPath.columns:
+            return self.iter_columnar_paths(query, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.sql:
+            return self.iter_sqlite_paths(query, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.secondary_index:
+            with self.stats.time('search.indexed'):
+                return self.iter_indexed_paths(query, plan.index_filter, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.ranked_index:
+            with self.stats.time('search.rank') as stage:
+                results = self.rank_indexed_paths(plan, self.db.secondary_indexes[query.order.value])
+                stage.add(rows_out=len(results))
+            return iter(results)
+
+        # Perform date search
+        orbits = self.stats.iterate('search.date_index', self.db.iter_orbit_paths_between(start_ordinal, end_ordinal))
+
+        # Implement filters
+        if plan.filters:
+            orbits = self.apply_filters(plan.filters, orbits, source='search.date_index', predicate=plan.predicate)
+
+        if query.order == OrderBy.first_approach:
+            return itertools.islice(orbits, query.number)
+
+        with self.stats.time('search.rank') as stage:
+            results = self.order_paths(orbits, query.order, query.number)
+            stage.add(rows_out=len(results))
+        return iter(results)
+
+    def iter_indexed_paths(self, query, index_filter, start_ordinal, end_ordinal):
+        """
+        OrbitPath search driven by the secondary index of a filter, see iter_indexed_objects. The distance index
+        holds the OrbitPaths themselves and the other indexes hold Near Earth Objects, whose OrbitPaths are checked.
+
+        :param query: Query.Selectors object with query information
+        :param index_filter: Filter whose secondary index drives the search
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of OrbitPaths
+        """
+        index = self.db.secondary_indexes[index_filter.field]
+        orbits = index.find(index_filter.operation, index_filter.value)
+        if not index_filter.is_orbit_filter:
+            orbits = itertools.chain.from_iterable(map(operator.attrgetter('orbits'), orbits))
+        index_stage = f'search.index {index_filter}'
+        orbits = self.stats.iterate(index_stage, orbits)
+
+        # Implement date search and residual filters
+        orbits = [orbit for orbit in orbits if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal]
+        residual_filters = [orbit_filter for orbit_filter in query.filters[query.return_object]
+                            if orbit_filter is not index_filter]
+        if residual_filters:
+            orbits = self.apply_filters(residual_filters, orbits, source=index_stage)
+
+        # Return requested number only, in order of close approach
+        positioned_orbits = [(self.db.get_orbit_position(orbit), orbit) for orbit in orbits]
+        if query.number is None:
+            positioned_orbits.sort(key=operator.itemgetter(0))
+        else:
+            positioned_orbits = heapq.nsmallest(query.number, positioned_orbits, key=operator.itemgetter(0))
+        return map(operator.itemgetter(1), positioned_orbits)
+
+    def rank_indexed_paths(self, plan, index):
+        """
+        Ranked OrbitPath search walking the secondary index of the order, see rank_indexed_objects
+
+        :param plan: QueryPlan of the ranked OrbitPath search, whose compiled predicate filters the OrbitPaths
+        :param index: SortedIndex of the order, holding NearEarthObjects or OrbitPaths
+        :return: list of OrbitPaths
+        """
+        query, start_ordinal, end_ordinal, predicate = plan.query, plan.start_ordinal, plan.end_ordinal, plan.predicate
+
         results = []
-        if query.date_search.type == DateSearchType.equals:
-            results += self.db.neo_orbit_paths_date_to_neo.get(query.date_search.values, [])
-        elif query.date_search.type == DateSearchType.between:
-            start_date, end_date = query.date_search.values.split(':')
-            start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-            end_date = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-            # End date inclusive
-            date_array = (start_date + datetime.timedelta(days=x)
-                          for x in range(0, (end_date - start_date).days + 1))
-            for date_object in date_array:
-                results += self.db.neo_orbit_paths_date_to_neo.get(date_object.strftime("%Y-%m-%d"), [])
+        for _, values in index.iter_groups(reverse=query.order != OrderBy.distance):
+            if query.order == OrderBy.diameter:
+                values = itertools.chain.from_iterable(map(operator.attrgetter('orbits'), values))
+            group = [orbit for orbit in values if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal and
+                     (predicate is None or predicate(orbit))]
+
+            if len(group) > 1:
+                group.sort(key=self.db.get_orbit_position)
+            results.extend(group)
+            if len(results) >= query.number:
+                break
+
+        return results[:query.number]
+
+    def iter_columnar_paths(self, query, start_ordinal, end_ordinal):
+        """
+        Lazy OrbitPath search for a ColumnarNEODatabase, which evaluates the filters as masks over the NEO and orbit
+        columns and only builds OrbitPath instances for the results that are consumed.
+
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of OrbitPaths
+        """
+        rows = self.stats.iterate('search.date_index', self.db.iter_rows_between(start_ordinal, end_ordinal))
+        source = 'search.date_index'
+
+        filters = query.filters[query.return_object]
+        if filters:
+            neo_mask, orbit_mask = Filter.get_orbit_mask(filters, self.db)
+            if neo_mask is not None:
+                orbit_neo_ids = self.db.orbit_neo_ids
+                rows = filter(lambda row: neo_mask[orbit_neo_ids[row]], rows)
+            if orbit_mask is not None:
+                rows = filter(orbit_mask.__getitem__, rows)
+            rows = self.stats.iterate('search.filter', rows, source=source)
+            source = 'search.filter'
+
+        if query.order == OrderBy.first_approach:
+            rows = itertools.islice(rows, query.number)
+        else:
+            with self.stats.time('search.rank') as stage:
+                rows = self.rank_columnar_rows(rows, query.order, query.number)
+                stage.add(rows_out=len(rows))
+
+        # Build the requested number only
+        return self.stats.iterate('search.build', self.db.get_orbit_paths(rows), source=source)
+
+    def rank_columnar_rows(self, rows, order, number):
+        """
+        :param rows: iterable of orbit rows of a ColumnarNEODatabase in order of close approach
+        :param order: OrderBy to order the rows by
+        :param number: int representing the number of rows to return, or None for all
+        :return: list of orbit rows in OrderBy order, equal keys in order of close approach
+        """
+        if order == OrderBy.distance:
+            key = self.db.orbit_columns['miss_distance_kilometers'].__getitem__
+        elif order == OrderBy.velocity:
+            velocities = self.db.orbit_columns['kilometers_per_second']
+
+            def key(row):
+                return -velocities[row]
+        elif order == OrderBy.diameter:
+            diameters, orbit_neo_ids = self.db.neo_columns['estimated_diameter_min_kilometers'], self.db.orbit_neo_ids
+
+            def key(row):
+                return -diameters[orbit_neo_ids[row]]
         else:
             raise UnsupportedFeature
 
-        # Implement filters
-        for filter in query.filters[query.return_object]:
-            results = filter.apply(results)
+        if number is None:
+            return sorted(rows, key=key)
+        return heapq.nsmallest(number, rows, key=key)
 
-        # Use set function to make sure the results are unique
-        results = list(set(results))
+    def iter_sqlite_paths(self, query, start_ordinal, end_ordinal):
+        """
+        Lazy OrbitPath search for a SQLiteNEODatabase, which evaluates the date search, the filters and any OrderBy
+        order in one indexed SQL query and only builds OrbitPath instances for the results that are consumed.
+
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of OrbitPaths
+        """
+        filters = query.filters[query.return_object]
+        if query.order == OrderBy.first_approach:
+            orbit_ids = self.db.iter_orbit_ids_between(start_ordinal, end_ordinal, filters)
+            orbit_ids = itertools.islice(self.stats.iterate('search.sql', orbit_ids), query.number)
+        else:
+            with self.stats.time('search.sql') as stage:
+                orbit_ids = self.db.rank_orbit_ids(query.order.value, start_ordinal, end_ordinal, filters,
+                                                   query.number)
+                stage.add(rows_out=len(orbit_ids))
+
+        # Build the requested number only
+        return self.stats.iterate('search.build', self.db.get_orbit_paths(orbit_ids), source='search.sql')
+
+    def apply_filters(self, filters, results, source, predicate=None):
+        """
+        Applies every filter onto the results in a single pass, or one filter at a time while stats are measured so
+        the rows in and out of every filter are counted
+
+        :param filters: list of Filters
+        :param results: iterable of Near Earth Object results
+        :param source: str representing the name of the stage the results come from
+        :param predicate: function compiled from the filters, see Filter.compile, or None to compile it
+        :return: iterator of the filtered results
+        """
+        if not self.stats.enabled:
+            return filter(predicate or Filter.compile(filters), results)
+
+        for neo_filter in filters:
+            name = f'search.filter {neo_filter}'
+            results = self.stats.iterate(name, filter(neo_filter.predicate(), results), source=source)
+            source = name
+
+        return results
+
+    def choose_index_filter(self, filters, start_ordinal, end_ordinal, estimates=None):
+        """
+        Query planner choosing the access path driving a search: the date index, or the secondary index of the
+        filter with the fewest matching entries when that is fewer than the OrbitPaths within the date search.
+        Both counts are found with binary searches. An OrbitPath search driven by an index of Near Earth Objects
+        reads every OrbitPath of the ones found, so their count is scaled by the mean number of OrbitPaths per Near
+        Earth Object.
+
+        :param filters: list of Filters of the query
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :param estimates: dict updated with the count of every access path considered, by name, or None
+        :return: Filter whose secondary index drives the search, or None to drive it from the date index
+        """
+        start, end = self.db.get_date_index_range(start_ordinal, end_ordinal)
+        index_filter, fewest = None, end - start
+        if estimates is not None:
+            estimates['date_index'] = fewest
+        for neo_filter in filters:
+            index = self.db.secondary_indexes.get(neo_filter.field)
+            if index is not None:
+                count = index.count(neo_filter.operation, neo_filter.value)
+                if neo_filter.return_object is OrbitPath and not neo_filter.is_orbit_filter:
+                    count = count * len(self.db.orbit_paths) // max(len(self.db.neo_name_to_instance), 1)
+                if estimates is not None:
+                    estimates[f'secondary_index {neo_filter}'] = count
+                if count < fewest:
+                    index_filter, fewest = neo_filter, count
+
+        return index_filter
+
+    def iter_indexed_objects(self, query, index_filter, start_ordinal, end_ordinal):
+        """
+        Search interface driven by the secondary index of a filter. The Near Earth Objects found in the index are
+        checked against the residual filters and the date search, then ordered by their first close approach within
+        the date search, like the results of the date index driven search.
+
+        :param query: Query.Selectors object with query information
+        :param index_filter: Filter whose secondary index drives the search
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of NearEarthObjects
+        """
+        index = self.db.secondary_indexes[index_filter.field]
+        results = index.find(index_filter.operation, index_filter.value)
+        if index_filter.option == Filter.Options['distance']:
+            # The distance index holds OrbitPaths
+            results = map(operator.attrgetter('neo'), results)
+        index_stage = f'search.index {index_filter}'
+        results = self.stats.iterate(index_stage, results)
+        results = self.stats.iterate('search.unique', self.unique(results), source=index_stage)
+
+        # Implement residual filters
+        residual_filters = [neo_filter for neo_filter in query.filters[query.return_object]
+                            if neo_filter is not index_filter]
+        if residual_filters:
+            results = self.apply_filters(residual_filters, results, source='search.unique')
+
+        # Implement date search as a residual filter
+        positioned_results = []
+        for neo in results:
+            dates = [orbit.close_approach_ordinal for orbit in neo.orbits
+                     if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal]
+            if dates:
+                first_date = min(dates)
+                position = min(self.db.get_orbit_position(orbit) for orbit in neo.orbits
+                               if orbit.close_approach_ordinal == first_date)
+                positioned_results.append((position, neo))
+
+        # Return requested number only, in order of first close approach
+        if query.number is None:
+            positioned_results.sort()
+        else:
+            positioned_results = heapq.nsmallest(query.number, positioned_results)
+        return map(operator.itemgetter(1), positioned_results)
+
+    def iter_columnar_objects(self, query, start_ordinal, end_ordinal):
+        """
+        Lazy search interface for a ColumnarNEODatabase, which evaluates the filters as one mask over the columns
+        and only builds NearEarthObject instances for the results that are consumed.
+
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of NearEarthObjects
+        """
+        # Perform date search
+        rows = self.stats.iterate('search.date_index', self.db.iter_rows_between(start_ordinal, end_ordinal))
+        neo_ids = self.stats.iterate('search.unique', self.unique(map(self.db.orbit_neo_ids.__getitem__, rows)),
+                                     source='search.date_index')
+
+        # Implement filters as one combined mask over the NEO ids, or one mask per filter while stats are measured
+        filters = query.filters[query.return_object]
+        source = 'search.unique'
+        if not self.stats.enabled:
+            mask = Filter.get_mask(filters, self.db)
+            if mask is not None:
+                neo_ids = filter(mask.__getitem__, neo_ids)
+        else:
+            for neo_filter in filters:
+                name = f'search.filter {neo_filter}'
+                with self.stats.time(f'search.mask {neo_filter}'):
+                    mask = Filter.get_mask([neo_filter], self.db)
+                neo_ids = self.stats.iterate(name, filter(mask.__getitem__, neo_ids), source=source)
+                source = name
+
+        # Build the requested number only
+        return self.stats.iterate('search.build', map(self.db.get_near_earth_object,
+                                                      itertools.islice(neo_ids, query.number)), source=source)
+
+    def iter_sqlite_objects(self, query, start_ordinal, end_ordinal):
+        """
+        Lazy search interface for a SQLiteNEODatabase, which evaluates the date search and the filters in one
+        indexed SQL query and only builds NearEarthObject instances for the results that are consumed.
+
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: iterator of NearEarthObjects
+        """
+        neo_ids = self.db.iter_neo_ids_between(start_ordinal, end_ordinal, query.filters[query.return_object])
+        neo_ids = self.stats.iterate('search.sql', neo_ids)
+        neo_ids = self.stats.iterate('search.unique', self.unique(neo_ids), source='search.sql')
+
+        # Build the requested number only
+        return self.stats.iterate('search.build', map(self.db.get_near_earth_object,
+                                                      itertools.islice(neo_ids, query.number)),
+                                  source='search.unique')
+
+    def rank(self, plan):
+        """
+        Ranked search returning the requested number of unique results in OrderBy order. A ColumnarNEODatabase
+        ranks NEO ids by their keys computed over the columns, a SQLiteNEODatabase ranks them in SQL, and a
+        NEODatabase walks the secondary index of the order when there is one and the requested number is expected to
+        be found early in the walk. Otherwise every result found in order of first close approach is ranked.
+
+        :param plan: QueryPlan of the ranked search
+        :return: list of NearEarthObjects
+        """
+        query, start_ordinal, end_ordinal = plan.query, plan.start_ordinal, plan.end_ordinal
+        if plan.access_path == AccessPath.columns:
+            return self.rank_columnar_objects(query, start_ordinal, end_ordinal)
+        if plan.access_path == AccessPath.sql:
+            neo_ids = self.db.rank_neo_ids(query.order.value, start_ordinal, end_ordinal, plan.filters, query.number)
+            return list(map(self.db.get_near_earth_object, neo_ids))
+        if plan.access_path == AccessPath.ranked_index:
+            return self.rank_indexed_objects(plan, self.db.secondary_indexes[query.order.value])
+
+        results = self.search(plan.source)
+        return self.order_results(results, query.order, query.number, start_ordinal, end_ordinal)
+
+    def rank_indexed_objects(self, plan, index):
+        """
+        Ranked search walking the secondary index of the order, so its cost grows with the requested number instead
+        of the number of OrbitPaths within the date search. Results with equal keys are put in order of first
+        close approach, like order_results.
+
+        :param plan: QueryPlan of the ranked search, whose compiled predicate filters the Near Earth Objects
+        :param index: SortedIndex of the order, holding NearEarthObjects or OrbitPaths
+        :return: list of NearEarthObjects
+        """
+        query, start_ordinal, end_ordinal, predicate = plan.query, plan.start_ordinal, plan.end_ordinal, plan.predicate
+
+        def get_position(neo):
+            return min(self.db.get_orbit_position(orbit) for orbit in neo.orbits
+                       if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal)
+
+        results = []
+        seen = set()
+        for _, values in index.iter_groups(reverse=query.order != OrderBy.distance):
+            group = []
+            for value in values:
+                if query.order == OrderBy.diameter:
+                    neo = value
+                    if not any(start_ordinal <= orbit.close_approach_ordinal <= end_ordinal for orbit in neo.orbits):
+                        continue
+                else:
+                    # The first OrbitPath of a NEO within the dates holds its key
+                    if not start_ordinal <= value.close_approach_ordinal <= end_ordinal:
+                        continue
+                    neo = value.neo
+                if neo in seen:
+                    continue
+                seen.add(neo)
+                if predicate is None or predicate(neo):
+                    group.append(neo)
+
+            if len(group) > 1:
+                group.sort(key=get_position)
+            results.extend(group)
+            if len(results) >= query.number:
+                break
 
-        # Return requested number only
         return results[:query.number]
+
+    def rank_columnar_objects(self, query, start_ordinal, end_ordinal):
+        """
+        Ranked search over a ColumnarNEODatabase. The key of every NEO id within the date search is computed over
+        the columns and only the NearEarthObject instances of the requested number are built.
+
+        :param query: Query.Selectors object with query information
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: list of NearEarthObjects
+        """
+        rows = self.db.iter_rows_between(start_ordinal, end_ordinal)
+        orbit_neo_ids = self.db.orbit_neo_ids
+
+        # Keys are kept in order of first close approach, so equal keys keep that order
+        if query.order == OrderBy.diameter:
+            diameters = self.db.neo_columns['estimated_diameter_min_kilometers']
+            keys = {neo_id: -diameters[neo_id] for neo_id in map(orbit_neo_ids.__getitem__, rows)}
+        else:
+            if query.order == OrderBy.distance:
+                column, sign = self.db.orbit_columns['miss_distance_kilometers'], 1
+            elif query.order == OrderBy.velocity:
+                column, sign = self.db.orbit_columns['kilometers_per_second'], -1
+            else:
+                raise UnsupportedFeature
+            keys = {}
+            for row in rows:
+                neo_id, key = orbit_neo_ids[row], sign * column[row]
+                if key < keys.get(neo_id, math.inf):
+                    keys[neo_id] = key
+
+        neo_ids = keys
+        mask = Filter.get_mask(query.filters[query.return_object], self.db)
+        if mask is not None:
+            neo_ids = filter(mask.__getitem__, neo_ids)
+
+        if query.number is None:
+            neo_ids = sorted(neo_ids, key=keys.__getitem__)
+        else:
+            neo_ids = heapq.nsmallest(query.number, neo_ids, key=keys.__getitem__)
+        return list(map(self.db.get_near_earth_object, neo_ids))
+
+    @staticmethod
+    def order_results(results, order, number, start_ordinal, end_ordinal):
+        """
+        Orders results with a bounded heap holding the requested number of results, instead of sorting all of them.
+        Results with equal keys keep their order of first close approach, so the order is deterministic.
+
+        :param results: iterable of NearEarthObjects in order of first close approach
+        :param order: OrderBy to order the results by
+        :param number: int representing the number of results to return, or None for all
+        :param start_ordinal: int representing the ordinal of the start date
+        :param end_ordinal: int representing the ordinal of the end date, inclusive
+        :return: list of NearEarthObjects
+        """
+
+        if order == OrderBy.distance:
+            def key(neo):
+                return min(orbit.miss_distance_kilometers for orbit in neo.orbits
+                           if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal)
+        elif order == OrderBy.velocity:
+            def key(neo):
+                return -max(orbit.kilometers_per_second for orbit in neo.orbits
+                            if start_ordinal <= orbit.close_approach_ordinal <= end_ordinal)
+        elif order == OrderBy.diameter:
+            def key(neo):
+                return -NearEarthObject.diameter(neo)
+        else:
+            raise UnsupportedFeature
+
+        if number is None:
+            return sorted(results, key=key)
+        return heapq.nsmallest(number, results, key=key)
+
+    @staticmethod
+    def order_paths(orbits, order, number):
+        """
+        Orders OrbitPath results with a bounded heap holding the requested number of results, like order_results.
+        Results with equal keys keep their order of close approach.
+
+        :param orbits: iterable of OrbitPaths in order of close approach
+        :param order: OrderBy to order the results by
+        :param number: int representing the number of results to return, or None for all
+        :return: list of OrbitPaths
+        """
+        if order == OrderBy.distance:
+            key = OrbitPath.distance
+        elif order == OrderBy.velocity:
+            def key(orbit):
+                return -orbit.kilometers_per_second
+        elif order == OrderBy.diameter:
+            def key(orbit):
+                return -NearEarthObject.diameter(orbit.neo)
+        else:
+            raise UnsupportedFeature
+
+        if number is None:
+            return sorted(orbits, key=key)
+        return heapq.nsmallest(number, orbits, key=key)
+
+    @staticmethod
+    def get_date_range(date_search):
+        """
+        :param date_search: Query.DateSearch to translate
+        :return: tuple of the start and end date ordinals, end inclusive
+        """
+        if date_search.type == DateSearchType.equals:
+            start_ordinal = end_ordinal = date_to_ordinal(date_search.values)
+        elif date_search.type == DateSearchType.between:
+            start_date, end_date = date_search.values.split(':')
+            start_ordinal, end_ordinal = date_to_ordinal(start_date), date_to_ordinal(end_date)
+        else:
+            raise UnsupportedFeature
+
+        return start_ordinal, end_ordinal
+
+    @staticmethod
+    def unique(results):
+        """
+        Lazily removes repeated results, keeping the first occurrence of each in order
+
+        :param results: iterable of hashable results
+        :return: iterator of unique results
+        """
+        seen = set()
+        for result in results:
+            if result not in seen:
+                seen.add(result)
+                yield result
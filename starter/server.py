@@ -0,0 +1,143 @@
+import json
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exceptions import UnsupportedFeature
+from search import Query, QueryCache, NEOSearcher
+
+
+class NEOServer(ThreadingHTTPServer):
+    """
+    Long running HTTP server answering search queries on a Near Earth Object database loaded once.
+
+    Every request is answered on its own thread with a new NEOSearcher over the one shared database, which the
+    server only reads, and one shared QueryCache, so repeated queries are answered from the cache. A query is a POST
+    to /query with a json object of the keyword arguments of Query, e.g.
+    {"start_date": "2020-01-01", "end_date": "2020-01-10", "number": 10, "filter": ["diameter:>:0.042"]}, and is
+    answered with a json object holding the rows of every result, e.g. one [id, name, close_approach_date] row per
+    orbit of a NearEarthObject.
+    """
+
+    daemon_threads = True
+
+    QUERY_FIELDS = ['date', 'start_date', 'end_date', 'number', 'filter', 'return_object', 'order']
+
+    def __init__(self, db, host='127.0.0.1', port=8000, cache_size=128):
+        """
+        :param db: loaded NEODatabase or ColumnarNEODatabase to search
+        :param host: str representing the host to listen on
+        :param port: int representing the port to listen on
+        :param cache_size: int representing the number of query results kept in the shared QueryCache
+        """
+        super().__init__((host, port), NEORequestHandler)
+        self.db = db
+        self.cache = QueryCache(maxsize=cache_size)
+
+    def get_results(self, query_options):
+        """
+        :param query_options: dict of Query keyword arguments
+        :return: list of the list of rows of each result
+        """
+        query_options = {field: query_options[field] for field in self.QUERY_FIELDS if field in query_options}
+        query_options.setdefault('return_object', 'NEO')
+        query_selectors = Query(**query_options).build_query()
+
+        return [result.get_rows() for result in NEOSearcher(self.db, cache=self.cache).iter_objects(query_selectors)]
+
+
+class NEORequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the NEOServer.
+    """
+
+    def do_POST(self):
+        if self.path != '/query':
+            self.send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            query_options = json.loads(self.rfile.read(length) or b'{}')
+            results = self.server.get_results(query_options)
+        except UnsupportedFeature:
+            self.send_json(400, {'error': 'Unsupported Feature'})
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'error': f'Invalid query: {e}'})
+        else:
+            self.send_json(200, {'results': results})
+
+    def send_json(self, status, body):
+        """
+        :param status: int representing the HTTP status code
+        :param body: json serializable response body
+        :return: None
+        """
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the server quiet, dashboards send many small queries
+        pass
+
+
+class NEOResult(object):
+    """
+    Object holding the rows of a result returned by a NEOServer, written by NEOWriter like the NearEarthObject or
+    OrbitPath the rows were taken from.
+    """
+
+    __slots__ = ('rows',)
+
+    def __init__(self, rows):
+        """
+        :param rows: list of lists representing the rows of the result
+        """
+        self.rows = [tuple(row) for row in rows]
+
+    def get_rows(self):
+        """
+        :return: list of row tuples
+        """
+        return self.rows
+
+    def __repr__(self):
+        """
+        :return: the rows as comma separated lines
+        """
+        return '\n'.join(','.join(map(str, row)) for row in self.rows)
+
+
+class NEOClient(object):
+    """
+    Thin client sending search queries to a NEOServer.
+    """
+
+    def __init__(self, url):
+        """
+        :param url: str representing the base url of the NEOServer, e.g. http://127.0.0.1:8000
+        """
+        self.url = url.rstrip('/')
+
+    def get_objects(self, **query_options):
+        """
+        :param query_options: Query keyword arguments
+        :return: list of NEOResult
+        :raises ValueError: if the server rejects the query
+        """
+        request = urllib.request.Request(f'{self.url}/query', data=json.dumps(query_options).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return [NEOResult(rows) for rows in json.loads(response.read())['results']]
+        except urllib.error.HTTPError as e:
+            if e.code != 400:
+                raise
+            error = json.loads(e.read())['error']
+            if error == 'Unsupported Feature':
+                raise UnsupportedFeature
+            raise ValueError(error)
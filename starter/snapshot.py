@@ -0,0 +1,124 @@
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+
+
+class Snapshot(object):
+    """
+    Object representing a binary snapshot of the parsed state of a Near Earth Object database.
+
+    The snapshot is stored next to the csv file it was parsed from and is keyed on the size, modification time and
+    content hash of that csv file, so a snapshot is only read back while the csv file is unchanged. The file layout is
+    a magic string, the length of a json header, the json header and then the raw bytes of every named blob listed in
+    the header.
+    """
+
+    MAGIC = b'NEOSNAP1'
+
+    def __init__(self, filename, engine):
+        """
+        :param filename: str representing the pathway of the csv file the snapshot is made from
+        :param engine: DatabaseEngine of the database the snapshot is made from
+        """
+        self.filename = filename
+        self.engine = engine
+        self.path = f'{filename}.{engine.value}.snapshot'
+
+    def get_source_key(self, with_hash=True):
+        """
+        :param with_hash: bool representing if the content hash of the csv file should be computed
+        :return: dict with the size, modification time and optionally the sha256 hash of the csv file
+        """
+        stat = os.stat(self.filename)
+        key = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if with_hash:
+            sha256 = hashlib.sha256()
+            with open(self.filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(chunk)
+            key['sha256'] = sha256.hexdigest()
+
+        return key
+
+    def is_current(self, source_key):
+        """
+        Checks a stored source key against the csv file. The content hash is only computed when the size matches but
+        the modification time does not, e.g. after the file was touched or copied.
+
+        :param source_key: dict stored in the snapshot header
+        :return: bool representing if the snapshot was made from the current csv file
+        """
+        key = self.get_source_key(with_hash=False)
+        if key['size'] != source_key['size']:
+            return False
+        if key['mtime_ns'] == source_key['mtime_ns']:
+            return True
+
+        return self.get_source_key()['sha256'] == source_key['sha256']
+
+    def write(self, blobs):
+        """
+        Writes the snapshot, replacing any previous one only once it is complete
+
+        :param blobs: dict of blob name to bytes-like object
+        :return: None
+        """
+        header = {'engine': self.engine.value, 'source': self.get_source_key(), 'blobs': []}
+        offset = 0
+        for name, blob in blobs.items():
+            length = memoryview(blob).nbytes
+            header['blobs'].append([name, offset, length])
+            offset += length
+        header = json.dumps(header).encode()
+
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(len(header).to_bytes(8, 'little'))
+                f.write(header)
+                for blob in blobs.values():
+                    f.write(blob)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @contextlib.contextmanager
+    def read(self):
+        """
+        Memory maps the snapshot and yields its blobs. The blobs are only valid inside the with block.
+
+        :return: dict of blob name to memoryview, or None if there is no current snapshot
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            yield None
+            return
+
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            blobs = {}
+            try:
+                header_start = len(self.MAGIC) + 8
+                if view[:len(self.MAGIC)] != self.MAGIC:
+                    yield None
+                    return
+                header_length = int.from_bytes(view[len(self.MAGIC):header_start], 'little')
+                header = json.loads(bytes(view[header_start:header_start + header_length]))
+                if header['engine'] != self.engine.value or not self.is_current(header['source']):
+                    yield None
+                    return
+
+                data_start = header_start + header_length
+                for name, offset, length in header['blobs']:
+                    blobs[name] = view[data_start + offset:data_start + offset + length]
+                yield blobs
+            finally:
+                # The map can only be closed once no view into it is left
+                for blob in blobs.values():
+                    blob.release()
+                view.release()
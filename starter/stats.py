@@ -0,0 +1,183 @@
+import contextlib
+import time
+
+
+class Stage(object):
+    """
+    Object holding the measurements of one named stage of loading, searching or writing.
+
+    seconds is the wall time spent in the stage including the stages it consumes, self_seconds excludes them. The
+    rows in of a stage consuming another one are the rows out of its source stage.
+    """
+    __slots__ = ('name', 'source', 'calls', 'seconds', 'self_seconds', 'rows_in', 'rows_out', 'bytes')
+
+    def __init__(self, name, source=None):
+        """
+        :param name: str representing the name of the stage
+        :param source: str representing the name of the stage the rows of this stage come from, if any
+        """
+        self.name = name
+        self.source = source
+        self.calls = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes = None
+
+    def add(self, rows_in=0, rows_out=0, bytes=0):
+        """
+        Adds counts measured by the instrumented code to the stage
+
+        :param rows_in: int representing the number of rows the stage consumed
+        :param rows_out: int representing the number of rows the stage produced
+        :param bytes: int representing the number of bytes the stage wrote
+        :return: None
+        """
+        if rows_in:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out:
+            self.rows_out = (self.rows_out or 0) + rows_out
+        if bytes:
+            self.bytes = (self.bytes or 0) + bytes
+
+
+class NEOStats(object):
+    """
+    Object collecting opt-in instrumentation of a NEODatabase, ColumnarNEODatabase, NEOSearcher and NEOWriter.
+
+    Eager stages are measured with the time context manager and lazy stages by wrapping their iterator with iterate,
+    which times every next call. Stages running while another one is timed are subtracted from its self_seconds, so a
+    lazy pipeline of date search, filters and writing is split into the time of each stage even though its stages run
+    interleaved. A disabled NEOStats returns the iterators it is given unchanged and a no-op context manager, so the
+    instrumented code costs one method call per stage, never one per row. Stages are tracked on one stack, so a
+    NEOStats measures one thread.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        :param enabled: bool representing if measurements are collected
+        """
+        self.enabled = enabled
+        self.stages = {}
+        self.stack = []
+        self.null_context = contextlib.nullcontext(Stage(None))
+
+    def get_stage(self, name, source=None):
+        """
+        :param name: str representing the name of the stage
+        :param source: str representing the name of the stage the rows of this stage come from, if any
+        :return: Stage of the name, created on first use
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name, source)
+
+        return stage
+
+    def time(self, name, source=None):
+        """
+        :param name: str representing the name of the stage
+        :param source: str representing the name of the stage the rows of this stage come from, if any
+        :return: context manager timing its block as the stage and yielding the Stage, to which counts can be added
+        """
+        if not self.enabled:
+            return self.null_context
+
+        return self.timed(self.get_stage(name, source))
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """
+        :param stage: Stage to time the block as
+        :return: context manager yielding the Stage
+        """
+        stage.calls += 1
+        self.stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            self.leave(stage, time.perf_counter() - start)
+
+    def iterate(self, name, iterable, source=None):
+        """
+        :param name: str representing the name of the stage
+        :param iterable: iterable of rows produced by the stage
+        :param source: str representing the name of the stage the rows of this stage come from, if any
+        :return: the iterable when disabled, otherwise an iterator timing and counting the rows of the iterable
+        """
+        if not self.enabled:
+            return iterable
+
+        stage = self.get_stage(name, source)
+        stage.calls += 1
+        if stage.rows_out is None:
+            stage.rows_out = 0
+        return self.timed_iterator(stage, iter(iterable))
+
+    def timed_iterator(self, stage, iterator):
+        """
+        :param stage: Stage to time the next calls of the iterator as
+        :param iterator: iterator of rows produced by the stage
+        :return: generator of the rows of the iterator
+        """
+        stack, perf_counter = self.stack, time.perf_counter
+        while True:
+            stack.append(stage)
+            start = perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave(stage, perf_counter() - start)
+            stage.rows_out += 1
+            yield row
+
+    def leave(self, stage, seconds):
+        """
+        :param stage: Stage on top of the stack
+        :param seconds: float representing the wall time spent in the stage since it was entered
+        :return: None
+        """
+        self.stack.pop()
+        stage.seconds += seconds
+        stage.self_seconds += seconds
+        if self.stack:
+            self.stack[-1].self_seconds -= seconds
+
+    def get_stats(self):
+        """
+        :return: list of dicts with the measurements of every stage, in order of first use
+        """
+        stats = []
+        for stage in self.stages.values():
+            rows_in = stage.rows_in
+            if rows_in is None and stage.source in self.stages:
+                rows_in = self.stages[stage.source].rows_out
+            stats.append({'stage': stage.name, 'calls': stage.calls, 'seconds': stage.seconds,
+                          'self_seconds': stage.self_seconds, 'rows_in': rows_in, 'rows_out': stage.rows_out,
+                          'bytes': stage.bytes})
+
+        return stats
+
+    def report(self):
+        """
+        :return: str representing the measurements of every stage as a table
+        """
+        lines = [f'{"stage":<40} {"calls":>6} {"seconds":>10} {"self":>10} {"rows_in":>10} {"rows_out":>10} '
+                 f'{"bytes":>12}']
+        for stage in self.get_stats():
+            counts = ['' if stage[field] is None else stage[field] for field in ('rows_in', 'rows_out', 'bytes')]
+            lines.append(f'{stage["stage"]:<40} {stage["calls"]:>6} {stage["seconds"]:>10.6f} '
+                         f'{stage["self_seconds"]:>10.6f} {counts[0]:>10} {counts[1]:>10} {counts[2]:>12}')
+
+        return '\n'.join(lines)
+
+    def reset(self):
+        """
+        :return: None
+        """
+        self.stages = {}
+        self.stack = []
@@ -1,8 +1,26 @@
+import asyncio
+import csv
+import datetime
+import json
+import os
 import pathlib
+import pickle
+import shutil
+import tempfile
+import threading
 import unittest
 
-from database import NEODatabase
-from search import Query, NEOSearcher
+from aggregate import AggregateType, NEOAggregator
+from async_search import AsyncNEOSearcher
+from benchmark import NEODataGenerator, NEOBenchmark
+from database import DatabaseEngine, NEODatabase, ColumnarNEODatabase, SQLiteNEODatabase, read_csv_rows
+from models import NearEarthObject, OrbitPath
+from partition import PartitionManifest
+from search import AccessPath, Filter, OrderBy, Query, QueryCache, QueryPlan, NEOSearcher
+from server import NEOServer, NEOClient
+from snapshot import Snapshot
+from stats import NEOStats
+from writer import OutputFormat, NEOWriter
 
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent
@@ -169,5 +187,1198 @@ class TestNEOSearchUseCases(unittest.TestCase):
         self.assertEqual(len(orbits), 10)
 
 
+class TestNEODatabaseDateIndex(unittest.TestCase):
+    """
+    Test Class with test cases for the sorted date index used by date range searches.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def test_date_index_is_sorted(self):
+        self.assertEqual(self.db.date_index_keys, sorted(set(self.db.date_index_keys)))
+        self.assertEqual(len(self.db.date_index_offsets), len(self.db.date_index_keys) + 1)
+        self.assertEqual(self.db.date_index_offsets[-1], len(self.db.orbit_paths))
+
+    def test_orbit_paths_between_match_dates_walk(self):
+        start_date = datetime.date(2020, 1, 1)
+        end_date = datetime.date(2020, 1, 10)
+        orbits = self.db.get_orbit_paths_between(start_date.toordinal(), end_date.toordinal())
+
+        # Walk every day of the range with the date to Near Earth Objects mapping
+        expected = []
+        for day in range((end_date - start_date).days + 1):
+            ordinal = (start_date + datetime.timedelta(days=day)).toordinal()
+            expected += self.db.neo_orbit_paths_date_to_neo.get(ordinal, [])
+
+        self.assertEqual([orbit.neo_name for orbit in orbits], [neo.name for neo in expected])
+
+    def test_search_stops_at_number_in_date_order(self):
+        orbits = self.db.get_orbit_paths_between(datetime.date(2020, 1, 1).toordinal(),
+                                                 datetime.date(2020, 1, 10).toordinal())
+        expected = list(dict.fromkeys(orbit.neo_name for orbit in orbits))[:5]
+
+        query_selectors = Query(
+            number=5, start_date='2020-01-01', end_date='2020-01-10', return_object='NEO'
+        ).build_query()
+        results = NEOSearcher(self.db).iter_objects(query_selectors)
+
+        self.assertEqual([neo.name for neo in results], expected)
+
+
+class TestResultOrder(unittest.TestCase):
+    """
+    Test Class with test cases for the deterministic order of unique results.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.start_date = datetime.date(2020, 1, 1)
+        self.end_date = datetime.date(2020, 3, 31)
+
+    def search(self, db, **query_options):
+        query_selectors = Query(start_date=self.start_date.isoformat(), end_date=self.end_date.isoformat(),
+                                return_object='NEO', **query_options).build_query()
+        return [neo.name for neo in NEOSearcher(db).get_objects(query_selectors)]
+
+    def get_db(self, database_class=NEODatabase, **kwargs):
+        db = database_class(filename=self.neo_data_file, **kwargs)
+        db.load_data()
+        return db
+
+    def test_results_are_deterministic_across_loads(self):
+        for order in OrderBy.list():
+            with self.subTest(order=order):
+                self.assertEqual(self.search(self.get_db(), number=10, order=order),
+                                 self.search(self.get_db(), number=10, order=order))
+
+    def test_first_approach_order(self):
+        db = self.get_db()
+        orbits = db.get_orbit_paths_between(self.start_date.toordinal(), self.end_date.toordinal())
+
+        self.assertEqual(self.search(db, number=10), list(dict.fromkeys(orbit.neo_name for orbit in orbits))[:10])
+
+    def test_distance_and_diameter_order(self):
+        db = self.get_db()
+        neos = NEOSearcher(db).get_objects(
+            Query(start_date=self.start_date.isoformat(), end_date=self.end_date.isoformat(),
+                  return_object='NEO', filter=['is_hazardous:=:False']).build_query()
+        )
+        start, end = self.start_date.isoformat(), self.end_date.isoformat()
+        keys = {
+            'distance': lambda neo: min(orbit.miss_distance_kilometers for orbit in neo.orbits
+                                        if start <= orbit.close_approach_date <= end),
+            'diameter': lambda neo: -neo.diameter_min_km,
+            'velocity': lambda neo: -max(orbit.kilometers_per_second for orbit in neo.orbits
+                                         if start <= orbit.close_approach_date <= end),
+        }
+
+        for database_class, kwargs in [(NEODatabase, {}), (NEODatabase, {'secondary_indexes': True}),
+                                       (ColumnarNEODatabase, {})]:
+            db = self.get_db(database_class, **kwargs)
+            for order, key in keys.items():
+                with self.subTest(database_class=database_class, order=order, **kwargs):
+                    expected = [neo.name for neo in sorted(neos, key=key)]
+                    self.assertEqual(self.search(db, number=10, order=order, filter=['is_hazardous:=:False']),
+                                     expected[:10])
+                    self.assertEqual(self.search(db, order=order, filter=['is_hazardous:=:False']), expected)
+
+    def test_ranked_search_walks_index(self):
+        # Over the whole data the few largest NEOs are found early in the walk of the diameter index
+        db = self.get_db(secondary_indexes=True)
+        self.start_date, self.end_date = datetime.date(1900, 1, 1), datetime.date(2200, 12, 31)
+        query_selectors = Query(start_date=self.start_date.isoformat(), end_date=self.end_date.isoformat(),
+                                return_object='NEO', number=3, order='diameter').build_query()
+        searcher = NEOSearcher(db)
+        # Fails the search if it falls back to ranking every result
+        searcher.order_results = None
+
+        expected = sorted(db.neo_name_to_instance.values(), key=lambda neo: -neo.diameter_min_km)[:3]
+        self.assertEqual(searcher.get_objects(query_selectors), expected)
+
+
+class TestColumnarNEODatabase(unittest.TestCase):
+    """
+    Test Class with test cases confirming the columnar engine finds the same NEOs as the in-memory engine.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+        self.columnar_db = ColumnarNEODatabase(filename=self.neo_data_file)
+        self.columnar_db.load_data()
+
+        self.start_date = '2020-01-01'
+        self.end_date = '2020-01-10'
+
+    def assertSameNEOs(self, **kwargs):
+        query_selectors = Query(return_object='NEO', **kwargs).build_query()
+        results = NEOSearcher(self.db).get_objects(query_selectors)
+        columnar_results = NEOSearcher(self.columnar_db).get_objects(query_selectors)
+
+        self.assertEqual(sorted(neo.name for neo in columnar_results), sorted(neo.name for neo in results))
+
+    def test_find_neos_on_date(self):
+        self.assertSameNEOs(date=self.start_date)
+
+    def test_find_neos_between_dates_with_filters(self):
+        self.assertSameNEOs(start_date=self.start_date, end_date=self.end_date,
+                            filter=["diameter:>:0.042", "is_hazardous:=:True", "distance:>:234989"])
+
+    def test_near_earth_object_orbits(self):
+        for name, neo_id in self.columnar_db.neo_name_to_id.items():
+            neo = self.db.neo_name_to_instance[name]
+            columnar_neo = self.columnar_db.get_near_earth_object(neo_id)
+            self.assertEqual(repr(columnar_neo), repr(neo))
+
+
+class TestSQLiteNEODatabase(unittest.TestCase):
+    """
+    Test Class with test cases confirming the SQLite engine finds the same NEOs, in the same order, as the in-memory
+    engine, and persists across databases.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.neo_data_file = os.path.join(self.temp_dir, 'neo_data.csv')
+        shutil.copy(f'{PROJECT_ROOT}/data/neo_data.csv', self.neo_data_file)
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+        self.sqlite_db = SQLiteNEODatabase(filename=self.neo_data_file)
+        self.sqlite_db.load_data()
+
+        options = [
+            {'date': '2020-01-07'},
+            {'start_date': '2020-01-01', 'end_date': '2020-01-31', 'number': 10},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30', 'filter': ['diameter:>:0.5']},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30',
+             'filter': ['diameter:>=:0.042', 'is_hazardous:=:True', 'distance:>:234989']},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30', 'filter': ['distance:<:1000000']},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'number': 10, 'order': 'distance'},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'number': 10, 'order': 'diameter',
+             'filter': ['is_hazardous:=:False']},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'order': 'velocity'},
+        ]
+        self.queries = [Query(return_object='NEO', **query_options).build_query() for query_options in options]
+
+    def tearDown(self):
+        self.sqlite_db.close()
+        shutil.rmtree(self.temp_dir)
+
+    def assertSameResults(self, db, results=None):
+        expected = [list(map(repr, NEOSearcher(self.db).get_objects(query))) for query in self.queries]
+        if results is None:
+            results = [NEOSearcher(db).get_objects(query) for query in self.queries]
+        self.assertEqual([list(map(repr, query_results)) for query_results in results], expected)
+
+    def test_search_matches_memory_engine(self):
+        self.assertSameResults(self.sqlite_db)
+        self.assertSameResults(self.sqlite_db, NEOSearcher(self.sqlite_db).get_batch_objects(self.queries))
+        for aggregate in AggregateType.list():
+            with self.subTest(aggregate=aggregate):
+                self.assertEqual(NEOAggregator(self.sqlite_db).aggregate(self.queries[4], aggregate),
+                                 NEOAggregator(self.db).aggregate(self.queries[4], aggregate))
+
+    def test_unchanged_csv_file_is_not_read_again(self):
+        stats = NEOStats()
+        reopened_db = SQLiteNEODatabase(filename=self.neo_data_file, stats=stats)
+        reopened_db.load_data()
+        self.assertEqual(stats.get_stats(), [])
+        self.assertSameResults(reopened_db)
+        reopened_db.close()
+
+    def test_grown_csv_file_is_ingested(self):
+        with open(self.neo_data_file) as f:
+            header, *rows = f.readlines()
+        with open(self.neo_data_file, 'w') as f:
+            f.writelines([header] + rows[:len(rows) // 2])
+        os.remove(self.sqlite_db.path)
+        self.sqlite_db.close()
+        self.sqlite_db.load_data()
+
+        with open(self.neo_data_file, 'w') as f:
+            f.writelines([header] + rows)
+        stats = NEOStats()
+        reopened_db = SQLiteNEODatabase(filename=self.neo_data_file, stats=stats)
+        reopened_db.load_data()
+        self.assertEqual([stage['stage'] for stage in stats.get_stats()], ['load.ingest'])
+        self.assertEqual(stats.get_stats()[0]['rows_out'], len(rows) - len(rows) // 2)
+        self.assertSameResults(reopened_db)
+        reopened_db.close()
+
+    def test_threads_share_the_connection(self):
+        # The rows are all held, so the ingest writes nothing while the searches read the same connection
+        with open(self.neo_data_file) as f:
+            rows = list(read_csv_rows(f, SQLiteNEODatabase.CSV_FIELDS))
+        results = [None] * 4
+
+        def search(position):
+            results[position] = [NEOSearcher(self.sqlite_db).get_objects(query) for query in self.queries]
+
+        threads = [threading.Thread(target=search, args=(position,)) for position in range(len(results))]
+        threads.append(threading.Thread(target=self.sqlite_db.ingest, args=(rows,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for thread_results in results:
+            self.assertSameResults(self.sqlite_db, thread_results)
+
+
+class TestPartitions(unittest.TestCase):
+    """
+    Test Class with test cases for loading only the time partitions of a partitioned data directory a search needs.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+        options = [
+            {'date': '2020-01-07'},
+            {'start_date': '2020-01-01', 'end_date': '2020-02-15', 'number': 10},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30', 'filter': ['diameter:>:0.5']},
+            {'start_date': '2019-12-01', 'end_date': '2020-03-31', 'number': 10, 'order': 'diameter',
+             'filter': ['is_hazardous:=:False']},
+        ]
+        self.queries = [Query(return_object='NEO', **query_options).build_query() for query_options in options]
+        self.date_ranges = [NEOSearcher.get_date_range(query.date_search) for query in self.queries]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_names(self, db, query):
+        return [neo.name for neo in NEOSearcher(db).get_objects(query)]
+
+    def test_search_loads_overlapping_partitions(self):
+        manifest = PartitionManifest.create(self.neo_data_file, self.temp_dir)
+        self.assertEqual(sum(partition['rows'] for partition in manifest.partitions), len(self.db.orbit_paths))
+
+        for db_class in [NEODatabase, ColumnarNEODatabase]:
+            for query, date_range in zip(self.queries, self.date_ranges):
+                with self.subTest(db_class=db_class.__name__, date_range=date_range):
+                    db = db_class(filename=None)
+                    loaded = db.load_partitions(PartitionManifest.read(self.temp_dir), [date_range])
+                    self.assertEqual(loaded, len(manifest.get_partitions([date_range])))
+                    self.assertLess(loaded, len(manifest.partitions))
+                    self.assertEqual(self.get_names(db, query), self.get_names(self.db, query))
+
+    def test_binary_partitions_match_csv_partitions(self):
+        csv_manifest = PartitionManifest.create(self.neo_data_file, os.path.join(self.temp_dir, 'csv'),
+                                                granularity='year')
+        for format in [OutputFormat.columnar.value, OutputFormat.binary.value]:
+            with self.subTest(format=format):
+                manifest = PartitionManifest.create(self.neo_data_file, os.path.join(self.temp_dir, format),
+                                                    granularity='year', format=format)
+                db = ColumnarNEODatabase(filename=None)
+                db.load_partitions(manifest)
+                csv_db = ColumnarNEODatabase(filename=None)
+                csv_db.load_partitions(csv_manifest)
+                for query in self.queries:
+                    self.assertEqual(list(map(repr, NEOSearcher(db).get_objects(query))),
+                                     list(map(repr, NEOSearcher(csv_db).get_objects(query))))
+
+    def test_later_searches_ingest_new_partitions(self):
+        manifest = PartitionManifest.create(self.neo_data_file, self.temp_dir)
+        stats = NEOStats()
+        db = NEODatabase(filename=None, stats=stats)
+        db.load_partitions(manifest, self.date_ranges[:1])
+        loaded = db.load_partitions(manifest, self.date_ranges)
+        self.assertEqual(loaded, len(manifest.get_partitions(self.date_ranges)) - 1)
+        self.assertEqual(db.load_partitions(manifest, self.date_ranges), 0)
+        self.assertEqual(sum(stage['rows_out'] for stage in stats.get_stats()),
+                         sum(partition['rows'] for partition in manifest.get_partitions(self.date_ranges)))
+        for query in self.queries:
+            self.assertEqual(self.get_names(db, query), self.get_names(self.db, query))
+
+
+class TestFilter(unittest.TestCase):
+    """
+    Test Class with test cases confirming the single pass filter mode matches chaining Filter.apply.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def test_apply_all_matches_chained_apply(self):
+        filters = Filter.create_filter_options(
+            ["diameter:>:0.042", "is_hazardous:=:True", "distance:>:234989"]
+        )[NearEarthObject]
+        results = list(self.db.neo_name_to_instance.values())
+
+        chained_results = results
+        for neo_filter in filters:
+            chained_results = neo_filter.apply(chained_results)
+
+        self.assertEqual(Filter.apply_all(filters, results), chained_results)
+
+
+class TestPathSearch(unittest.TestCase):
+    """
+    Test Class with test cases for OrbitPath searches, which return the close approaches within the dates passing
+    the filters.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.neo_data_file = os.path.join(self.temp_dir, 'neo_data.csv')
+        shutil.copy(f'{PROJECT_ROOT}/data/neo_data.csv', self.neo_data_file)
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+        options = [
+            {'date': '2020-01-07'},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30', 'number': 10,
+             'filter': ['distance:<:10000000', 'is_hazardous:=:False']},
+            {'start_date': '2020-01-01', 'end_date': '2020-06-30', 'filter': ['diameter:>:0.1', 'distance:>=:5e7']},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'number': 10, 'order': 'distance'},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'number': 10, 'order': 'diameter',
+             'filter': ['distance:>:1000000']},
+            {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'number': 5, 'order': 'velocity'},
+        ]
+        self.queries = [Query(return_object='Path', **query_options).build_query() for query_options in options]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_filters_apply_to_every_approach(self):
+        query = self.queries[2]
+        self.assertEqual(query.filters[NearEarthObject], [])
+        start_ordinal, end_ordinal = NEOSearcher.get_date_range(query.date_search)
+        expected = [orbit for orbit in self.db.get_orbit_paths_between(start_ordinal, end_ordinal)
+                    if orbit.neo.diameter_min_km > 0.1 and orbit.miss_distance_kilometers >= 5e7]
+
+        results = NEOSearcher(self.db).get_objects(query)
+        self.assertTrue(results)
+        self.assertTrue(all(isinstance(result, OrbitPath) for result in results))
+        self.assertEqual(results, expected)
+
+        rows = NEOAggregator(self.db).aggregate(query, AggregateType.count_by_day.value)[1]
+        self.assertEqual(sum(count for _, count in rows), len(expected))
+
+    def test_ranked_approaches(self):
+        results = NEOSearcher(self.db).get_objects(self.queries[3])
+        distances = [orbit.miss_distance_kilometers for orbit in results]
+        self.assertEqual(len(results), 10)
+        self.assertEqual(distances, sorted(distances))
+
+    def test_engines_match_memory_engine(self):
+        expected = [list(map(repr, NEOSearcher(self.db).get_objects(query))) for query in self.queries]
+        indexed_db = NEODatabase(filename=self.neo_data_file, secondary_indexes=True)
+        indexed_db.load_data()
+        columnar_db = ColumnarNEODatabase(filename=self.neo_data_file)
+        columnar_db.load_data()
+        sqlite_db = SQLiteNEODatabase(filename=self.neo_data_file)
+        sqlite_db.load_data()
+
+        for db in [indexed_db, columnar_db, sqlite_db]:
+            with self.subTest(db_class=db.__class__.__name__):
+                results = [NEOSearcher(db).get_objects(query) for query in self.queries]
+                self.assertEqual([list(map(repr, query_results)) for query_results in results], expected)
+                results = NEOSearcher(db, cache=QueryCache()).get_batch_objects(self.queries)
+                self.assertEqual([list(map(repr, query_results)) for query_results in results], expected)
+                for aggregate in AggregateType.list():
+                    self.assertEqual(NEOAggregator(db).aggregate(self.queries[2], aggregate),
+                                     NEOAggregator(self.db).aggregate(self.queries[2], aggregate))
+        sqlite_db.close()
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Test Class with test cases for reading back the loaded data from a binary snapshot.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.neo_data_file = os.path.join(self.temp_dir, 'neo_data.csv')
+        shutil.copy(f'{PROJECT_ROOT}/data/neo_data.csv', self.neo_data_file)
+
+        self.query_selectors = Query(
+            start_date='2020-01-01', end_date='2020-01-10', return_object='NEO', filter=["diameter:>:0.042"]
+        ).build_query()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assertSnapshotMatchesCsv(self, database_class):
+        db = database_class(filename=self.neo_data_file)
+        db.load_data()
+        expected = sorted(map(repr, NEOSearcher(db).get_objects(self.query_selectors)))
+
+        # The first load writes the snapshot, the second one reads it back
+        database_class(filename=self.neo_data_file, snapshot=True).load_data()
+        snapshot_db = database_class(filename=self.neo_data_file, snapshot=True)
+        self.assertTrue(snapshot_db.load_snapshot(self.neo_data_file))
+
+        self.assertEqual(sorted(map(repr, NEOSearcher(snapshot_db).get_objects(self.query_selectors))), expected)
+
+    def test_memory_snapshot(self):
+        self.assertSnapshotMatchesCsv(NEODatabase)
+
+    def test_columnar_snapshot(self):
+        self.assertSnapshotMatchesCsv(ColumnarNEODatabase)
+
+    def test_snapshot_is_stale_after_csv_change(self):
+        NEODatabase(filename=self.neo_data_file, snapshot=True).load_data()
+        with open(self.neo_data_file, 'a') as f:
+            f.write('\n')
+
+        self.assertFalse(NEODatabase(filename=self.neo_data_file).load_snapshot(self.neo_data_file))
+
+    def test_snapshot_is_never_unpickled(self):
+        # A snapshot is only read back as typed columns, a pickled state is rejected instead of unpickled
+        Snapshot(self.neo_data_file, DatabaseEngine.memory).write({'state': pickle.dumps({'neo_name_to_instance': {}})})
+
+        self.assertFalse(NEODatabase(filename=self.neo_data_file).load_snapshot(self.neo_data_file))
+
+    def test_columnar_snapshot_with_truncated_column(self):
+        db = ColumnarNEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        expected = sorted(map(repr, NEOSearcher(db).get_objects(self.query_selectors)))
+
+        # A column missing its last rows still holds whole array items, so only its length gives it away
+        blobs = db.get_blobs()
+        blobs['orbit.miss_distance_kilometers'] = blobs['orbit.miss_distance_kilometers'][:-8]
+        Snapshot(self.neo_data_file, DatabaseEngine.columnar).write(blobs)
+        self.assertFalse(ColumnarNEODatabase(filename=self.neo_data_file).load_snapshot(self.neo_data_file))
+
+        snapshot_db = ColumnarNEODatabase(filename=self.neo_data_file, snapshot=True)
+        snapshot_db.load_data()
+        self.assertEqual(sorted(map(repr, NEOSearcher(snapshot_db).get_objects(self.query_selectors))), expected)
+
+
+class TestParallelLoad(unittest.TestCase):
+    """
+    Test Class with test cases confirming a parallel load keeps the NEO identity and orbit order of a serial load.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+    def test_memory_parallel_load(self):
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        parallel_db = NEODatabase(filename=self.neo_data_file, workers=3)
+        parallel_db.load_data()
+
+        self.assertEqual(list(parallel_db.neo_name_to_instance), list(db.neo_name_to_instance))
+        for name, neo in db.neo_name_to_instance.items():
+            parallel_neo = parallel_db.neo_name_to_instance[name]
+            self.assertEqual(repr(parallel_neo.orbits), repr(neo.orbits))
+            self.assertTrue(all(orbit.neo is parallel_neo for orbit in parallel_neo.orbits))
+        self.assertEqual(repr(parallel_db.orbit_paths), repr(db.orbit_paths))
+
+    def test_columnar_parallel_load(self):
+        db = ColumnarNEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        parallel_db = ColumnarNEODatabase(filename=self.neo_data_file, workers=3)
+        parallel_db.load_data()
+
+        self.assertEqual(parallel_db.get_array_columns(), db.get_array_columns())
+        self.assertEqual(parallel_db.neo_columns['name'], db.neo_columns['name'])
+
+
+class TestIngest(unittest.TestCase):
+    """
+    Test Class with test cases for adding rows to a loaded database without reloading it.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        with open(self.neo_data_file) as f:
+            header, *self.rows = f.readlines()
+
+        # Two overlapping halves of the data file
+        self.temp_dir = tempfile.mkdtemp()
+        self.first_file = os.path.join(self.temp_dir, 'first.csv')
+        self.second_file = os.path.join(self.temp_dir, 'second.csv')
+        middle = len(self.rows) // 2
+        with open(self.first_file, 'w') as f:
+            f.writelines([header] + self.rows[:middle + 10])
+        with open(self.second_file, 'w') as f:
+            f.writelines([header] + self.rows[middle:])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_memory_ingest_matches_load(self):
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        ingest_db = NEODatabase(filename=self.first_file)
+        ingest_db.load_data()
+
+        self.assertEqual(ingest_db.ingest_file(self.second_file), len(self.rows) - len(self.rows) // 2 - 10)
+        self.assertEqual(ingest_db.ingest_file(self.second_file), 0)
+        self.assertEqual(repr(ingest_db.orbit_paths), repr(db.orbit_paths))
+        self.assertEqual(ingest_db.date_index_keys, db.date_index_keys)
+        self.assertEqual(ingest_db.date_index_offsets, db.date_index_offsets)
+
+    def test_columnar_ingest_matches_load(self):
+        db = ColumnarNEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        ingest_db = ColumnarNEODatabase(filename=self.first_file)
+        ingest_db.load_data()
+
+        self.assertEqual(ingest_db.ingest_file(self.second_file), len(self.rows) - len(self.rows) // 2 - 10)
+        self.assertEqual(ingest_db.ingest_file(self.second_file), 0)
+        self.assertEqual(ingest_db.get_array_columns(), db.get_array_columns())
+
+    def test_load_data_twice_does_not_duplicate_orbits(self):
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        db.load_data()
+
+        self.assertEqual(len(db.orbit_paths), len(self.rows))
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    """
+    Test Class with test cases confirming searches driven by a secondary index find the same NEOs, in the same
+    order, as searches driven by the date index.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+        self.indexed_db = NEODatabase(filename=self.neo_data_file, secondary_indexes=True)
+        self.indexed_db.load_data()
+
+    def assertSameNEOs(self, **kwargs):
+        query_selectors = Query(return_object='NEO', **kwargs).build_query()
+        results = NEOSearcher(self.db).get_objects(query_selectors)
+        indexed_results = NEOSearcher(self.indexed_db).get_objects(query_selectors)
+
+        self.assertEqual([neo.name for neo in indexed_results], [neo.name for neo in results])
+
+    def test_diameter_index(self):
+        largest = max(self.db.neo_name_to_instance.values(), key=NearEarthObject.diameter)
+        diameter_filter = f'diameter:>=:{largest.diameter_min_km}'
+        searcher = NEOSearcher(self.indexed_db)
+        query_selectors = Query(start_date='1900-01-01', end_date='2200-12-31', return_object='NEO',
+                                filter=[diameter_filter]).build_query()
+        index_filter = searcher.choose_index_filter(query_selectors.filters[NearEarthObject],
+                                                    *searcher.get_date_range(query_selectors.date_search))
+
+        self.assertEqual(index_filter.field, 'diameter')
+        self.assertSameNEOs(start_date='1900-01-01', end_date='2200-12-31', filter=[diameter_filter])
+
+    def test_distance_index_with_residual_filters(self):
+        self.assertSameNEOs(number=5, start_date='1900-01-01', end_date='2200-12-31',
+                            filter=["distance:<=:100000", "diameter:>:0.042"])
+
+
+class TestQueryPlan(unittest.TestCase):
+    """
+    Test Class with test cases for searching prepared QueryPlans.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file, secondary_indexes=True)
+        self.db.load_data()
+
+    def test_plan_searches_repeatedly(self):
+        searcher = NEOSearcher(self.db)
+        for kwargs in [dict(number=10, date='2020-01-10'),
+                       dict(number=5, start_date='2020-01-01', end_date='2020-12-31', order='distance'),
+                       dict(start_date='2020-01-01', end_date='2020-01-31', order='diameter',
+                            filter=["is_hazardous:=:True"]),
+                       dict(number=10, start_date='2020-01-01', end_date='2020-12-31', return_object='Path',
+                            filter=["distance:<:10000000"])]:
+            with self.subTest(**kwargs):
+                query_selectors = Query(**{'return_object': 'NEO', **kwargs}).build_query()
+                plan = searcher.prepare(query_selectors)
+                expected = searcher.get_objects(query_selectors)
+
+                self.assertIsInstance(plan, QueryPlan)
+                self.assertEqual(searcher.get_objects(plan), expected)
+                self.assertEqual(searcher.get_objects(plan), expected)
+
+    def test_plan_chooses_selective_index(self):
+        largest = max(self.db.neo_name_to_instance.values(), key=NearEarthObject.diameter)
+        query_selectors = Query(start_date='1900-01-01', end_date='2200-12-31', return_object='NEO',
+                                filter=[f'diameter:>=:{largest.diameter_min_km}']).build_query()
+        plan = NEOSearcher(self.db).prepare(query_selectors)
+
+        self.assertEqual(plan.access_path, AccessPath.secondary_index)
+        self.assertEqual(plan.index_filter.field, 'diameter')
+        self.assertIn('access path: secondary_index diameter', plan.explain())
+
+    def test_path_plan_counts_orbits_of_indexed_neos(self):
+        # Pick the largest NEOs just fewer than the OrbitPaths within the dates, so only their orbits outnumber them
+        searcher = NEOSearcher(self.db)
+        dates = dict(start_date='2020-01-01', end_date='2020-03-31')
+        start, end = self.db.get_date_index_range(
+            *searcher.get_date_range(Query(return_object='NEO', **dates).build_query().date_search))
+        diameter_filter = f"diameter:>:{self.db.secondary_indexes['diameter'].keys[start - end]}"
+
+        for return_object, access_path in [('NEO', AccessPath.secondary_index), ('Path', AccessPath.date_index)]:
+            with self.subTest(return_object=return_object):
+                query_selectors = Query(return_object=return_object, filter=[diameter_filter], **dates).build_query()
+
+                self.assertEqual(searcher.prepare(query_selectors).access_path, access_path)
+
+    def test_dates_are_ordinals(self):
+        orbit = self.db.orbit_paths[0]
+        close_approach_date = datetime.date.fromisoformat(orbit.close_approach_date)
+
+        self.assertEqual(orbit.close_approach_ordinal, close_approach_date.toordinal())
+        self.assertEqual(self.db.date_index_keys[0], orbit.close_approach_ordinal)
+
+
+class TestNEOServer(unittest.TestCase):
+    """
+    Test Class with test cases for answering queries from a NEOServer.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+        self.server = NEOServer(self.db, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = NEOClient(f'http://127.0.0.1:{self.server.server_address[1]}')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_server_matches_searcher(self):
+        query_options = dict(number=10, start_date='2020-01-01', end_date='2020-01-10',
+                             return_object='NEO', filter=["diameter:>:0.042"])
+        results = NEOSearcher(self.db).get_objects(Query(**query_options).build_query())
+
+        self.assertEqual([result.get_rows() for result in self.client.get_objects(**query_options)],
+                         [result.get_rows() for result in results])
+        self.assertEqual(list(map(str, self.client.get_objects(**query_options))), list(map(str, results)))
+
+    def test_server_rejects_invalid_filter(self):
+        with self.assertRaises(ValueError):
+            self.client.get_objects(date='2020-01-01', filter=["unknown:>:1"])
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    Test Class with test cases for reusing the results of repeated queries.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        with open(self.neo_data_file) as f:
+            self.header, *self.rows = f.readlines()
+
+        # The database starts out with half of the data file
+        self.temp_dir = tempfile.mkdtemp()
+        self.first_file = os.path.join(self.temp_dir, 'first.csv')
+        with open(self.first_file, 'w') as f:
+            f.writelines([self.header] + self.rows[:len(self.rows) // 2])
+
+        self.db = NEODatabase(filename=self.first_file)
+        self.db.load_data()
+        self.cache = QueryCache(maxsize=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_query_hits(self):
+        searcher = NEOSearcher(self.db, cache=self.cache)
+        results = searcher.get_objects(Query(date='2020-01-01', return_object='NEO').build_query())
+        cached_results = searcher.get_objects(
+            Query(start_date='2020-01-01', end_date='2020-01-01', return_object='NEO').build_query()
+        )
+
+        self.assertEqual(cached_results, results)
+        self.assertEqual(self.cache.info(), QueryCache.CacheInfo(hits=1, misses=1, maxsize=2, currsize=1))
+
+    def test_mutated_results_leave_cache_intact(self):
+        searcher = NEOSearcher(self.db, cache=self.cache)
+        query = Query(start_date='2020-01-01', end_date='2020-01-10', return_object='Path').build_query()
+        expected = NEOSearcher(self.db).get_objects(query)
+
+        # Results of a miss and of a hit are the caller's own lists, so changing them never changes the cache
+        for batch in [False, False, True]:
+            results = searcher.get_batch_objects([query])[0] if batch else searcher.get_objects(query)
+            self.assertEqual(results, expected)
+            results.reverse()
+            del results[1:]
+        self.assertEqual(list(searcher.iter_objects(query)), expected)
+        self.assertEqual(searcher.get_objects(query), expected)
+
+    def test_least_recently_used_query_is_evicted(self):
+        searcher = NEOSearcher(self.db, cache=self.cache)
+        for date in ['2020-01-01', '2020-01-02', '2020-01-01', '2020-01-03', '2020-01-01', '2020-01-02']:
+            searcher.get_objects(Query(date=date, return_object='NEO').build_query())
+
+        self.assertEqual(self.cache.info(), QueryCache.CacheInfo(hits=2, misses=4, maxsize=2, currsize=2))
+
+    def test_ingest_invalidates_cache(self):
+        query_selectors = Query(start_date='1900-01-01', end_date='2200-12-31', return_object='NEO').build_query()
+        searcher = NEOSearcher(self.db, cache=self.cache)
+        searcher.get_objects(query_selectors)
+        self.db.ingest(csv.DictReader([self.header] + self.rows))
+
+        self.assertEqual(searcher.get_objects(query_selectors), NEOSearcher(self.db).get_objects(query_selectors))
+        self.assertEqual(self.cache.info().misses, 2)
+
+    def test_cache_shared_by_databases(self):
+        # Both databases are at the same generation, but hold different data
+        query_selectors = Query(start_date='1900-01-01', end_date='2200-12-31', return_object='NEO').build_query()
+        full_db = NEODatabase(filename=self.neo_data_file)
+        full_db.load_data()
+        results = NEOSearcher(self.db, cache=self.cache).get_objects(query_selectors)
+        full_results = NEOSearcher(full_db, cache=self.cache).get_objects(query_selectors)
+
+        self.assertEqual(full_db.generation, self.db.generation)
+        self.assertEqual(full_results, NEOSearcher(full_db).get_objects(query_selectors))
+        self.assertEqual(NEOSearcher(self.db, cache=self.cache).get_objects(query_selectors), results)
+        self.assertEqual(self.cache.info().misses, 3)
+
+
+class TestNEOWriter(unittest.TestCase):
+    """
+    Test Class with test cases for streaming search results to every output format.
+    """
+
+    def setUp(self):
+        self.db = NEODatabase(filename=f'{PROJECT_ROOT}/data/neo_data.csv')
+        self.db.load_data()
+        self.results = NEOSearcher(self.db).get_objects(
+            Query(start_date='2020-01-01', end_date='2020-01-10', return_object='NEO').build_query()
+        )
+        self.rows = [row for result in self.results for row in result.get_rows()]
+
+        self.temp_dir = tempfile.mkdtemp()
+        # Write in several batches and row groups
+        self.writer = NEOWriter()
+        self.writer.BATCH_SIZE = self.writer.ROW_GROUP_SIZE = 7
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, output_format, results):
+        filename = os.path.join(self.temp_dir, f'neo_neo_data.{output_format.value}')
+        self.assertTrue(self.writer.write(format=output_format.value, data=iter(results), filename=filename))
+        return filename
+
+    def test_csv_file(self):
+        with open(self.write(OutputFormat.csv_file, self.results)) as f:
+            header, *rows = csv.reader(f)
+
+        self.assertEqual(tuple(header), NearEarthObject.OUTPUT_FIELDS)
+        self.assertEqual(list(map(tuple, rows)), self.rows)
+
+    def test_json_lines(self):
+        with open(self.write(OutputFormat.json_lines, self.results)) as f:
+            rows = [json.loads(line) for line in f]
+
+        self.assertEqual(rows, [dict(zip(NearEarthObject.OUTPUT_FIELDS, row)) for row in self.rows])
+
+    def test_columnar_and_binary_read_back(self):
+        path_rows = [row for result in self.results for orbit in result.orbits for row in orbit.get_rows()]
+        for output_format in [OutputFormat.columnar, OutputFormat.binary]:
+            for results, fields, rows in [(self.results, NearEarthObject.OUTPUT_FIELDS, self.rows),
+                                          ([], NearEarthObject.OUTPUT_FIELDS, [])]:
+                with self.subTest(output_format=output_format, rows=len(rows)):
+                    read_fields, read_rows = NEOWriter.read(output_format.value, self.write(output_format, results))
+                    self.assertEqual(tuple(read_fields), fields)
+                    self.assertEqual(list(read_rows), rows)
+
+            # Miss distances are written as packed floats
+            orbits = [orbit for result in self.results for orbit in result.orbits]
+            filename = os.path.join(self.temp_dir, 'orbits')
+            self.writer.write(output_format.value, orbits, filename=filename, fields=OrbitPath.OUTPUT_FIELDS)
+            self.assertEqual(list(NEOWriter.read(output_format.value, filename)[1]), path_rows)
+
+    def test_mixed_int_and_float_rows(self):
+        rows = [(1, 'a', 0), (2, 'b', 1.5), (3, 'c', True)]
+        for output_format in [OutputFormat.columnar, OutputFormat.binary]:
+            with self.subTest(output_format=output_format):
+                filename = os.path.join(self.temp_dir, f'mixed.{output_format.value}')
+                self.assertTrue(self.writer.write_rows(output_format.value, rows, fields=('id', 'name', 'count'),
+                                                       filename=filename))
+                self.assertEqual(list(NEOWriter.read(output_format.value, filename)[1]),
+                                 [(1.0, 'a', 0.0), (2.0, 'b', 1.5), (3.0, 'c', 1.0)])
+
+    def test_unknown_format(self):
+        self.assertFalse(self.writer.write(format='xml', data=self.results))
+
+
+class TestAggregate(unittest.TestCase):
+    """
+    Test Class with test cases for aggregating the close approaches of a search in the database engines.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+        self.columnar_db = ColumnarNEODatabase(filename=self.neo_data_file)
+        self.columnar_db.load_data()
+
+        self.start_date = '2020-01-01'
+        self.end_date = '2020-03-31'
+
+    def get_orbits(self, predicate):
+        return [orbit for orbit in self.db.orbit_paths
+                if self.start_date <= orbit.close_approach_date <= self.end_date and predicate(orbit.neo)]
+
+    def test_aggregates_match_manual_counts(self):
+        for filters, predicate in [(None, lambda neo: True),
+                                   (['diameter:>:0.02'], lambda neo: neo.diameter_min_km > 0.02)]:
+            orbits = self.get_orbits(predicate)
+            neos = set(orbit.neo for orbit in orbits)
+            by_day = {}
+            for orbit in orbits:
+                by_day[orbit.close_approach_date] = by_day.get(orbit.close_approach_date, 0) + 1
+            query = Query(start_date=self.start_date, end_date=self.end_date, filter=filters,
+                          return_object='NEO').build_query()
+            for db in [self.db, self.columnar_db]:
+                aggregator = NEOAggregator(db)
+                with self.subTest(engine=db.engine, filters=filters):
+                    fields, rows = aggregator.aggregate(query, AggregateType.count_by_day.value)
+                    self.assertEqual(fields, ('close_approach_date', 'approaches'))
+                    self.assertEqual(rows, sorted(by_day.items()))
+
+                    _, rows = aggregator.aggregate(query, AggregateType.count_by_month.value)
+                    self.assertEqual(sum(count for _, count in rows), len(orbits))
+                    self.assertEqual([month for month, _ in rows], sorted(set(day[:7] for day in by_day)))
+
+                    _, rows = aggregator.aggregate(query, AggregateType.hazardous.value)
+                    self.assertEqual(rows, [(is_hazardous,
+                                             sum(orbit.neo.is_potentially_hazardous_asteroid == is_hazardous
+                                                 for orbit in orbits),
+                                             sum(neo.is_potentially_hazardous_asteroid == is_hazardous
+                                                 for neo in neos))
+                                            for is_hazardous in (False, True)])
+
+                    _, rows = aggregator.aggregate(query, AggregateType.distance_histogram.value, bins=4)
+                    self.assertEqual(len(rows), 4)
+                    self.assertEqual(sum(count for _, _, count in rows), len(orbits))
+                    self.assertEqual((rows[0][0], rows[-1][1]), (min(map(OrbitPath.distance, orbits)),
+                                                                 max(map(OrbitPath.distance, orbits))))
+
+                    _, rows = aggregator.aggregate(query, AggregateType.diameter_histogram.value, bins=4)
+                    self.assertEqual(sum(count for _, _, count in rows), len(neos))
+
+    def test_histogram(self):
+        self.assertEqual(NEOAggregator.get_histogram([0.0, 1.0, 2.0, 4.0], 2), [(0.0, 2.0, 2), (2.0, 4.0, 2)])
+        self.assertEqual(NEOAggregator.get_histogram([3.0, 3.0], 2), [(3.0, 3.0, 2)])
+        self.assertEqual(NEOAggregator.get_histogram([], 2), [])
+        for bins in [0, -1]:
+            with self.assertRaises(ValueError):
+                NEOAggregator.get_histogram([0.0, 1.0], bins)
+
+
+class TestSampling(unittest.TestCase):
+    """
+    Test Class with test cases for estimating counts and aggregates from the sample of the database.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.db = NEODatabase(filename=self.neo_data_file, sample_size=1000)
+        self.db.load_data()
+
+        self.queries = [Query(start_date='2015-01-01', end_date='2020-12-31', return_object='NEO',
+                              filter=['is_hazardous:=:True']).build_query(),
+                        Query(start_date='2015-01-01', end_date='2020-12-31', return_object='Path',
+                              filter=['distance:<:30000000']).build_query()]
+
+    def test_estimates_hold_exact_counts(self):
+        for query in self.queries:
+            with self.subTest(return_object=query.return_object):
+                exact = NEOSearcher(self.db).count(query)
+                estimate = NEOSearcher(self.db, sampled=True).count(query)
+
+                self.assertEqual(estimate.sampled, len(self.db.sample.get_orbit_paths_between(
+                    *NEOSearcher.get_date_range(query.date_search))))
+                self.assertLessEqual(estimate.low, exact.value)
+                self.assertGreaterEqual(estimate.high, exact.value)
+
+    def test_sample_of_every_orbit_is_exact(self):
+        db = NEODatabase(filename=self.neo_data_file, sample_size=len(self.db.orbit_paths))
+        db.load_data()
+        aggregator, sampled_aggregator = NEOAggregator(db), NEOAggregator(db, sampled=True)
+        for query in self.queries:
+            with self.subTest(return_object=query.return_object):
+                exact_count = NEOSearcher(db).count(query)
+                count = NEOSearcher(db, sampled=True).count(query)
+                self.assertEqual((round(count.low), round(count.high)), (exact_count.value, exact_count.value))
+
+                _, rows = aggregator.aggregate(query, AggregateType.hazardous.value)
+                fields, sampled_rows = sampled_aggregator.aggregate(query, AggregateType.hazardous.value)
+                self.assertEqual(fields, ('is_hazardous', 'approaches', 'approaches_low', 'approaches_high',
+                                          'neos', 'neos_low', 'neos_high'))
+                self.assertEqual([(is_hazardous, approaches, neos)
+                                  for is_hazardous, approaches, _, _, neos, _, _ in sampled_rows], rows)
+
+    def test_sample_objects_are_results(self):
+        for query in self.queries:
+            with self.subTest(return_object=query.return_object):
+                results = NEOSearcher(self.db).get_objects(query)
+                sampled_results = NEOSearcher(self.db, sampled=True).get_objects(query._replace(number=10))
+
+                self.assertEqual(len(sampled_results), 10)
+                self.assertTrue(set(sampled_results) <= set(results))
+
+    def test_ingest_keeps_sample_size(self):
+        with open(self.neo_data_file) as f:
+            rows = list(csv.DictReader(f))
+        db = NEODatabase(filename=self.neo_data_file, sample_size=100)
+        db.append_rows(rows[:len(rows) // 2])
+        db.build_date_index()
+        db.build_sample()
+        db.ingest(rows[len(rows) // 2:])
+
+        self.assertEqual(db.sample.seen, len(rows))
+        self.assertEqual(len(db.sample.orbit_paths), 100)
+        self.assertEqual(db.sample.keys, sorted(db.sample.keys))
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Test Class with test cases for the synthetic data generator and the benchmark harness.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.neo_data_file = os.path.join(self.temp_dir, 'neo_data.csv')
+        NEODataGenerator(seed=7).write(self.neo_data_file, 2000)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_generated_file_loads(self):
+        other_file = os.path.join(self.temp_dir, 'other.csv')
+        NEODataGenerator(seed=7).write(other_file, 2000)
+        with open(self.neo_data_file, 'rb') as f, open(other_file, 'rb') as other:
+            self.assertEqual(f.read(), other.read())
+
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        self.assertEqual(len(db.orbit_paths), 2000)
+        # Near Earth Objects have several close approaches
+        self.assertLess(len(db.neo_name_to_instance), 2000)
+
+    def test_generated_names_are_unique(self):
+        neo_names = {}
+        for row in NEODataGenerator(seed=7).iter_rows(100000):
+            neo_names.setdefault(row[0], row[2])
+
+        self.assertEqual(len(set(neo_names.values())), len(neo_names))
+
+    def test_benchmark_covers_engines_queries_and_formats(self):
+        results = NEOBenchmark(self.neo_data_file, repeat=1, memory=False).run()
+
+        for engine in NEOBenchmark.ENGINES:
+            self.assertEqual(results[f'load.{engine}']['rows'], 2000)
+            for name in NEOBenchmark.QUERIES:
+                # Every engine finds the same number of results
+                self.assertEqual(results[f'query.{engine}.{name}']['rows'], results[f'query.memory.{name}']['rows'])
+        self.assertGreater(results['query.memory.date_range']['rows'], 0)
+        for output_format in OutputFormat:
+            if output_format != OutputFormat.display:
+                self.assertGreater(results[f'write.{output_format.value}']['bytes'], 0)
+        self.assertEqual(NEOBenchmark.compare(results, results, 1.0), [])
+
+
+class TestBatchSearch(unittest.TestCase):
+    """
+    Test Class with test cases for searching a batch of queries with shared scans.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        options = [
+            {'start_date': '2020-01-01', 'end_date': '2020-01-31'},
+            {'start_date': '2020-01-01', 'end_date': '2020-01-10', 'number': 5},
+            {'start_date': '2020-01-05', 'end_date': '2020-02-15', 'filter': ['diameter:>=:0.1']},
+            {'start_date': '2020-01-05', 'end_date': '2020-02-15', 'filter': ['diameter:>=:0.1'], 'number': 3},
+            {'date': '2020-01-07', 'filter': ['is_hazardous:=:False', 'distance:<=:40000000']},
+            {'start_date': '2020-03-01', 'end_date': '2020-06-30', 'number': 10, 'order': 'distance'},
+            {'start_date': '2020-03-01', 'end_date': '2020-03-02', 'number': 0},
+            {'start_date': '2021-01-01', 'end_date': '2020-01-01'},
+        ]
+        self.queries = [Query(return_object='NEO', **query_options).build_query() for query_options in options]
+
+    def test_batch_matches_single_queries(self):
+        for db in [NEODatabase(filename=self.neo_data_file),
+                   NEODatabase(filename=self.neo_data_file, secondary_indexes=True),
+                   ColumnarNEODatabase(filename=self.neo_data_file)]:
+            db.load_data()
+            expected = [list(map(repr, NEOSearcher(db).get_objects(query))) for query in self.queries]
+            cache = QueryCache()
+            for _ in range(2):
+                with self.subTest(engine=db.engine, cached=bool(cache.info().currsize)):
+                    results = NEOSearcher(db, cache=cache).get_batch_objects(self.queries)
+                    self.assertEqual([list(map(repr, query_results)) for query_results in results], expected)
+            self.assertEqual(cache.info().hits, len(self.queries))
+
+
+class TestAsyncNEOSearcher(unittest.TestCase):
+    """
+    Test Class with test cases for loading and searching from an asyncio event loop.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        options = [
+            {'start_date': '2020-01-01', 'end_date': '2020-01-31'},
+            {'start_date': '2020-01-01', 'end_date': '2020-01-10', 'number': 5},
+            {'date': '2020-01-07', 'filter': ['is_hazardous:=:False', 'distance:<=:40000000']},
+            {'start_date': '2020-03-01', 'end_date': '2020-06-30', 'number': 10, 'order': 'distance'},
+        ]
+        self.queries = [Query(return_object='NEO', **query_options).build_query() for query_options in options]
+
+    def test_concurrent_queries_match_searcher(self):
+        async def search(searcher):
+            await searcher.load_data()
+            results = await asyncio.gather(*map(searcher.get_objects, self.queries))
+            batch_results = await searcher.get_batch_objects(self.queries)
+            return results, batch_results
+
+        for db_class in [NEODatabase, ColumnarNEODatabase]:
+            with self.subTest(db_class=db_class.__name__):
+                db = db_class(filename=self.neo_data_file)
+                results, batch_results = asyncio.run(search(AsyncNEOSearcher(db, cache=QueryCache(), chunk_size=3)))
+                expected = [list(map(repr, NEOSearcher(db).get_objects(query))) for query in self.queries]
+                self.assertEqual([list(map(repr, query_results)) for query_results in results], expected)
+                self.assertEqual([list(map(repr, query_results)) for query_results in batch_results], expected)
+
+    def test_load_waits_for_searches(self):
+        async def search_and_load(searcher):
+            await searcher.load_data()
+            results = searcher.iter_objects(self.queries[0])
+            try:
+                first = await results.__anext__()
+                load = asyncio.ensure_future(searcher.load_data())
+                await asyncio.sleep(0.05)
+                self.assertFalse(load.done())
+            finally:
+                await results.aclose()
+            await asyncio.wait_for(load, timeout=60)
+            return first
+
+        db = NEODatabase(filename=self.neo_data_file)
+        first = asyncio.run(search_and_load(AsyncNEOSearcher(db, chunk_size=2)))
+        self.assertEqual(repr(first), repr(NEOSearcher(db).get_objects(self.queries[0])[0]))
+        self.assertEqual(len(db.orbit_paths), sum(len(neo.orbits) for neo in db.neo_name_to_instance.values()))
+
+
+class TestNEOStats(unittest.TestCase):
+    """
+    Test Class with test cases for measuring the stages of loading, searching and writing.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.query = Query(start_date='2020-01-01', end_date='2020-01-31', return_object='NEO',
+                           filter=['diameter:>=:0.1', 'is_hazardous:=:False']).build_query()
+        with open(self.neo_data_file) as f:
+            self.rows = sum(1 for _ in csv.DictReader(f))
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_stages_count_rows_and_bytes(self):
+        for db_class in [NEODatabase, ColumnarNEODatabase]:
+            with self.subTest(db_class=db_class.__name__):
+                stats = NEOStats()
+                db = db_class(filename=self.neo_data_file, stats=stats)
+                db.load_data()
+                results = NEOSearcher(db, stats=stats).get_objects(self.query)
+                filename = os.path.join(self.temp_dir, 'neo_neo_data.csv')
+                NEOWriter(stats=stats).write(format=OutputFormat.csv_file.value, data=results, filename=filename)
+
+                # Measured searches find the same results
+                unmeasured_db = db_class(filename=self.neo_data_file)
+                unmeasured_db.load_data()
+                self.assertEqual(list(map(repr, NEOSearcher(unmeasured_db).get_objects(self.query))),
+                                 list(map(repr, results)))
+
+                stages = {stage['stage']: stage for stage in stats.get_stats()}
+                self.assertEqual(stages['load.parse']['rows_out'], self.rows)
+                unique = stages['search.unique']
+                diameter = stages['search.filter diameter:>=:0.1']
+                is_hazardous = stages['search.filter is_hazardous:=:False']
+                self.assertEqual(diameter['rows_in'], unique['rows_out'])
+                self.assertEqual(is_hazardous['rows_in'], diameter['rows_out'])
+                self.assertEqual(is_hazardous['rows_out'], len(results))
+                self.assertEqual(stages['search']['rows_out'], len(results))
+                self.assertEqual(stages['write.csv_file']['rows_in'], sum(len(result.orbits) for result in results))
+                self.assertEqual(stages['write.csv_file']['bytes'], os.path.getsize(filename))
+                for stage in stages.values():
+                    self.assertGreaterEqual(stage['seconds'], stage['self_seconds'])
+                    self.assertGreaterEqual(stage['self_seconds'], 0.0)
+
+    def test_disabled_stats_do_not_wrap(self):
+        stats = NEOStats(enabled=False)
+        rows = iter([1, 2])
+        self.assertIs(stats.iterate('rows', rows), rows)
+        with stats.time('stage') as stage:
+            stage.add(rows_out=2)
+        self.assertEqual(stats.get_stats(), [])
+
+
+class TestProjectedLoad(unittest.TestCase):
+    """
+    Test Class with test cases for parsing only the csv columns kept by the databases and decoding fields lazily.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+    def test_rows_match_dict_reader(self):
+        for db_class in [NEODatabase, ColumnarNEODatabase]:
+            with self.subTest(db_class=db_class.__name__):
+                with open(self.neo_data_file) as f:
+                    expected = [{field: row[field] for field in db_class.CSV_FIELDS} for row in csv.DictReader(f)]
+                with open(self.neo_data_file) as f:
+                    self.assertEqual(list(read_csv_rows(f, db_class.CSV_FIELDS)), expected)
+
+    def test_missing_field(self):
+        with self.assertRaises(KeyError):
+            list(read_csv_rows(['id,name\n', '1,a\n'], NEODatabase.CSV_FIELDS))
+        self.assertEqual(list(read_csv_rows([], NEODatabase.CSV_FIELDS)), [])
+
+    def test_lazy_fields(self):
+        with open(self.neo_data_file) as f:
+            row = next(csv.DictReader(f))
+        neo = NearEarthObject(**row)
+        self.assertEqual(neo.absolute_magnitude_h, float(row['absolute_magnitude_h']))
+        self.assertEqual(neo.estimated_diameter_max_kilometers, float(row['estimated_diameter_max_kilometers']))
+        self.assertAlmostEqual(neo.estimated_diameter_max_meters, float(row['estimated_diameter_max_meters']),
+                               places=3)
+
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        columnar_db = ColumnarNEODatabase(filename=self.neo_data_file)
+        columnar_db.load_data()
+        for name, neo_id in columnar_db.neo_name_to_id.items():
+            neo = db.neo_name_to_instance[name]
+            columnar_neo = columnar_db.get_near_earth_object(neo_id)
+            self.assertEqual(columnar_neo.absolute_magnitude_h, neo.absolute_magnitude_h)
+            self.assertEqual(columnar_neo.estimated_diameter_max_kilometers, neo.estimated_diameter_max_kilometers)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,15 @@
+from array import array
 from enum import Enum
+import csv
+import itertools
+import json
+import os
 import pathlib
+import struct
+import sys
 
 from models import NearEarthObject
+from stats import NEOStats
 
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
@@ -13,6 +21,9 @@ class OutputFormat(Enum):
     """
     display = 'display'
     csv_file = 'csv_file'
+    json_lines = 'json_lines'
+    columnar = 'columnar'
+    binary = 'binary'
 
     @staticmethod
     def list():
@@ -25,11 +36,46 @@ class OutputFormat(Enum):
 class NEOWriter(object):
     """
     Python object use to write the results from supported output formatting options.
+
+    Every result is written as the rows returned by its get_rows method, one row per NearEarthObject orbit or one row
+    per OrbitPath. Rows are streamed to the output in batches through a large write buffer, so memory stays constant
+    however many results are written.
+
+    The columnar and binary formats share a header: a magic string, the length of a json header and the json header
+    holding the field names and the struct type code of every field ('s' for text). The columnar format then holds
+    row groups of ROW_GROUP_SIZE rows, each a row count followed by every column stored contiguously: numbers as packed
+    arrays and text as NUL joined utf-8. The binary format holds one record per row instead, numbers packed with struct
+    and text as length prefixed utf-8.
     """
 
-    def __init__(self):
-        # TODO: How can we use the OutputFormat in the NEOWriter?
-        pass
+    BATCH_SIZE = 1024
+    BUFFER_SIZE = 1 << 20
+    ROW_GROUP_SIZE = 65536
+
+    MAGIC = {
+        OutputFormat.columnar: b'NEOCOL01',
+        OutputFormat.binary: b'NEOBIN01',
+    }
+
+    DEFAULT_FILENAMES = {
+        OutputFormat.csv_file: f'{PROJECT_ROOT}/data/neo_neo_data.csv',
+        OutputFormat.json_lines: f'{PROJECT_ROOT}/data/neo_neo_data.jsonl',
+        OutputFormat.columnar: f'{PROJECT_ROOT}/data/neo_neo_data.col',
+        OutputFormat.binary: f'{PROJECT_ROOT}/data/neo_neo_data.bin',
+    }
+
+    def __init__(self, stats=None):
+        """
+        :param stats: NEOStats measuring the rows and bytes written, or None to not measure them
+        """
+        self.stats = stats or NEOStats(enabled=False)
+        self.writers = {
+            OutputFormat.display: self.write_display,
+            OutputFormat.csv_file: self.write_csv_file,
+            OutputFormat.json_lines: self.write_json_lines,
+            OutputFormat.columnar: self.write_columnar,
+            OutputFormat.binary: self.write_binary,
+        }
 
     def write(self, format, data, **kwargs):
         """
@@ -37,27 +83,249 @@ class NEOWriter(object):
         appropriate instance write function
 
         :param format: str representing the OutputFormat
-        :param data: collection of NearEarthObject or OrbitPath results
-        :param kwargs: Additional attributes used for formatting output e.g. filename
+        :param data: iterable of NearEarthObject or OrbitPath results, consumed one result at a time
+        :param kwargs: Additional attributes used for formatting output e.g. filename, the output path of the file
+                       formats, and fields, the field names of the rows, defaulting to NearEarthObject.OUTPUT_FIELDS
         :return: bool representing if write successful or not
         """
-        # TODO: Using the OutputFormat, how can we organize our 'write' logic for output to stdout vs to csvfile
-        # TODO: into instance methods for NEOWriter? Write instance methods that write() can call to do the necessary
-        # TODO: output format.
-
-        # Write to screen
-        if format == OutputFormat.display.value:
-            print(NearEarthObject.get_csv_header())
-            for datum in data:
-                print(datum)
-        # Write to CSV file
-        elif format == OutputFormat.csv_file.value:
-            filename = f'{PROJECT_ROOT}/data/neo_neo_data.csv'
-            with open(filename, 'w') as f:
-                f.writelines(NearEarthObject.get_csv_header() + '\n')
-                for datum in data:
-                    f.writelines(datum.__repr__() + '\n')
-        else:
+        rows = itertools.chain.from_iterable(datum.get_rows() for datum in data)
+        return self.write_rows(format, self.stats.iterate('write.rows', rows), **kwargs)
+
+    def write_rows(self, format, rows, **kwargs):
+        """
+        Writes rows directly, e.g. the summary rows of a NEOAggregator, see write
+
+        :param format: str representing the OutputFormat
+        :param rows: iterable of row tuples, consumed one row at a time
+        :param kwargs: Additional attributes used for formatting output e.g. filename and fields
+        :return: bool representing if write successful or not
+        """
+        try:
+            output_format = OutputFormat(format)
+        except ValueError:
             return False
 
+        fields = kwargs.get('fields') or NearEarthObject.OUTPUT_FIELDS
+        filename = kwargs.get('filename') or self.DEFAULT_FILENAMES.get(output_format)
+        with self.stats.time(f'write.{output_format.value}', source='write.rows') as stage:
+            self.writers[output_format](rows, fields, filename)
+            if self.stats.enabled and output_format != OutputFormat.display:
+                stage.add(bytes=os.path.getsize(filename))
+
         return True
+
+    def get_batches(self, rows, size=None):
+        """
+        :param rows: iterable of row tuples
+        :param size: int representing the number of rows per batch, defaults to BATCH_SIZE
+        :return: generator of lists of row tuples
+        """
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, size or self.BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
+    def write_display(self, rows, fields, filename=None):
+        """
+        Prints the rows to stdout as comma separated lines, one write per batch
+
+        :param rows: iterable of row tuples
+        :param fields: sequence of str representing the field names
+        :param filename: unused, stdout is always written
+        :return: None
+        """
+        sys.stdout.write(','.join(fields) + '\n')
+        for batch in self.get_batches(rows):
+            sys.stdout.write(''.join(','.join(map(str, row)) + '\n' for row in batch))
+        sys.stdout.flush()
+
+    def write_csv_file(self, rows, fields, filename):
+        """
+        :param rows: iterable of row tuples
+        :param fields: sequence of str representing the field names
+        :param filename: str representing the pathway of the csv file to write
+        :return: None
+        """
+        with open(filename, 'w', newline='', buffering=self.BUFFER_SIZE) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(fields)
+            writer.writerows(rows)
+
+    def write_json_lines(self, rows, fields, filename):
+        """
+        Writes one json object per row, keyed on the field names
+
+        :param rows: iterable of row tuples
+        :param fields: sequence of str representing the field names
+        :param filename: str representing the pathway of the json lines file to write
+        :return: None
+        """
+        encode = json.JSONEncoder().encode
+        with open(filename, 'w', buffering=self.BUFFER_SIZE) as f:
+            for batch in self.get_batches(rows):
+                f.write(''.join(encode(dict(zip(fields, row))) + '\n' for row in batch))
+
+    def write_columnar(self, rows, fields, filename):
+        """
+        Writes the rows as row groups of contiguous columns
+
+        :param rows: iterable of row tuples
+        :param fields: sequence of str representing the field names
+        :param filename: str representing the pathway of the columnar file to write
+        :return: None
+        """
+        with open(filename, 'wb', buffering=self.BUFFER_SIZE) as f:
+            types = None
+            for group in self.get_batches(rows, self.ROW_GROUP_SIZE):
+                if types is None:
+                    types = self.get_types(group[0])
+                    self.write_header(f, OutputFormat.columnar, fields, types)
+                f.write(len(group).to_bytes(8, 'little'))
+                for type_code, column in zip(types, zip(*group)):
+                    if type_code == 's':
+                        blob = '\0'.join(column).encode()
+                    else:
+                        blob = array(type_code, column).tobytes()
+                    f.write(len(blob).to_bytes(8, 'little'))
+                    f.write(blob)
+            if types is None:
+                self.write_header(f, OutputFormat.columnar, fields, [])
+
+    def write_binary(self, rows, fields, filename):
+        """
+        Writes the rows as packed records
+
+        :param rows: iterable of row tuples
+        :param fields: sequence of str representing the field names
+        :param filename: str representing the pathway of the binary file to write
+        :return: None
+        """
+        with open(filename, 'wb', buffering=self.BUFFER_SIZE) as f:
+            packers = None
+            for batch in self.get_batches(rows):
+                if packers is None:
+                    types = self.get_types(batch[0])
+                    self.write_header(f, OutputFormat.binary, fields, types)
+                    packers = [None if type_code == 's' else struct.Struct(f'<{type_code}').pack
+                               for type_code in types]
+                records = bytearray()
+                for row in batch:
+                    for pack, value in zip(packers, row):
+                        if pack is None:
+                            value = value.encode()
+                            records += len(value).to_bytes(4, 'little')
+                            records += value
+                        else:
+                            records += pack(value)
+                f.write(records)
+            if packers is None:
+                self.write_header(f, OutputFormat.binary, fields, [])
+
+    @staticmethod
+    def get_types(row):
+        """
+        Types are read from the first row written, so every number is stored as a double: a column holding an int in
+        the first row may hold a float in a later one, e.g. an aggregate count and its estimate.
+
+        :param row: tuple representing the first row written
+        :return: list of str representing the array type code of every field, 's' for text
+        """
+        types = []
+        for value in row:
+            if isinstance(value, bool):
+                types.append('b')
+            elif isinstance(value, (int, float)):
+                types.append('d')
+            else:
+                types.append('s')
+
+        return types
+
+    @staticmethod
+    def write_header(f, output_format, fields, types):
+        """
+        :param f: binary file object to write to
+        :param output_format: OutputFormat of the file, either columnar or binary
+        :param fields: sequence of str representing the field names
+        :param types: list of str representing the type code of every field
+        :return: None
+        """
+        header = json.dumps({'fields': list(fields), 'types': types}).encode()
+        f.write(NEOWriter.MAGIC[output_format])
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+
+    @staticmethod
+    def read(format, filename):
+        """
+        Reads back a file written in the columnar or binary OutputFormat
+
+        :param format: str representing the OutputFormat, either columnar or binary
+        :param filename: str representing the pathway of the file
+        :return: tuple of the list of field names and a generator of row tuples
+        """
+        output_format = OutputFormat(format)
+        f = open(filename, 'rb')
+        magic = NEOWriter.MAGIC[output_format]
+        if f.read(len(magic)) != magic:
+            f.close()
+            raise ValueError(f'{filename} is not a {output_format.value} file')
+        header = json.loads(f.read(int.from_bytes(f.read(8), 'little')))
+        if output_format == OutputFormat.columnar:
+            rows = NEOWriter.read_columnar(f, header['types'])
+        else:
+            rows = NEOWriter.read_binary(f, header['types'])
+
+        return header['fields'], rows
+
+    @staticmethod
+    def read_columnar(f, types):
+        """
+        :param f: binary file object positioned after the header
+        :param types: list of str representing the type code of every field
+        :return: generator of row tuples, reading one row group at a time
+        """
+        with f:
+            while True:
+                count = f.read(8)
+                if not count:
+                    return
+                count = int.from_bytes(count, 'little')
+                columns = []
+                for type_code in types:
+                    blob = f.read(int.from_bytes(f.read(8), 'little'))
+                    if type_code == 's':
+                        columns.append(blob.decode().split('\0'))
+                    else:
+                        column = array(type_code)
+                        column.frombytes(blob)
+                        columns.append(map(bool, column) if type_code == 'b' else column)
+                yield from zip(*columns)
+
+    @staticmethod
+    def read_binary(f, types):
+        """
+        :param f: binary file object positioned after the header
+        :param types: list of str representing the type code of every field
+        :return: generator of row tuples
+        """
+        unpackers = [None if type_code == 's' else struct.Struct(f'<{type_code}') for type_code in types]
+        with f:
+            # Nothing but the header is written when there are no rows
+            while unpackers:
+                row = []
+                for unpacker in unpackers:
+                    if unpacker is None:
+                        length = f.read(4)
+                        if not length:
+                            return
+                        row.append(f.read(int.from_bytes(length, 'little')).decode())
+                    else:
+                        value = f.read(unpacker.size)
+                        if not value:
+                            return
+                        value = unpacker.unpack(value)[0]
+                        row.append(bool(value) if unpacker.format == '<b' else value)
+                yield tuple(row)